@@ -0,0 +1,96 @@
+"""
+Benchmark key state updates of KeyBoard (one Button per key) against
+CanvasKeyBoard (one Canvas item per key).
+
+Every frame toggles N keys with one set_key_states() call, the way
+MidiHandler posts them through UiDispatcher, and then lets Tk redraw with
+update_idletasks(). The time per frame covers both the Python calls and
+the Tk redraw requests; drawing in the X server runs in its own process
+and is not included. Key updates per second are keys per frame divided
+by the median frame time.
+
+Needs a display. On a headless machine run it under Xvfb:
+
+    xvfb-run -a python benchmarks/bench_keyboard.py
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tkinter
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from config.Setting import GuiSetting
+from gui.piano.CanvasKeyBoard import CanvasKeyBoard
+from gui.piano.KeyBoard import KeyBoard
+from midi.NoteTable import note_number
+
+KEY_COUNTS = (1, 10, 44, 88)
+FRAMES = 300
+RENDERERS = (KeyBoard, CanvasKeyBoard)
+
+
+def measure(root, renderer, key_count: int, frames: int) -> list:
+    """
+    Toggle `key_count` keys per frame on a fresh `renderer` keyboard.
+
+    Args:
+        root: Tk root window
+        renderer: KeyBoard or CanvasKeyBoard
+        key_count: Number of key states changed per frame
+        frames: Number of frames to time
+
+    Returns:
+        list: Milliseconds spent on each frame
+    """
+    setting = SimpleNamespace(gui=GuiSetting())
+    keyboard = renderer(root, setting=setting)
+    keyboard.pack()
+    root.update()
+
+    first = note_number("A-1")
+    notes = [first + (i * 88 // key_count) for i in range(key_count)]
+    times = []
+    for frame in range(frames):
+        state = tkinter.ACTIVE if frame % 2 == 0 else tkinter.NORMAL
+        states = {note: state for note in notes}
+        start = time.perf_counter()
+        keyboard.set_key_states(states)
+        root.update_idletasks()
+        times.append((time.perf_counter() - start) * 1000.0)
+
+    keyboard.destroy()
+    root.update()
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=FRAMES, help="frames timed per run")
+    args = parser.parse_args()
+
+    try:
+        root = tkinter.Tk()
+    except tkinter.TclError as e:
+        print(f"Cannot open a display ({e}); run under xvfb-run -a")
+        return 1
+    root.geometry(f"{GuiSetting().Width}x{GuiSetting().Height}")
+
+    print(f"{'renderer':<16}{'keys/frame':>12}{'median ms':>12}{'p95 ms':>10}{'updates/s':>12}")
+    for key_count in KEY_COUNTS:
+        for renderer in RENDERERS:
+            times = sorted(measure(root, renderer, key_count, args.frames))
+            median = statistics.median(times)
+            p95 = times[int(len(times) * 0.95) - 1]
+            updates = key_count * 1000.0 / median
+            print(f"{renderer.__name__:<16}{key_count:>12}{median:>12.3f}{p95:>10.3f}{updates:>12.0f}")
+
+    root.destroy()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Benchmark loading a large MIDI file with SmfDecoder against mido.
+
+The mido path parses the whole file with mido.MidiFile and compiles it with
+MidiTimeline.compile(); the SmfDecoder path reads the file through
+SmfDecoder and compiles the same timeline without mido. Both are timed
+with perf_counter and their peak Python allocations are taken from
+tracemalloc (timed and traced in separate runs, since tracing slows both
+down). "First chunk" is the time until MidiFilePlayer can start playing: a
+stream() with its first COMPILE_CHUNK events compiled.
+
+Without a path a multi-track file with --events note messages is written
+to a temporary directory first. The two timelines are compared and the
+script exits 1 if they differ.
+
+    python benchmarks/bench_smf_decoder.py [--events 400000] [path.mid]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import mido
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from midi.MidiTimeline import MidiTimeline
+from midi.SmfDecoder import SmfDecoder
+
+EVENTS = 400000
+TRACKS = 16
+RUNS = 3
+
+
+def write_file(path: str, events: int, tracks: int = TRACKS):
+    """
+    Write a type 1 file of `tracks` tracks holding `events` note messages in total.
+
+    Every track plays short notes on its own channel with a sustain pedal
+    press every bar; the first track also carries tempo changes.
+
+    Args:
+        path: Path of the .mid file to write
+        events: Number of note on/off messages
+        tracks: Number of tracks
+    """
+    rng = random.Random(1)
+    mid = mido.MidiFile(type=1, ticks_per_beat=480)
+    per_track = events // tracks
+    for index in range(tracks):
+        track = mido.MidiTrack()
+        channel = index % 16
+        for i in range(per_track // 2):
+            if index == 0 and i % 500 == 0:
+                track.append(mido.MetaMessage('set_tempo', tempo=rng.randrange(400000, 600000), time=0))
+            if i % 16 == 0:
+                track.append(mido.Message('control_change', channel=channel, control=64, value=127 if i % 32 else 0))
+            note = rng.randrange(21, 109)
+            track.append(mido.Message('note_on', channel=channel, note=note, velocity=rng.randrange(1, 128),
+                                      time=rng.randrange(0, 120)))
+            track.append(mido.Message('note_off', channel=channel, note=note, velocity=0,
+                                      time=rng.randrange(1, 120)))
+        mid.tracks.append(track)
+    mid.save(path)
+
+
+def load_mido(path: str) -> MidiTimeline:
+    """Parse `path` with mido and compile it (the fallback path of MidiFilePlayer)."""
+    return MidiTimeline.compile(mido.MidiFile(path))
+
+
+def load_decoder(path: str) -> MidiTimeline:
+    """Decode and fully compile `path` with SmfDecoder."""
+    timeline = SmfDecoder(path).decode().stream(chunk=0)
+    while not timeline.compile_more():
+        pass
+    return timeline
+
+
+def first_chunk(path: str) -> MidiTimeline:
+    """Decode `path` and compile only the first chunk, as MidiFilePlayer does before playing."""
+    return SmfDecoder(path).decode().stream()
+
+
+def timed(load, path: str, runs: int) -> float:
+    """Return the median seconds of `runs` calls of load(path)."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        load(path)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def peak(load, path: str) -> float:
+    """Return the peak MB allocated by one call of load(path)."""
+    tracemalloc.start()
+    load(path)
+    result = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", nargs="?", help="MIDI file to load (default: a generated one)")
+    parser.add_argument("--events", type=int, default=EVENTS, help="note messages of the generated file")
+    parser.add_argument("--runs", type=int, default=RUNS, help="timed runs per path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.path
+        if path is None:
+            path = os.path.join(tmp, "bench.mid")
+            write_file(path, args.events)
+
+        expected = load_mido(path)
+        actual = load_decoder(path)
+        same = (expected.words == actual.words and expected.times == actual.times
+                and expected.voices == actual.voices)
+        print(f"{os.path.getsize(path) / 1e6:.1f} MB, {len(expected)} timeline events, "
+              f"timelines {'identical' if same else 'DIFFER'}")
+
+        parse = timed(mido.MidiFile, path, args.runs)
+        mid = mido.MidiFile(path)
+        compile_mido = timed(lambda _: MidiTimeline.compile(mid), path, args.runs)
+        decoder = timed(load_decoder, path, args.runs)
+        chunk = timed(first_chunk, path, args.runs)
+
+        print(f"{'path':<26}{'seconds':>10}{'peak MB':>10}")
+        print(f"{'mido.MidiFile':<26}{parse:>10.3f}{peak(mido.MidiFile, path):>10.1f}")
+        print(f"{'  + MidiTimeline.compile':<26}{compile_mido:>10.3f}{peak(lambda _: MidiTimeline.compile(mid), path):>10.1f}")
+        print(f"{'SmfDecoder full compile':<26}{decoder:>10.3f}{peak(load_decoder, path):>10.1f}")
+        print(f"{'SmfDecoder first chunk':<26}{chunk:>10.4f}{peak(first_chunk, path):>10.1f}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
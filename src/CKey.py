@@ -5,6 +5,7 @@ from gui.UiDispatcher import UiDispatcher
 from config.Setting import Setting
 from midi.MidiController import MidiController
 from midi.MidiFilePlayer import MidiFilePlayer
+from midi.MidiTimelineCache import MidiTimelineCache
 from midi.PygameMidiBackend import PygameMidiBackend
 
 def main():
@@ -13,16 +14,18 @@ def main():
     midi = MidiController(midi_backend=backend, dispatcher=None)
 
     root = tkinter.Tk()
-    dispatcher = UiDispatcher(root)
+    dispatcher = UiDispatcher(root, wake_on_post=True)
     dispatcher.start()
     
     # Create MidiFilePlayer for file playback (system start/end separate)
     file_player = MidiFilePlayer(
         event_queue=midi.event_queue,
-        lock=midi.lock,
-        start_flag_getter=lambda: midi.start,
-        end_flag_getter=lambda: midi.end
+        lifecycle=midi.lifecycle,
+        timeline_cache=MidiTimelineCache()
     )
+    if backend.supports_timestamps():
+        # Send file events to the device early with exact timestamps
+        file_player.set_lookahead(MidiFilePlayer.DEFAULT_LOOKAHEAD, backend.get_time_ms, MidiController.OUTPUT_LATENCY_MS)
     
     window = MainWindow(root, setting, midi, file_player, dispatcher)
 
@@ -50,8 +53,7 @@ def main():
         print("User requested exit.")
     finally:
         # exit
-        with midi.lock:
-            midi.end = True
+        midi.shutdown()
         midi_recv_thread.join(timeout=2.0)
         midi_proc_thread.join(timeout=2.0)
         if midi_file_thread is not None:
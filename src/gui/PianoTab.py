@@ -4,6 +4,7 @@ from tkinter import filedialog
 import os
 from enum import Enum
 from gui.piano.KeyBoard import KeyBoard
+from gui.piano.CanvasKeyBoard import CanvasKeyBoard
 from config.Setting import Setting
 from midi.MidiController import MidiController
 try:
@@ -22,6 +23,9 @@ class PlayButtonState(Enum):
 
 
 class PianoTab():
+    # Playback speeds offered for MIDI file playback
+    SPEEDS = (0.25, 0.5, 0.75, 1.0, 1.25, 1.5, 2.0, 3.0, 4.0)
+
     def __init__(self, root: tkinter.ttk.Notebook, setting: Setting, midi: MidiController, file_player=None, dispatcher=None):
         self.frame = tkinter.Frame(root)
         self.frame.grid_columnconfigure(0, weight=1)
@@ -34,7 +38,8 @@ class PianoTab():
 
         self.image_canvas = tkinter.Canvas(self.image_frame, highlightthickness=0)
         self.image_canvas.pack(fill=tkinter.BOTH, expand=True)
-        self.image_canvas.bind('<Configure>', self._redraw_image)
+        self.image_canvas.bind('<Configure>', self._on_image_configure)
+        self.dispatcher = dispatcher
 
         self._image_original = None
         self._image_tk = None
@@ -42,7 +47,8 @@ class PianoTab():
         self.keyboard_frame = tkinter.Frame(self.frame)
         self.keyboard_frame.grid(row=1, column=0, sticky='ew')
 
-        self.keyboard = KeyBoard(master=self.keyboard_frame, setting=setting, midi=midi)
+        keyboard_class = CanvasKeyBoard if setting.gui.CanvasKeyboard else KeyBoard
+        self.keyboard = keyboard_class(master=self.keyboard_frame, setting=setting, midi=midi)
         self.keyboard.pack(fill=tkinter.BOTH, expand=True)
 
         # File playback controls placed under the keyboard
@@ -55,7 +61,7 @@ class PianoTab():
         self.controls_frame.grid(row=2, column=0, pady=8)
 
         self.file_label = tkinter.Label(self.controls_frame, text="No file", width=40, anchor='w')
-        self.file_label.grid(row=0, column=0, columnspan=3, sticky='w')
+        self.file_label.grid(row=0, column=0, columnspan=4, sticky='w')
 
         self.btn_choose = tkinter.Button(self.controls_frame, text="Choose MIDI file", command=self._choose_file)
         self.btn_choose.grid(row=1, column=0, padx=4)
@@ -73,6 +79,11 @@ class PianoTab():
         self.btn_stop.bind('<Button-1>', lambda e: self._on_stop_press(e))
         self.btn_stop.bind('<ButtonRelease-1>', lambda e: self._on_stop_release(e))
 
+        self.speed_name = tkinter.StringVar(self.frame, value=self._format_speed(1.0))
+        self.combo_speed = tkinter.ttk.Combobox(self.controls_frame, width=6, values=[self._format_speed(speed) for speed in self.SPEEDS], state="readonly", textvariable=self.speed_name)
+        self.combo_speed.grid(row=1, column=3, padx=4)
+        self.combo_speed.bind("<<ComboboxSelected>>", self._on_speed_selected)
+
         # Apply initial visibility based on settings
         self.update_midi_file_visibility()
         self.update_image_frame_visibility()
@@ -84,6 +95,7 @@ class PianoTab():
         if dispatcher is not None:
             try:
                 dispatcher.register('keyboard', self.keyboard)
+                dispatcher.register('piano_tab', self)
             except Exception:
                 pass
 
@@ -212,6 +224,25 @@ class PianoTab():
             except Exception:
                 pass
 
+    def _format_speed(self, speed: float) -> str:
+        return f"{speed:g}x"
+
+    def _on_speed_selected(self, event):
+        if self.file_player is None:
+            return
+        try:
+            speed = float(self.speed_name.get().rstrip('x'))
+            self.file_player.set_speed(speed)
+        except Exception as e:
+            print(f"Error setting playback speed: {e}")
+
+    def _on_image_configure(self, event):
+        # Rescaling the image is slow; let the dispatcher run it after key updates
+        if self.dispatcher is not None:
+            self.dispatcher.post_low('piano_tab', 'refresh_image')
+        else:
+            self._redraw_image(event)
+
     def _redraw_image(self, event):
         if self._image_original is None or ImageOps is None or ImageTk is None:
             try:
@@ -66,9 +66,18 @@ class SettingsTab():
         self.check_show_image_frame = tkinter.Checkbutton(self.window_settings_frame, variable=self.var_show_image_frame, command=self._on_show_image_frame_changed)
         self.check_show_image_frame.grid(row=4, column=1)
 
+        # Keyboard renderer toggle (applied on next start)
+        self.label_canvas_keyboard = tkinter.Label(self.window_settings_frame, text="Canvas keyboard (restart)")
+        self.label_canvas_keyboard.grid(row=5, column=0, sticky='w')
+
+        self.var_canvas_keyboard = tkinter.BooleanVar()
+        self.var_canvas_keyboard.set(getattr(setting.gui, "CanvasKeyboard", False))
+        self.check_canvas_keyboard = tkinter.Checkbutton(self.window_settings_frame, variable=self.var_canvas_keyboard, command=self._on_canvas_keyboard_changed)
+        self.check_canvas_keyboard.grid(row=5, column=1)
+
         # image above keyboard
         self.label_image = tkinter.Label(self.window_settings_frame, text="Image")
-        self.label_image.grid(row=5, column=0, sticky='w')
+        self.label_image.grid(row=6, column=0, sticky='w')
 
         self._image_name = tkinter.StringVar()
         try:
@@ -76,10 +85,10 @@ class SettingsTab():
         except Exception:
             self._image_name.set("No image")
         self.label_image_name = tkinter.Label(self.window_settings_frame, textvariable=self._image_name, width=40, anchor='w')
-        self.label_image_name.grid(row=5, column=1, columnspan=2, sticky='w')
+        self.label_image_name.grid(row=6, column=1, columnspan=2, sticky='w')
 
         self.btn_choose_image = tkinter.Button(self.window_settings_frame, text="Choose Image", command=self._choose_image)
-        self.btn_choose_image.grid(row=6, column=0, sticky='w')
+        self.btn_choose_image.grid(row=7, column=0, sticky='w')
 
         self.button_apply = tkinter.Button(self.frame, text="Save", command=self._on_save_button_click)
         self.button_apply.grid(row=1, column=0, columnspan=3, pady=10)
@@ -139,6 +148,12 @@ class SettingsTab():
         except:
             pass
 
+    def _on_canvas_keyboard_changed(self):
+        try:
+            self.setting.gui.CanvasKeyboard = self.var_canvas_keyboard.get()
+        except:
+            pass
+
     def _choose_image(self):
         try:
             path = filedialog.askopenfilename(filetypes=[("Image files", "*.png;*.jpg;*.jpeg;*.gif;*.bmp"), ("All files", "*")])
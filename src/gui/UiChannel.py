@@ -0,0 +1,68 @@
+import weakref
+
+
+class UiChannel:
+    """
+    Pre-resolved handle for posting calls to one method of a registered widget.
+
+    Obtained from UiDispatcher.channel(). The widget lookup is done once, so
+    post() only enqueues the call. The method is held through a weak
+    reference: the channel becomes invalid when the widget is collected or
+    unregistered, and post() then does nothing.
+    """
+
+    def __init__(self, dispatcher, name: str, method_name: str, method):
+        """
+        Args:
+            dispatcher: UiDispatcher that runs the posted calls
+            name: Registered widget name
+            method_name: Name of the method on the widget
+            method: Resolved bound method (or other callable attribute)
+        """
+        self.name = name
+        self.method_name = method_name
+        self._dispatcher = dispatcher
+        self._valid = True
+        try:
+            self._method = weakref.WeakMethod(method, self._on_collected)
+        except TypeError:
+            # Not a bound method, e.g. a function stored on the instance
+            try:
+                self._method = weakref.ref(method, self._on_collected)
+            except TypeError:
+                self._method = lambda: method
+
+    @property
+    def is_valid(self) -> bool:
+        return self._valid
+
+    def invalidate(self):
+        """Stop delivering calls through this channel."""
+        if self._valid:
+            self._valid = False
+            self._dispatcher._drop_channel(self)
+
+    def post(self, *args, **kwargs) -> bool:
+        """
+        Post `method(*args, **kwargs)` to run on the Tk thread. Safe from background threads.
+
+        Returns:
+            bool: False if the channel is no longer valid
+        """
+        if not self._valid:
+            return False
+        self._dispatcher._enqueue(self.invoke, args, kwargs)
+        return True
+
+    def invoke(self, *args, **kwargs):
+        """Call the method now. Must run on the Tk thread."""
+        if not self._valid:
+            return
+        method = self._method()
+        if method is None:
+            self.invalidate()
+            return
+        method(*args, **kwargs)
+
+    def _on_collected(self, ref):
+        self.invalidate()
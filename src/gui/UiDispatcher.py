@@ -1,50 +1,231 @@
-from queue import Queue, Empty
+from collections import deque
+from threading import Event, Lock, Thread
+import time
 import weakref
+from gui.UiChannel import UiChannel
 
 
 class UiDispatcher:
-    """Central UI dispatcher to schedule callbacks on the tkinter main thread."""
-    def __init__(self, root, poll_ms: int = 10):
+    """Central UI dispatcher to schedule callbacks on the tkinter main thread.
+
+    Each frame runs in three lanes: coalesced key/pedal updates first, then
+    post_to() callbacks, then low-priority work from post_low(). The last two
+    lanes stop when the frame budget or the callback limit is reached, and
+    the rest is carried over to a frame scheduled right away.
+
+    With wake_on_post, frames are not polled every poll_ms. Posting from a
+    background thread signals a waker thread, which schedules one drain on
+    the Tk thread with after(0); further posts before that drain runs do not
+    schedule another. The posting thread (e.g. the MIDI handler) only sets an
+    Event, so it never waits for the Tk main loop.
+    """
+
+    # Delay before the next frame when work was carried over
+    CARRY_OVER_MS = 1
+    # Safety poll interval while idle in wake-on-post mode
+    IDLE_POLL_MS = 500
+
+    def __init__(self, root, poll_ms: int = 10, coalesce: bool = True,
+                 frame_budget_ms: float = 8.0, max_callbacks: int = 256,
+                 wake_on_post: bool = False):
+        """
+        Args:
+            root: Tk root used for after() scheduling
+            poll_ms: Interval between frames when idle
+            coalesce: Collapse post_merged()/post_latest()/post_low() updates per frame
+            frame_budget_ms: Time the post_to() and post_low() lanes may use per frame
+            max_callbacks: Maximum post_to() and post_low() callbacks per frame
+            wake_on_post: Drain when something is posted instead of polling every poll_ms
+        """
         self._root = root
-        self._queue = Queue()
+        # post_to() lane; deque append/popleft are atomic, so no lock is needed
+        self._queue = deque()
         self._poll_ms = int(poll_ms)
+        self._frame_budget = max(0.0, float(frame_budget_ms)) / 1000.0
+        self._max_callbacks = max(1, int(max_callbacks))
         self._running = False
         # optional registry of named widgets (store weakrefs)
         self._registry = {}
+        # name -> {method_name: UiChannel}, resolved once per widget
+        self._channels = {}
+        # Coalescing mode: merged/latest updates are collapsed per frame
+        self._coalesce = coalesce
+        self._pending_lock = Lock()
+        # (name, method_name) -> {key: value}, merged per key
+        self._pending_merged = {}
+        # (name, method_name) -> args, latest call wins
+        self._pending_latest = {}
+        # Low-priority lane, (name, method_name) -> args, latest call wins
+        self._pending_low = {}
+        # Number of updates dropped because a newer one replaced them
+        self.elided_count = 0
+        # Wake-on-post mode: at most one wake drain is scheduled at a time
+        self._wake_on_post = wake_on_post
+        self._wake_pending = False
+        # Set by posting threads; the waker thread turns it into an after(0) on the Tk thread
+        self._wake_event = Event()
+        self._waker = None
+        # Set while after() fails from the waker (e.g. before mainloop()); polls every poll_ms meanwhile
+        self._wake_failed = False
+        # Pending timer from after(); only touched on the Tk thread
+        self._after_id = None
 
     def _poll(self):
+        self._after_id = None
+        deadline = time.perf_counter() + self._frame_budget
+        # Priority lane: key and pedal state, always applied in full
+        self._run_coalesced()
+        remaining = self._run_queue(deadline, self._max_callbacks)
+        if remaining > 0 and time.perf_counter() < deadline:
+            self._run_low(deadline, remaining)
+
+        if self._running:
+            if self.has_pending():
+                delay = self.CARRY_OVER_MS
+            elif self._wake_on_post and not self._wake_failed:
+                delay = self.IDLE_POLL_MS
+            else:
+                delay = self._poll_ms
+            self._schedule(delay)
+
+    def _schedule(self, delay: int):
+        """Schedule the next frame on the Tk thread, replacing any pending timer."""
+        self._cancel_timer()
         try:
-            while True:
-                func, args, kwargs = self._queue.get_nowait()
+            self._after_id = self._root.after(delay, self._poll)
+        except Exception:
+            # If scheduling fails, stop polling to avoid noisy errors
+            self._running = False
+
+    def _cancel_timer(self):
+        if self._after_id is not None:
+            try:
+                self._root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def _on_wake(self):
+        """Run a frame on the Tk thread after a post from a background thread."""
+        # Clear before draining so a post made during the drain wakes again
+        self._wake_pending = False
+        if self._running:
+            # Drop the pending timer; _poll() schedules the next frame itself
+            self._cancel_timer()
+            self._poll()
+
+    def _wake(self):
+        """Ask the waker thread for a drain unless one is already pending. Never blocks."""
+        if not self._wake_on_post or not self._running or self._wake_pending:
+            return
+        self._wake_pending = True
+        self._wake_event.set()
+
+    def _run_waker(self):
+        """Waker thread: schedule a drain on the Tk thread for every wake request."""
+        while True:
+            self._wake_event.wait()
+            self._wake_event.clear()
+            if not self._running:
+                return
+            self._deliver_wake()
+
+    def _deliver_wake(self):
+        # With threaded Tcl this call waits until the Tk main loop takes it
+        try:
+            self._root.after(0, self._on_wake)
+        except Exception as e:
+            # E.g. mainloop() has not started yet; poll every poll_ms and retry on the next post
+            if not self._wake_failed:
+                print("UiDispatcher wake failed, polling until it works:", e)
+            self._wake_pending = False
+            self._wake_failed = True
+            return
+        self._wake_failed = False
+
+    def has_pending(self) -> bool:
+        """Return True if any lane still has work queued."""
+        return bool(self._pending_merged or self._pending_latest
+                    or self._pending_low or self._queue)
+
+    def _run_queue(self, deadline: float, limit: int) -> int:
+        """
+        Run post_to() callbacks until the queue is empty, the deadline passes
+        or `limit` callbacks have run.
+
+        Returns:
+            int: Number of callbacks still allowed in this frame
+        """
+        queue = self._queue
+        try:
+            while limit > 0:
+                func, args, kwargs = queue.popleft()
+                limit -= 1
                 try:
                     func(*args, **kwargs)
                 except Exception as e:
                     # Do not crash the poll loop; print for debugging.
                     print("UiDispatcher callback error:", e)
-        except Empty:
+                if time.perf_counter() >= deadline:
+                    return 0
+        except IndexError:
             pass
+        return limit
 
-        if self._running:
-            try:
-                self._root.after(self._poll_ms, self._poll)
-            except Exception:
-                # If scheduling fails, stop polling to avoid noisy errors
-                self._running = False
+    def _run_low(self, deadline: float, limit: int):
+        """Run low-priority calls, leaving the rest pending for the next frame."""
+        while limit > 0 and time.perf_counter() < deadline:
+            with self._pending_lock:
+                if not self._pending_low:
+                    return
+                key = next(iter(self._pending_low))
+                args = self._pending_low.pop(key)
+            limit -= 1
+            self._call(key[0], key[1], args)
+
+    def _run_coalesced(self):
+        """Apply the updates collected by post_merged()/post_latest() since the last frame."""
+        with self._pending_lock:
+            if not self._pending_merged and not self._pending_latest:
+                return
+            merged = self._pending_merged
+            latest = self._pending_latest
+            self._pending_merged = {}
+            self._pending_latest = {}
+
+        for (name, method_name), updates in merged.items():
+            self._call(name, method_name, (updates,))
+        for (name, method_name), args in latest.items():
+            self._call(name, method_name, args)
+
+    def _call(self, name: str, method_name: str, args: tuple):
+        channel = self.channel(name, method_name)
+        if channel is None:
+            return
+        try:
+            channel.invoke(*args)
+        except Exception as e:
+            print("UiDispatcher callback error:", e)
 
     def start(self):
         if not self._running:
             self._running = True
-            try:
-                self._root.after(self._poll_ms, self._poll)
-            except Exception:
-                self._running = False
+            self._wake_pending = False
+            if self._wake_on_post and (self._waker is None or not self._waker.is_alive()):
+                self._waker = Thread(target=self._run_waker, name="UiDispatcher waker", daemon=True)
+                self._waker.start()
+            self._schedule(self._poll_ms)
 
     def stop(self):
         self._running = False
+        # Let the waker thread exit
+        self._wake_event.set()
+        self._cancel_timer()
 
     # Registry helpers
     def register(self, name: str, widget):
         """Register a widget under `name`. Stored as a weak reference."""
+        self._invalidate_channels(name)
         try:
             self._registry[name] = weakref.ref(widget)
         except Exception:
@@ -52,15 +233,46 @@ class UiDispatcher:
 
     def unregister(self, name: str):
         self._registry.pop(name, None)
+        self._invalidate_channels(name)
 
-    def post_to(self, name: str, method_name: str, *args, **kwargs):
-        """Post a call to `widget.method_name(*args, **kwargs)` using the registered widget name.
+    def channel(self, name: str, method_name: str):
+        """Return a UiChannel for `widget.method_name`, or None if the widget is not registered.
 
-        This is safe from background threads. If the widget no longer exists, the call is ignored.
+        Channels are cached per (name, method_name) until invalidated, so callers
+        can keep the handle and post through it without any lookup.
         """
+        methods = self._channels.get(name)
+        if methods is not None:
+            channel = methods.get(method_name)
+            if channel is not None and channel.is_valid:
+                return channel
+
+        func = self._resolve(name, method_name)
+        if func is None:
+            return None
+        channel = UiChannel(self, name, method_name, func)
+        self._channels.setdefault(name, {})[method_name] = channel
+        return channel
+
+    def _invalidate_channels(self, name: str):
+        for channel in list(self._channels.pop(name, {}).values()):
+            channel.invalidate()
+
+    def _drop_channel(self, channel: UiChannel):
+        """Remove an invalidated channel from the cache."""
+        methods = self._channels.get(channel.name)
+        if methods is not None and methods.get(channel.method_name) is channel:
+            del methods[channel.method_name]
+
+    def _enqueue(self, func, args: tuple, kwargs: dict):
+        self._queue.append((func, args, kwargs))
+        self._wake()
+
+    def _resolve(self, name: str, method_name: str):
+        """Return the bound method of a registered widget, or None if it is gone."""
         ref = self._registry.get(name)
         if ref is None:
-            return
+            return None
         widget = None
         try:
             widget = ref()
@@ -70,10 +282,73 @@ class UiDispatcher:
         if widget is None:
             # Remove dead reference
             self._registry.pop(name, None)
+            return None
+
+        return getattr(widget, method_name, None)
+
+    def post_to(self, name: str, method_name: str, *args, **kwargs):
+        """Post a call to `widget.method_name(*args, **kwargs)` using the registered widget name.
+
+        This is safe from background threads. If the widget no longer exists, the call is ignored.
+        For repeated calls, keep a handle from channel() instead.
+        """
+        channel = self.channel(name, method_name)
+        if channel is None:
             return
 
-        func = getattr(widget, method_name, None)
-        if func is None:
+        channel.post(*args, **kwargs)
+
+    def post_merged(self, name: str, method_name: str, updates: dict):
+        """Post `widget.method_name(updates)`, merging with pending updates per key.
+
+        Until the next frame, updates for the same (widget, method) are merged into
+        one dict and only the last value per key is applied. Used for per-key state
+        such as `set_key_states({note: state})`.
+
+        Args:
+            name: Registered widget name
+            method_name: Method taking a single dict argument
+            updates: Mapping of key to new value
+        """
+        if not self._coalesce:
+            self.post_to(name, method_name, dict(updates))
+            return
+        with self._pending_lock:
+            pending = self._pending_merged.get((name, method_name))
+            if pending is None:
+                self._pending_merged[(name, method_name)] = dict(updates)
+            else:
+                for key, value in updates.items():
+                    if key in pending:
+                        self.elided_count += 1
+                    pending[key] = value
+        self._wake()
+
+    def post_latest(self, name: str, method_name: str, *args):
+        """Post `widget.method_name(*args)`, replacing any pending call to the same method.
+
+        Only the last call per (widget, method) inside a frame is applied.
+        """
+        if not self._coalesce:
+            self.post_to(name, method_name, *args)
             return
+        with self._pending_lock:
+            if (name, method_name) in self._pending_latest:
+                self.elided_count += 1
+            self._pending_latest[(name, method_name)] = args
+        self._wake()
+
+    def post_low(self, name: str, method_name: str, *args):
+        """Post low-priority `widget.method_name(*args)`, e.g. an image redraw.
 
-        self._queue.put((func, args, kwargs))
+        Low-priority calls run only when a frame has budget left after the other
+        lanes. A newer call to the same (widget, method) replaces a pending one.
+        """
+        if not self._coalesce:
+            self.post_to(name, method_name, *args)
+            return
+        with self._pending_lock:
+            if (name, method_name) in self._pending_low:
+                self.elided_count += 1
+            self._pending_low[(name, method_name)] = args
+        self._wake()
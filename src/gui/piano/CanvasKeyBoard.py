@@ -0,0 +1,204 @@
+import tkinter
+from config.Setting import Setting
+from midi.NoteTable import NOTE_COUNT, note_number
+from .KeyBoard import KeyBoard
+from .CatPawPedalButton import CatPawPedalButton
+
+
+class CanvasKeyBoard(tkinter.Frame):
+    """Keyboard drawn as rectangle items on a single Canvas
+
+    Has the same public API as KeyBoard. A key state change is one
+    itemconfigure() call on the canvas instead of a config() call on a
+    Button widget.
+    """
+
+    WHITE_KEY_NAME = KeyBoard.WHITE_KEY_NAME
+    BLACK_KEY_NAME = KeyBoard.BLACK_KEY_NAME
+
+    WHITE_KEY_COLOR = "white"
+    BLACK_KEY_COLOR = "black"
+    OUTLINE_COLOR = "black"
+
+    def __init__(self, master=None, setting: Setting=None, midi=None, **kargs):
+        super().__init__(master=master, **kargs)
+
+        self.setting = setting
+        self.midi = midi
+
+        self.canvas = tkinter.Canvas(self, highlightthickness=0, borderwidth=0)
+        self.canvas.bind('<Button-1>', self._on_press)
+        self.canvas.bind('<ButtonRelease-1>', self._on_release)
+
+        # MIDI note number -> canvas item id / base color / whether it is drawn active
+        self._items_by_note = [None] * NOTE_COUNT
+        self._base_colors = [None] * NOTE_COUNT
+        self._active = [False] * NOTE_COUNT
+        # Note numbers in drawing order; "" slots in BLACK_KEY_NAME are -1
+        self.white_notes = [note_number(name) for octabe in self.WHITE_KEY_NAME for name in octabe]
+        self.black_notes = [note_number(name) for octabe in self.BLACK_KEY_NAME for name in octabe]
+        self._pressed_note = -1
+
+        # White keys first so black keys are drawn on top
+        for note in self.white_notes:
+            self._create_key(note, self.WHITE_KEY_COLOR)
+        for note in self.black_notes:
+            if note >= 0:
+                self._create_key(note, self.BLACK_KEY_COLOR)
+
+        self.sustain = CatPawPedalButton(self, setting=setting)
+
+        # Key width the rectangles were laid out for, last pedal geometry and the pending resize
+        self._layout_key_width = None
+        self._sustain_geometry = None
+        self._pending_size = None
+        self._resize_scheduled = False
+
+        self._apply_resize(self.setting.gui.Width, self.setting.gui.Height)
+
+    def set_key_state(self, note: int, state: str):
+        item = self._find_key(note)
+        if item is None:
+            return
+        active = (state == tkinter.ACTIVE)
+        if self._active[note] == active:
+            return
+        color = self.setting.gui.KeyPushedColor if active else self._base_colors[note]
+        try:
+            self.canvas.itemconfigure(item, fill=color)
+            self._active[note] = active
+        except Exception as e:
+            print(f"Error setting {note} state: {e}")
+
+    def set_key_states(self, states: dict):
+        """Apply several key states in one call
+
+        Args:
+            states (dict): Mapping of MIDI note number to state
+        """
+        for note, state in states.items():
+            self.set_key_state(note, state)
+
+    def set_sustain(self, pressed: bool):
+        state = tkinter.ACTIVE if pressed else tkinter.NORMAL
+        try:
+            self.sustain.config(state=state)
+        except Exception as e:
+            print(f"Error setting sustain state: {e}")
+
+    def resize_keyboard(self, width: int, height: int):
+        """Resize the keyboard with the given width and height
+
+        The layout is applied once at the next idle point, like KeyBoard.
+
+        Args:
+            width (int): The new width of the keyboard (in pixels)
+            height (int): The new height of the keyboard (in pixels)
+            Note: height is currently unused; dimensions derive from width.
+        """
+        self._pending_size = (width, height)
+        if self._resize_scheduled:
+            return
+        try:
+            self.after_idle(self._on_idle_resize)
+            self._resize_scheduled = True
+        except Exception:
+            # No event loop to defer to; resize now
+            self._on_idle_resize()
+
+    def _on_idle_resize(self):
+        self._resize_scheduled = False
+        size = self._pending_size
+        self._pending_size = None
+        if size is not None:
+            self._apply_resize(*size)
+
+    def _apply_resize(self, width: int, height: int):
+        self._calculate_dimensions(width)
+        self.config(width=self.width, height=self.height)
+        self._place_keyboard()
+
+    def _get_white_key_num(self) -> int:
+        return len(self.white_notes)
+
+    def _find_key(self, note: int):
+        """Return the canvas item id of `note`, or None."""
+        if note < 0:
+            return None
+        item = self._items_by_note[note] if note < NOTE_COUNT else None
+        if item is None:
+            print("No such a key")
+        return item
+
+    def _create_key(self, note: int, color: str):
+        item = self.canvas.create_rectangle(0, 0, 0, 0, fill=color, outline=self.OUTLINE_COLOR)
+        self._items_by_note[note] = item
+        self._base_colors[note] = color
+
+    def _calculate_dimensions(self, width: int):
+        """Calculate and store key and pedal dimensions based on width."""
+        self.setting.gui.Width = width
+        self.KEY_WIDTH = int(width / self._get_white_key_num())
+        self.KEY_HEIGHT = self.KEY_WIDTH * 5
+        self.PEDAL_WIDTH = self.KEY_WIDTH * 3
+        self.PEDAL_HEIGHT = self.KEY_WIDTH * 3
+        self.BLACK_KEY_WIDTH = self.KEY_WIDTH / 2
+        self.BLACK_KEY_HEIGHT = self.KEY_HEIGHT * 0.6
+        self.width = width
+        self.height = self.KEY_HEIGHT + self.PEDAL_HEIGHT
+
+    def _key_rect(self, note: int) -> tuple:
+        """Return (x0, y0, x1, y1) of `note` with the current dimensions."""
+        if note in self.white_notes:
+            x = self.white_notes.index(note) * self.KEY_WIDTH
+            return (x, 0, x + self.KEY_WIDTH, self.KEY_HEIGHT)
+        x = self.black_notes.index(note) * self.KEY_WIDTH + self.BLACK_KEY_WIDTH * 1.5
+        return (x, 0, x + self.BLACK_KEY_WIDTH, self.BLACK_KEY_HEIGHT)
+
+    def _place_keyboard(self):
+        self.canvas.place(x=0, y=0, width=self.width, height=self.KEY_HEIGHT)
+        # Key rectangles depend only on the key width
+        if self.KEY_WIDTH != self._layout_key_width:
+            for note in self.white_notes + self.black_notes:
+                if note >= 0:
+                    self.canvas.coords(self._items_by_note[note], *self._key_rect(note))
+            self._layout_key_width = self.KEY_WIDTH
+
+        # Place sustain pedal
+        geometry = (self.setting.gui.Width / 2, self.KEY_HEIGHT, self.PEDAL_WIDTH, self.PEDAL_HEIGHT)
+        if geometry != self._sustain_geometry:
+            x, y, width, height = geometry
+            self.sustain.place(x=x, y=y, width=width, height=height)
+            self._sustain_geometry = geometry
+
+    def _note_at(self, x: float, y: float) -> int:
+        """Return the note under canvas position (x, y), or -1."""
+        if y < 0 or y >= self.KEY_HEIGHT or self.KEY_WIDTH <= 0:
+            return -1
+        # Black keys are on top
+        if y < self.BLACK_KEY_HEIGHT:
+            slot = int((x - self.BLACK_KEY_WIDTH * 1.5) // self.KEY_WIDTH)
+            if 0 <= slot < len(self.black_notes) and self.black_notes[slot] >= 0:
+                x0 = slot * self.KEY_WIDTH + self.BLACK_KEY_WIDTH * 1.5
+                if x0 <= x < x0 + self.BLACK_KEY_WIDTH:
+                    return self.black_notes[slot]
+        index = int(x // self.KEY_WIDTH)
+        if 0 <= index < len(self.white_notes):
+            return self.white_notes[index]
+        return -1
+
+    def _on_press(self, event):
+        note = self._note_at(event.x, event.y)
+        if note < 0:
+            return
+        self._pressed_note = note
+        if self.midi:
+            self.midi.add_key_event(note, True)
+
+    def _on_release(self, event):
+        note = self._pressed_note
+        if note < 0:
+            return
+        self._pressed_note = -1
+        if self.midi:
+            self.midi.add_key_event(note, False)
@@ -21,6 +21,10 @@ class CatPawPedalButton(tkinter.Frame):
         self.canvas.bind('<ButtonRelease-1>', self._on_release)
         self.canvas.bind('<Configure>', self._on_configure)
 
+        # Oval item ids, and the canvas size and colour they were drawn with
+        self._items = []
+        self._size = None
+        self._color = None
         self._draw_paw()
 
     def config(self, **kwargs):
@@ -28,12 +32,15 @@ class CatPawPedalButton(tkinter.Frame):
         if 'state' in kwargs:
             state = kwargs.pop('state')
             self.is_pressed = (state == tkinter.ACTIVE)
-            self._draw_paw()
+            self._update_fill()
         super().config(**kwargs)
 
     def _draw_paw(self):
-        self.canvas.delete("all")
+        """Lay out the paw for the current canvas size and apply the fill colour.
 
+        The ovals are created once; later calls move them with coords() only
+        when the canvas size has changed.
+        """
         width = self.canvas.winfo_width()
         height = self.canvas.winfo_height()
 
@@ -41,8 +48,35 @@ class CatPawPedalButton(tkinter.Frame):
             width = 100
             height = 100
 
-        # Determine the color of paw print
-        color = self.setting.gui.KeyPushedColor if self.is_pressed else "white"
+        if (width, height) != self._size:
+            shapes = self._paw_shapes(width, height)
+            if not self._items:
+                color = self._fill_color()
+                for coords, outline in shapes:
+                    item = self.canvas.create_oval(*coords, fill=color, outline=outline, width=0)
+                    self._items.append(item)
+                self._color = color
+            else:
+                for item, (coords, outline) in zip(self._items, shapes):
+                    self.canvas.coords(item, *coords)
+            self._size = (width, height)
+
+        self._update_fill()
+
+    def _update_fill(self):
+        """Recolour the existing ovals if the pressed state changed."""
+        color = self._fill_color()
+        if color == self._color or not self._items:
+            return
+        for item in self._items:
+            self.canvas.itemconfigure(item, fill=color)
+        self._color = color
+
+    def _fill_color(self) -> str:
+        return self.setting.gui.KeyPushedColor if self.is_pressed else "white"
+
+    def _paw_shapes(self, width: float, height: float) -> list:
+        """Return the paw ovals as (coords, outline) for a canvas of the given size."""
         outline_color = "black"
 
         # Large paw pad (Center)
@@ -51,87 +85,28 @@ class CatPawPedalButton(tkinter.Frame):
         center_x = width / 2
         center_y = height / 2
 
-        self.canvas.create_oval(
-            center_x - pad_rad,
-            center_y - pad_rad,
-            center_x + pad_rad,
-            center_y + pad_rad,
-            fill=color,
-            outline=None,
-            width=0
-        )
-        self.canvas.create_oval(
-            center_x + pad_size,
-            center_y + pad_size,
-            center_x,
-            center_y,
-            fill=color,
-            outline=None,
-            width=0
-        )
-        self.canvas.create_oval(
-            center_x,
-            center_y + pad_size,
-            center_x - pad_size,
-            center_y,
-            fill=color,
-            outline=None,
-            width=0
-        )
-
-
-        # Small paw pad (Left)
-        self.canvas.create_oval(
-            pad_rad,
-            pad_size,
-            0,
-            center_y + pad_rad,
-            fill=color,
-            outline=outline_color,
-            width=0
-        )
-
-        # Small paw pad (Left Top)
-        self.canvas.create_oval(
-            center_x - pad_rad / 2,
-            0,
-            pad_rad * 1.5,
-            pad_size,
-            fill=color,
-            outline=outline_color,
-            width=0
-        )
-
-        # Small paw pad (Right Top)
-        self.canvas.create_oval(
-            center_x + 1.5 * pad_rad,
-            0,
-            center_x + pad_rad / 2,
-            pad_size,
-            fill=color,
-            outline=outline_color,
-            width=0
-        )
-
-        # Small paw pad (Right)
-        self.canvas.create_oval(
-            center_x + pad_size * 1.5,
-            pad_size,
-            center_x + pad_size,
-            center_y + pad_rad,
-            fill=color,
-            outline=outline_color,
-            width=0
-        )
+        return [
+            ((center_x - pad_rad, center_y - pad_rad, center_x + pad_rad, center_y + pad_rad), None),
+            ((center_x + pad_size, center_y + pad_size, center_x, center_y), None),
+            ((center_x, center_y + pad_size, center_x - pad_size, center_y), None),
+            # Small paw pad (Left)
+            ((pad_rad, pad_size, 0, center_y + pad_rad), outline_color),
+            # Small paw pad (Left Top)
+            ((center_x - pad_rad / 2, 0, pad_rad * 1.5, pad_size), outline_color),
+            # Small paw pad (Right Top)
+            ((center_x + 1.5 * pad_rad, 0, center_x + pad_rad / 2, pad_size), outline_color),
+            # Small paw pad (Right)
+            ((center_x + pad_size * 1.5, pad_size, center_x + pad_size, center_y + pad_rad), outline_color),
+        ]
 
     def _on_press(self, event):
         self.is_pressed = True
-        self._draw_paw()
+        self._update_fill()
 
     def _on_release(self, event):
         self.is_pressed = False
-        self._draw_paw()
+        self._update_fill()
 
     def _on_configure(self, event):
-        """Redraw paw print when resizing button"""
+        """Move the paw ovals when the button is resized"""
         self._draw_paw()
@@ -1,5 +1,6 @@
 import tkinter
 from config.Setting import Setting
+from midi.NoteTable import note_number
 
 
 class Key(tkinter.Button):
@@ -7,17 +8,18 @@ class Key(tkinter.Button):
         super().__init__(master=master, **kargs)
         self.config(activebackground=setting.gui.KeyPushedColor)
         self.name = name
+        self.note = note_number(name)
         self.midi = midi
         self.bind('<Button-1>', self._on_press)
         self.bind('<ButtonRelease-1>', self._on_release)
 
     def _on_press(self, event):
         if self.midi:
-            self.midi.add_key_event(self.name, True)
+            self.midi.add_key_event(self.note, True)
 
     def _on_release(self, event):
         if self.midi:
-            self.midi.add_key_event(self.name, False)
+            self.midi.add_key_event(self.note, False)
 
 
 class WhiteKey(Key):
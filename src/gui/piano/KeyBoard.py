@@ -1,5 +1,6 @@
 import tkinter
 from config.Setting import Setting
+from midi.NoteTable import NOTE_COUNT
 from .Key import Key, WhiteKey, BlackKey
 from .CatPawPedalButton import CatPawPedalButton
 
@@ -37,15 +38,35 @@ class KeyBoard(tkinter.Frame):
         self.black_keys = [BlackKey(self, name=key, setting=setting, midi=self.midi) for octabe in self.BLACK_KEY_NAME for key in octabe]
         self.keys = self.white_keys + self.black_keys
 
+        # MIDI note number -> key widget
+        self._keys_by_note = [None] * NOTE_COUNT
+        for key in self.keys:
+            if key.note >= 0:
+                self._keys_by_note[key.note] = key
+
         self.sustain = CatPawPedalButton(self, setting=setting)
 
-        self.resize_keyboard(self.setting.gui.Width, self.setting.gui.Height)
+        # Last geometry passed to place() per widget, and the pending resize
+        self._placed = {}
+        self._pending_size = None
+        self._resize_scheduled = False
+
+        self._apply_resize(self.setting.gui.Width, self.setting.gui.Height)
 
-    def set_key_state(self, name: str, state: str):
-        key = self._find_key(name)
+    def set_key_state(self, note: int, state: str):
+        key = self._find_key(note)
         if key is None:
             return
-        self._safe_configure_key(key, state, key_name=name)
+        self._safe_configure_key(key, state, key_name=key.name)
+
+    def set_key_states(self, states: dict):
+        """Apply several key states in one call
+
+        Args:
+            states (dict): Mapping of MIDI note number to state
+        """
+        for note, state in states.items():
+            self.set_key_state(note, state)
 
     def set_sustain(self, pressed: bool):
         state = tkinter.ACTIVE if pressed else tkinter.NORMAL
@@ -54,14 +75,38 @@ class KeyBoard(tkinter.Frame):
     def resize_keyboard(self, width: int, height: int):
         """Resize the keyboard with the given width and height
 
+        The layout is applied once at the next idle point; repeated calls
+        before that only replace the requested size.
+
         Args:
             width (int): The new width of the keyboard (in pixels)
             height (int): The new height of the keyboard (in pixels)
             Note: height is currently unused; dimensions derive from width.
         """
+        self._pending_size = (width, height)
+        if self._resize_scheduled:
+            return
+        try:
+            self.after_idle(self._on_idle_resize)
+            self._resize_scheduled = True
+        except Exception:
+            # No event loop to defer to; resize now
+            self._on_idle_resize()
+
+    def _on_idle_resize(self):
+        self._resize_scheduled = False
+        size = self._pending_size
+        self._pending_size = None
+        if size is not None:
+            self._apply_resize(*size)
+
+    def _apply_resize(self, width: int, height: int):
+        """Recalculate the layout and re-place only the widgets that moved."""
+        old_size = (getattr(self, "width", None), getattr(self, "height", None))
         self._calculate_dimensions(width)
-        self._update_frame_size()
-        self._place_keyboard()
+        if (self.width, self.height) != old_size:
+            self._update_frame_size()
+        self._place_keyboard(changed_only=True)
 
     def _get_white_key_num(self)->int:
         num_white_key = 0
@@ -69,14 +114,13 @@ class KeyBoard(tkinter.Frame):
             num_white_key += len(keys)
         return num_white_key
 
-    def _find_key(self, name: str)->Key:
-        if name == "":
+    def _find_key(self, note: int)->Key:
+        if note < 0:
             return None
-        for key in self.keys:
-            if name == key.name:
-                return key
-        print("No such a key")
-        return None
+        key = self._keys_by_note[note] if note < NOTE_COUNT else None
+        if key is None:
+            print("No such a key")
+        return key
 
     def _safe_configure_key(self, key, state: str, key_name: str = None) -> bool:
         """Safely configure a key state with error handling
@@ -115,17 +159,34 @@ class KeyBoard(tkinter.Frame):
         """Apply calculated dimensions to the frame."""
         self.config(width=self.width, height=self.height)
 
-    def _place_keyboard(self):
-        # Place white key
+    def _layout_table(self) -> list:
+        """Return (widget, (x, y, width, height)) for every placed widget with the current dimensions."""
+        table = []
+        # White key
         for i, key in enumerate(self.white_keys):
-            key.place(x=i * self.KEY_WIDTH, y=0, width=self.KEY_WIDTH, height=self.KEY_HEIGHT)
+            table.append((key, (i * self.KEY_WIDTH, 0, self.KEY_WIDTH, self.KEY_HEIGHT)))
 
-        # Place black key
+        # Black key
         for i, key in enumerate(self.black_keys):
             if key.name == "":
                 continue
-            key.place(x=i * self.KEY_WIDTH + self.BLACK_KEY_WIDTH * 1.5, y=0, width=self.BLACK_KEY_WIDTH, height=self.BLACK_KEY_HEIGHT)
+            table.append((key, (i * self.KEY_WIDTH + self.BLACK_KEY_WIDTH * 1.5, 0, self.BLACK_KEY_WIDTH, self.BLACK_KEY_HEIGHT)))
+
+        # Sustain pedal
+        table.append((self.sustain, (self.setting.gui.Width / 2, self.KEY_HEIGHT, self.PEDAL_WIDTH, self.PEDAL_HEIGHT)))
+        return table
 
-        # Place sustain pedal
-        self.sustain.place(x=self.setting.gui.Width / 2, y=self.KEY_HEIGHT, width=self.PEDAL_WIDTH, height=self.PEDAL_HEIGHT)
+    def _place_keyboard(self, changed_only: bool = False):
+        """Place the keys and the pedal
+
+        Args:
+            changed_only (bool): Skip widgets whose geometry is unchanged since the last placement
+        """
+        placed = self._placed
+        for widget, geometry in self._layout_table():
+            if changed_only and placed.get(id(widget)) == geometry:
+                continue
+            x, y, width, height = geometry
+            widget.place(x=x, y=y, width=width, height=height)
+            placed[id(widget)] = geometry
 
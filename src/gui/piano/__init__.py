@@ -1,6 +1,7 @@
 # Package initialization
 from .KeyBoard import KeyBoard
+from .CanvasKeyBoard import CanvasKeyBoard
 from .Key import Key, WhiteKey, BlackKey
 from .CatPawPedalButton import CatPawPedalButton
 
-__all__ = ['KeyBoard', 'Key', 'WhiteKey', 'BlackKey', 'CatPawPedalButton']
\ No newline at end of file
+__all__ = ['KeyBoard', 'CanvasKeyBoard', 'Key', 'WhiteKey', 'BlackKey', 'CatPawPedalButton']
\ No newline at end of file
@@ -49,6 +49,42 @@ class MidiBackend(ABC):
         pass
 
     @abstractmethod
-    def create_output(self, device_id: int) -> Any:
-        """Create and return a MIDI output device object."""
+    def create_output(self, device_id: int, latency: int = 0) -> Any:
+        """
+        Create and return a MIDI output device object.
+
+        With latency > 0 (ms), write() honours event timestamps on the
+        get_time_ms() clock; with 0, timestamps are ignored.
+        """
         pass
+
+    def supports_timestamps(self) -> bool:
+        """
+        Return True if outputs can deliver events at get_time_ms() timestamps.
+
+        MidiFilePlayer only uses lookahead scheduling on such backends.
+        """
+        return False
+
+    def get_time_ms(self) -> int:
+        """Return the clock that output timestamps refer to, in milliseconds."""
+        return 0
+
+    def supports_blocking_input(self) -> bool:
+        """
+        Return True if wait_for_input() can block until input data arrives.
+
+        Backends that cannot block keep this default, and MidiReceiver falls
+        back to polling the input device.
+        """
+        return False
+
+    def wait_for_input(self, midiin: Any, timeout: float) -> bool:
+        """
+        Block until `midiin` has data to read or `timeout` seconds elapse.
+        Return True if data is available.
+
+        The default implementation does not block; it only reports the
+        current poll() result.
+        """
+        return bool(midiin.poll())
@@ -1,10 +1,13 @@
 from threading import Lock
-from queue import Queue
 from gui.piano.KeyBoard import KeyBoard
 from enum import IntEnum
 from midi.MidiReceiver import MidiReceiver
 from midi.MidiHandler import MidiHandler
 from midi.MidiBackend import MidiBackend
+from midi.MidiLifecycle import MidiLifecycle
+from midi.MidiEvent import pack_event
+from midi.MidiRingBuffer import MidiEventQueue
+from midi.NoteTable import NOTE_COUNT
 
 
 class MidiDeviceInfo(IntEnum):
@@ -24,15 +27,20 @@ class MidiController:
     while managing MIDI device connections and dispatching UI updates.
     """
     
+    # Output latency (ms) on backends with timestamp support, so timestamped writes are honoured
+    OUTPUT_LATENCY_MS = 1
+
     def __init__(self, midi_backend: MidiBackend,dispatcher=None):
         self.midi_backend = midi_backend
         self.midi_backend.init()
 
         self.dispatcher = dispatcher
+        # Serializes device (re)connection
         self.lock = Lock()
-        self.event_queue = Queue()
-        self.start = False
-        self.end = False
+        self.event_queue = MidiEventQueue()
+        # Producer ring for key events posted from the GUI thread
+        self._key_events = self.event_queue.create_producer()
+        self.lifecycle = MidiLifecycle()
         self.midiin = None
         self.midiout = None
 
@@ -45,23 +53,46 @@ class MidiController:
             info = self.midi_backend.get_device_info(i)
             self.midi_info.append(info)
 
-        # Create MidiReceiver and MidiHandler with closures to access self.start and self.end
+        # Create MidiReceiver and MidiHandler sharing the lifecycle signals
         self.receiver = MidiReceiver(
             event_queue=self.event_queue,
-            lock=self.lock,
-            start_flag_getter=lambda: self.start,
-            end_flag_getter=lambda: self.end
+            lifecycle=self.lifecycle,
+            midi_backend=self.midi_backend
         )
         
         self.handler = MidiHandler(
             event_queue=self.event_queue,
-            lock=self.lock,
-            end_flag_getter=lambda: self.end,
-            dispatcher=self.dispatcher
+            lifecycle=self.lifecycle,
+            dispatcher=self.dispatcher,
+            midi_backend=self.midi_backend
         )
 
         self.connect()
 
+    @property
+    def start(self) -> bool:
+        """True while MIDI devices are connected."""
+        return self.lifecycle.is_started()
+
+    @start.setter
+    def start(self, value: bool):
+        self.lifecycle.set_started(bool(value))
+
+    @property
+    def end(self) -> bool:
+        """True once shutdown has been requested."""
+        return self.lifecycle.is_ended()
+
+    @end.setter
+    def end(self, value: bool):
+        if value:
+            self.lifecycle.shutdown()
+
+    def shutdown(self):
+        """Request all MIDI worker threads to exit."""
+        self.lifecycle.shutdown()
+        self.event_queue.wake()
+
     def init_keyboard(self, keyboard: KeyBoard):
         """Forward keyboard to the handler; controller does not keep it as a member."""
         try:
@@ -88,7 +119,8 @@ class MidiController:
                 if self.midi_in_id != -1:
                     self.midiin = self.midi_backend.create_input(self.midi_in_id)
                 if self.midi_out_id != -1:
-                    self.midiout = self.midi_backend.create_output(self.midi_out_id)
+                    latency = self.OUTPUT_LATENCY_MS if self.midi_backend.supports_timestamps() else 0
+                    self.midiout = self.midi_backend.create_output(self.midi_out_id, latency=latency)
 
                 # Pass devices to receiver and handler
                 try:
@@ -113,18 +145,19 @@ class MidiController:
         except Exception:
             pass
 
-    def add_key_event(self, key_name: str, is_note_on: bool, velocity: int = 100):
+    def add_key_event(self, note: int, is_note_on: bool, velocity: int = 100):
         """
         Add a key event to the event queue (for testing or manual key presses).
+
+        Args:
+            note: MIDI note number
+            is_note_on: True for Note On, False for Note Off
+            velocity: Note On velocity (0-127)
         """
-        # Find the MIDI note number for the key name using handler mapping
-        try:
-            note_num = self.handler.NOTE_NAME.index(key_name)
-        except Exception:
+        if not 0 <= note < NOTE_COUNT:
             return
 
         status = 0x90 if is_note_on else 0x80
         data2 = velocity if is_note_on else 0
 
-        event = ([status, note_num, data2, 0], 0)
-        self.event_queue.put(event)
+        self._key_events.push(pack_event(status, note, data2))
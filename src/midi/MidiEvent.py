@@ -0,0 +1,67 @@
+from array import array
+
+# A short MIDI message packed into one 32-bit word, using the same byte
+# order as PortMidi: status in bits 0-7, data1 in bits 8-15, data2 in 16-23.
+# Bits 24-31 carry routing flags for MidiHandler.
+
+# Send to the output device only, at the event's timestamp (device clock ms)
+FLAG_OUTPUT_ONLY = 1 << 24
+# Update the UI only; the output device already got the event
+FLAG_DISPLAY_ONLY = 1 << 25
+
+
+def pack_event(status: int, data1: int = 0, data2: int = 0) -> int:
+    """Pack a short MIDI message into a 32-bit word."""
+    return (status & 0xFF) | ((data1 & 0xFF) << 8) | ((data2 & 0xFF) << 16)
+
+
+def unpack_event(word: int) -> tuple:
+    """Unpack a 32-bit word into (status, data1, data2)."""
+    return (word & 0xFF, (word >> 8) & 0xFF, (word >> 16) & 0xFF)
+
+
+class MidiEventBatch:
+    """
+    Array-backed batch of packed MIDI events.
+
+    Events are stored as packed words plus float timestamps in two parallel
+    arrays, so a batch costs a fixed number of objects however many events
+    it holds.
+    """
+
+    __slots__ = ('words', 'times')
+
+    def __init__(self):
+        self.words = array('I')
+        self.times = array('d')
+
+    def append(self, word: int, timestamp: float = 0.0):
+        """Append a packed event."""
+        self.words.append(word)
+        self.times.append(timestamp)
+
+    def extend_raw(self, events: list):
+        """
+        Append events in the pygame.midi read() format.
+
+        Args:
+            events: List of ([status, data1, data2, data3], timestamp)
+        """
+        words = self.words
+        times = self.times
+        for data, timestamp in events:
+            words.append((data[0] & 0xFF) | ((data[1] & 0xFF) << 8) | ((data[2] & 0xFF) << 16))
+            times.append(timestamp)
+
+    def clear(self):
+        """Remove all events."""
+        del self.words[:]
+        del self.times[:]
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __iter__(self):
+        """Iterate over events as (status, data1, data2, timestamp)."""
+        for word, timestamp in zip(self.words, self.times):
+            yield (word & 0xFF, (word >> 8) & 0xFF, (word >> 16) & 0xFF, timestamp)
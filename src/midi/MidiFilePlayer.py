@@ -1,7 +1,16 @@
+import os
 import time
-from threading import Lock
-from queue import Queue
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import compress
+from threading import Event, Lock
 import mido
+from midi.MidiLifecycle import MidiLifecycle
+from midi.MidiRingBuffer import MidiEventQueue
+from midi.MidiEvent import pack_event, FLAG_OUTPUT_ONLY, FLAG_DISPLAY_ONLY
+from midi.MidiTimeline import MidiTimeline, SUSTAIN_CONTROL
+from midi.PlaybackClock import PlaybackClock
+from midi.SmfDecoder import SmfDecoder
 
 class MidiFilePlayer:
     """
@@ -11,25 +20,85 @@ class MidiFilePlayer:
     used interchangeably by code that expects an external MIDI source.
     """
 
-    def __init__(self, event_queue: Queue, lock: Lock, start_flag_getter, end_flag_getter):
+    # Number of parsed files kept in the timeline cache
+    TIMELINE_CACHE_SIZE = 4
+    # Compiled events kept ready ahead of the play position while a file is still compiling
+    COMPILE_WINDOW = 65536
+    # Only compile ahead of a full window when the next event is at least this far away (seconds)
+    COMPILE_SLACK = 0.005
+    # Lookahead (seconds) used when the output backend supports timestamped writes
+    DEFAULT_LOOKAHEAD = 0.03
+    # A loop end passed later than this (seconds) restarts the clock at the loop start instead of wrapping
+    LOOP_WRAP_TOLERANCE = 0.02
+
+    def __init__(self, event_queue: MidiEventQueue, lifecycle: MidiLifecycle, compile_window: int = COMPILE_WINDOW, timeline_cache=None):
         """
         Args:
-            event_queue: Queue to put parsed MIDI events into
-            lock: Lock for coordinating access to start/end flags
-            start_flag_getter: Callable that returns whether playback should start
-            end_flag_getter: Callable that returns whether the app is shutting down
+            event_queue: MidiEventQueue to push parsed events into
+            lifecycle: Shared start/end signalling
+            compile_window: Events compiled ahead of the play position (see COMPILE_WINDOW)
+            timeline_cache: Optional MidiTimelineCache persisting compiled timelines across sessions
         """
+        self.timeline_cache = timeline_cache
+        # path -> timeline decoded in this session and not yet written to timeline_cache
+        self._unsaved = {}
+        self.compile_window = max(int(compile_window), MidiTimeline.COMPILE_CHUNK)
         self.event_queue = event_queue
-        self.lock = lock
-        self.get_start_flag = start_flag_getter
-        self.get_end_flag = end_flag_getter
+        # File playback can wait for the handler, so a full ring never drops note-offs
+        self._ring = event_queue.create_producer(block=True, abort=lifecycle.is_ended)
+        self.lifecycle = lifecycle
+        # Guards playback state changed from the GUI thread
+        self.lock = Lock()
 
         self._file_path = None
         self._loop = False
         self._playing = False
         self._paused = False
-        self._paused_tick = 0
-        self._paused_tempo = 500000
+        # Index of the next timeline event to play after a pause
+        self._paused_index = 0
+        # Pending seek as ('seconds', value) or ('tick', value), applied by the player thread
+        self._seek_target = None
+        # Set to cut a wait between events short (seek, pause, stop)
+        self._interrupt = Event()
+        self._clock = PlaybackClock(self._interrupt)
+        # Notes (velocity by channel << 7 | note) and CC64 per channel sent but not yet released
+        self._sounding = bytearray(16 * 128)
+        self._sustain = bytearray(16)
+        # path -> ((mtime_ns, size), MidiTimeline), oldest first
+        self._timelines = {}
+
+        # Lookahead output scheduling (see set_lookahead), disabled while _lookahead is 0
+        self._lookahead = 0.0
+        self._device_clock = None
+        self._output_latency_ms = 0
+        # Device clock used by the current pass, or None when it does not send ahead
+        self._output_clock = None
+        # Notes and CC64 sent ahead to the output but not yet released
+        self._sent = bytearray(16 * 128)
+        self._sent_sustain = bytearray(16)
+        # perf_counter() time the last event sent ahead is due, and its device timestamp (ms)
+        self._output_until = 0.0
+        self._last_output_ms = 0.0
+        # Last reading of the device clock (ms), to notice when it restarts, and whether reading it failed
+        self._last_device_ms = 0.0
+        self._output_clock_failed = False
+
+        # Mute/solo settings (see set_track_mute), applied by the player thread
+        self._muted_tracks = set()
+        self._soloed_tracks = set()
+        self._muted_channels = set()
+        self._soloed_channels = set()
+        self._mute_solo_changed = False
+        # Voices enabled by mute/solo and the event mask over the current timeline
+        # (see MidiTimeline.voice_mask); both None while everything plays
+        self._enabled = None
+        self._mask = None
+
+        # A-B loop region as ('seconds' | 'bar', start, end), applied by the player thread
+        self._loop_region = None
+        self._loop_region_changed = False
+        # (mask, notes, sustain) chased at the loop start, computed once per region and mask
+        self._loop_state = None
 
     def run(self):
         """
@@ -37,14 +106,10 @@ class MidiFilePlayer:
         After playback finishes (or start flag is cleared), return to waiting.
         """
         try:
-            while True:
-                with self.lock:
-                    if self.get_end_flag():
-                        break
-
+            while not self.lifecycle.is_ended():
                 # if no file configured or playback not requested, wait briefly
                 if not self._file_path or not self._playing:
-                    time.sleep(0.1)
+                    self.lifecycle.wait_ended(0.1)
                     continue
 
                 # Play the configured file (handles looping internally)
@@ -55,10 +120,11 @@ class MidiFilePlayer:
             print("MIDI file player thread exit")
 
     def play(self):
-        """Request playback start. Returns True if playback was requested."""
+        """Request playback start. After a pause, playback continues from the paused position. Returns True if playback was requested."""
         with self.lock:
             if not self._file_path:
                 return False
+            self._paused = False
             self._playing = True
             return True
 
@@ -68,13 +134,13 @@ class MidiFilePlayer:
             if self._playing and not self._paused:
                 self._paused = True
                 self._playing = False
+        self._interrupt.set()
 
     def resume(self):
         """Resume playback from paused position."""
         with self.lock:
             if self._paused and not self._playing:
-                # Reset pause position since we're resuming from the saved tick
-                # The next iteration of _play_file will use _paused_tick/tempo
+                # The next iteration of _play_file resumes from _paused_index
                 self._paused = False
                 self._playing = True
 
@@ -83,8 +149,152 @@ class MidiFilePlayer:
         with self.lock:
             self._playing = False
             self._paused = False
-            self._paused_tick = 0
-            self._paused_tempo = 500000
+            self._paused_index = 0
+            self._seek_target = None
+        self._interrupt.set()
+
+    def seek(self, seconds: float):
+        """
+        Move the playback position to `seconds` from the start of the file.
+
+        Sounding notes are released, and the notes and sustain pedal that are
+        down at the target are sent again. While paused or stopped, the
+        target becomes the position the next play()/resume() starts from.
+        """
+        with self.lock:
+            self._seek_target = ('seconds', max(0.0, float(seconds)))
+        self._interrupt.set()
+
+    def seek_tick(self, tick: int):
+        """Move the playback position to absolute `tick`. See seek()."""
+        with self.lock:
+            self._seek_target = ('tick', max(0, int(tick)))
+        self._interrupt.set()
+
+    def set_speed(self, speed: float) -> float:
+        """
+        Set the playback speed (1.0 = file tempo), also during playback.
+
+        The compiled timeline is only rescaled by the playback clock, so the
+        file is not re-parsed and the position does not jump.
+
+        Args:
+            speed: Speed factor, clamped to 0.25..4.0
+
+        Returns:
+            float: The speed that was applied
+        """
+        speed = self._clock.set_speed(speed)
+        # Recompute the deadline of the event being waited for
+        self._interrupt.set()
+        return speed
+
+    def set_lookahead(self, seconds: float, device_clock=None, latency_ms: int = 0):
+        """
+        Send file events to the output device `seconds` early with exact timestamps.
+
+        Output events are pushed flagged FLAG_OUTPUT_ONLY with device clock
+        timestamps, and the same events flagged FLAG_DISPLAY_ONLY at their
+        nominal time for the UI, so thread scheduling jitter no longer
+        reaches the audio. Takes effect from the next pass.
+
+        Args:
+            seconds: Lookahead in seconds; 0 disables it
+            device_clock: Callable returning the output timestamp clock in ms (MidiBackend.get_time_ms)
+            latency_ms: Latency the output device was opened with; subtracted from timestamps
+        """
+        with self.lock:
+            self._lookahead = max(0.0, float(seconds)) if device_clock is not None else 0.0
+            self._device_clock = device_clock
+            self._output_latency_ms = latency_ms
+
+    def set_track_mute(self, track: int, muted: bool = True):
+        """
+        Mute or unmute a track of the file, also during playback.
+
+        Mute/solo is applied as a precomputed mask over the compiled
+        timeline, so muted events cost nothing while playing. A change
+        during playback releases the notes of voices that were turned off
+        and sends the held notes of voices that were turned on.
+
+        Args:
+            track: Track index in the file (0 = first track)
+            muted: True to mute, False to unmute
+        """
+        self._set_mute_solo(self._muted_tracks, self._check_track(track), muted)
+
+    def set_track_solo(self, track: int, soloed: bool = True):
+        """Solo or unsolo a track. While any track is soloed, only soloed tracks play. See set_track_mute()."""
+        self._set_mute_solo(self._soloed_tracks, self._check_track(track), soloed)
+
+    def set_channel_mute(self, channel: int, muted: bool = True):
+        """Mute or unmute a MIDI channel (0-15) across all tracks. See set_track_mute()."""
+        self._set_mute_solo(self._muted_channels, self._check_channel(channel), muted)
+
+    def set_channel_solo(self, channel: int, soloed: bool = True):
+        """Solo or unsolo a MIDI channel (0-15). While any channel is soloed, only soloed channels play."""
+        self._set_mute_solo(self._soloed_channels, self._check_channel(channel), soloed)
+
+    def clear_mute_solo(self):
+        """Unmute and unsolo all tracks and channels."""
+        with self.lock:
+            self._muted_tracks.clear()
+            self._soloed_tracks.clear()
+            self._muted_channels.clear()
+            self._soloed_channels.clear()
+            self._mute_solo_changed = True
+        self._interrupt.set()
+
+    def set_loop_region(self, start: float, end: float):
+        """
+        Loop between `start` and `end` seconds of the file, also during playback.
+
+        The region is resolved once to event indices on the timeline. When
+        playback reaches `end` it wraps to `start` without reloading the
+        file: notes held across the loop point are released, the notes and
+        pedal down at `start` are chased, and the clock is re-anchored so
+        the loop keeps exact time. Playback before the region runs into it;
+        playback after it wraps right away.
+
+        Raises:
+            ValueError: If `end` is not after `start`
+        """
+        start = max(0.0, float(start))
+        end = float(end)
+        if end <= start:
+            raise ValueError(f"Loop end {end} must be after its start {start}")
+        self._set_loop_region(('seconds', start, end))
+
+    def set_loop_bars(self, first_bar: float, last_bar: float):
+        """
+        Loop from the start of `first_bar` to the end of `last_bar`, using the file's time signatures.
+
+        Bars are numbered from 1. See set_loop_region().
+
+        Raises:
+            ValueError: If `last_bar` is before `first_bar`
+        """
+        first_bar = max(1.0, float(first_bar))
+        last_bar = float(last_bar)
+        if last_bar < first_bar:
+            raise ValueError(f"Last loop bar {last_bar} is before the first {first_bar}")
+        self._set_loop_region(('bar', first_bar, last_bar + 1))
+
+    def clear_loop_region(self):
+        """Stop looping the A-B region; playback continues to the end of the file."""
+        self._set_loop_region(None)
+
+    def get_loop_region(self):
+        """Return the loop region as ('seconds' | 'bar', start, end), or None. A 'bar' end is exclusive."""
+        with self.lock:
+            return self._loop_region
+
+    def get_speed(self) -> float:
+        return self._clock.get_speed()
+
+    def get_timing_report(self) -> dict:
+        """Return the PlaybackClock timing statistics of the last pass (see PlaybackClock.get_timing_report)."""
+        return self._clock.get_timing_report()
 
     def is_playing(self) -> bool:
         with self.lock:
@@ -96,13 +306,56 @@ class MidiFilePlayer:
             return bool(self._paused)
 
     def set_file(self, file_path: str):
-        """Set the path to the MIDI file to play."""
+        """
+        Set the path to the MIDI file to play.
+
+        Selecting a different file re-parses it. Setting the current file
+        again (PianoTab does so on every Play) keeps its cached timeline;
+        edits to the file are still caught by its (mtime, size) stamp.
+        """
+        with self.lock:
+            if file_path != self._file_path:
+                self._timelines.pop(file_path, None)
+                self._unsaved.pop(file_path, None)
+                # A new file starts from the beginning; the current one keeps its pause position
+                self._paused_index = 0
+                self._seek_target = None
         self._file_path = file_path
 
     def set_loop(self, loop: bool):
         """Set whether to loop playback while the start flag remains set."""
         self._loop = bool(loop)
 
+    def _set_mute_solo(self, voices: set, key: int, enabled: bool):
+        with self.lock:
+            if enabled:
+                voices.add(key)
+            else:
+                voices.discard(key)
+            self._mute_solo_changed = True
+        # Wake the player thread to apply the new mask
+        self._interrupt.set()
+
+    def _set_loop_region(self, region):
+        with self.lock:
+            self._loop_region = region
+            self._loop_region_changed = True
+        self._interrupt.set()
+
+    @staticmethod
+    def _check_track(track: int) -> int:
+        track = int(track)
+        if track < 0:
+            raise ValueError(f"Invalid track index {track}")
+        return track
+
+    @staticmethod
+    def _check_channel(channel: int) -> int:
+        channel = int(channel)
+        if not 0 <= channel < 16:
+            raise ValueError(f"Invalid MIDI channel {channel}")
+        return channel
+
     def _load_midi(self):
         """Load the configured MIDI file, returning a MidiFile or None."""
         try:
@@ -111,17 +364,59 @@ class MidiFilePlayer:
             print(f"Failed to open MIDI file '{self._file_path}': {e}")
             return None
 
-    def _collect_events(self, mid):
-        """Collect and return a sorted list of (abs_tick, msg) and ticks_per_beat."""
-        events = []
-        for track in mid.tracks:
-            abs_tick = 0
-            for msg in track:
-                abs_tick += getattr(msg, 'time', 0)
-                events.append((abs_tick, msg))
-        events.sort(key=lambda x: x[0])
-        ticks_per_beat = getattr(mid, 'ticks_per_beat', 480)
-        return events, ticks_per_beat
+    def _decode_timeline(self):
+        """Start compiling the configured file with SmfDecoder, falling back to mido. Returns None on failure."""
+        try:
+            return SmfDecoder(self._file_path).decode().stream()
+        except (OSError, ValueError) as e:
+            print(f"SMF decoder could not read '{self._file_path}' ({e}), using mido")
+        mid = self._load_midi()
+        if mid is None:
+            return None
+        return MidiTimeline.stream(mid)
+
+    def _get_timeline(self):
+        """
+        Return the MidiTimeline of the configured file, or None if it cannot be loaded.
+
+        A new timeline holds only its first chunk; _play_timeline compiles
+        the rest while playing. The timeline is cached per path and reused
+        while the file's mtime and size are unchanged, so loop passes and
+        resumes skip parsing. On a miss, timeline_cache (if set) is tried
+        before decoding the file.
+        """
+        path = self._file_path
+        stamp = self._file_stamp(path)
+        with self.lock:
+            cached = self._timelines.get(path)
+        if cached is not None and stamp is not None and cached[0] == stamp:
+            return cached[1]
+
+        timeline = self.timeline_cache.load(path) if self.timeline_cache is not None and stamp is not None else None
+        if timeline is None:
+            timeline = self._decode_timeline()
+            if timeline is None:
+                return None
+            if self.timeline_cache is not None:
+                with self.lock:
+                    self._unsaved[path] = timeline
+
+        # Files that cannot be stat'ed are never cached
+        if stamp is not None:
+            with self.lock:
+                self._timelines.pop(path, None)
+                self._timelines[path] = (stamp, timeline)
+                while len(self._timelines) > self.TIMELINE_CACHE_SIZE:
+                    del self._timelines[next(iter(self._timelines))]
+        return timeline
+
+    def _file_stamp(self, path):
+        """Return (mtime_ns, size) of `path`, or None if it cannot be stat'ed."""
+        try:
+            st = os.stat(path)
+        except (OSError, TypeError, ValueError):
+            return None
+        return (st.st_mtime_ns, st.st_size)
 
     def _play_file(self):
         """Play the currently configured file once or repeatedly while _playing/_loop are set."""
@@ -129,90 +424,482 @@ class MidiFilePlayer:
             if self._should_stop_playback():
                 break
 
-            mid = self._load_midi()
-            if mid is None:
+            timeline = self._get_timeline()
+            if timeline is None:
                 break
 
-            events, ticks_per_beat = self._collect_events(mid)
-
-            # Determine starting position (resume from pause or from beginning)
+            # Start where the last pause or seek left off (0 otherwise)
             with self.lock:
-                if self._paused:
-                    current_tempo = self._paused_tempo
-                    start_tick = self._paused_tick
-                    # Clear pause flags for this iteration
-                    self._paused = False
-                else:
-                    current_tempo = 500000
-                    start_tick = 0
-
-            prev_tick = start_tick
-
-            for abs_tick, msg in events:
-                if self._should_stop_playback():
-                    return
-
-                # Skip events before resume point
-                if abs_tick < start_tick:
+                start_index = self._paused_index
+                self._paused_index = 0
+                self._paused = False
+                target = self._seek_target
+                self._seek_target = None
+            if target is not None:
+                start_index = self._resolve_seek(timeline, target)
+
+            finished = self._play_timeline(timeline, start_index)
+            # Leave no hanging notes when stopping, pausing or at the end of a pass
+            self._release_sounding()
+            self._save_timeline(timeline)
+            if not finished:
+                return
+
+            if self._post_file_pass():
+                break
+
+    def _play_timeline(self, timeline: MidiTimeline, start_index: int) -> bool:
+        """
+        Emit timeline events from `start_index` at their absolute times.
+
+        While the timeline is still compiling, the next chunk is compiled
+        when fewer than a chunk of events is ready, or in the slack before
+        an event while fewer than compile_window events are ready.
+
+        In lookahead mode (see set_lookahead) a second cursor sends events
+        to the output device up to the lookahead early, and the display
+        cursor emits them display-only at their nominal time.
+
+        Events masked out by mute/solo are skipped with one search of the
+        mask per muted run. With a loop region (see set_loop_region),
+        reaching its end index wraps to its start index.
+
+        Returns:
+            bool: True if the end of the timeline was reached, False if playback was stopped
+        """
+        times = timeline.times
+        words = timeline.words
+        ring = self._ring
+        chunk = MidiTimeline.COMPILE_CHUNK
+        count = len(words)
+
+        with self.lock:
+            lookahead = self._lookahead
+            self._output_clock = self._device_clock if lookahead else None
+        # Timestamps of an earlier pass may come from a device clock that has restarted since
+        self._last_output_ms = 0.0
+        self._last_device_ms = 0.0
+        flags = FLAG_DISPLAY_ONLY if lookahead else 0
+
+        clock = self._clock
+        clock.reset_stats()
+
+        self._build_mask(timeline)
+        loop = self._resolve_loop_region(timeline)
+        loop_end = loop[1] if loop is not None else float('inf')
+        mask = self._mask
+        count = len(words)
+        i = start_index
+        if 0 < i < count:
+            self._chase(timeline, i)
+        self._start_clock(times[i] if i < count else 0.0)
+        # Next event to send ahead to the output device
+        o = i
+
+        while True:
+            if count <= i < loop_end:
+                if timeline.complete:
+                    break
+                count = self._compile_more(timeline, chunk)
+                continue
+
+            if not timeline.complete and i < loop_end:
+                ready = count - i
+                if ready < chunk or (ready < self.compile_window and clock.remaining(times[i]) > self.COMPILE_SLACK):
+                    count = self._compile_more(timeline, chunk)
                     continue
 
-                delta_ticks = abs_tick - prev_tick
-                self._sleep_for_delta(delta_ticks, ticks_per_beat, current_tempo)
-                prev_tick = abs_tick
+            if self._seek_target is not None:
+                with self.lock:
+                    target = self._seek_target
+                    self._seek_target = None
+                if target is not None:
+                    self._release_sounding()
+                    i = self._resolve_seek(timeline, target)
+                    count = len(words)
+                    self._extend_mask(timeline)
+                    if i >= count:
+                        break
+                    self._chase(timeline, i)
+                    self._start_clock(times[i])
+                    o = i
+                    continue
+
+            if self._mute_solo_changed:
+                self._apply_mute_solo(timeline, i, max(o, i))
+                mask = self._mask
+                continue
+
+            if self._loop_region_changed:
+                loop = self._resolve_loop_region(timeline)
+                loop_end = loop[1] if loop is not None else float('inf')
+                count = len(words)
+                continue
 
-                # Store current position before emitting message in case of pause
+            if self._should_stop_playback():
                 with self.lock:
-                    self._paused_tick = abs_tick
-                    self._paused_tempo = current_tempo
+                    if self._paused:
+                        self._paused_index = i
+                return False
+
+            if i >= loop_end:
+                # Wait for the loop end itself, so the loop keeps its length
+                if not clock.wait_until(loop[3], lead=lookahead):
+                    continue
+                i = self._wrap_loop(timeline, loop)
+                o = i
+                continue
+
+            if mask is not None and not mask[i]:
+                i = mask.find(1, i)
+                if i < 0:
+                    i = count
+                continue
+
+            at = times[i]
+            if lookahead:
+                o = self._send_ahead(timeline, max(o, i), i, lookahead, loop_end)
+                if o < count and o < loop_end and clock.remaining(times[o]) - lookahead < clock.remaining(at):
+                    # The next send to the output is due before the next display event
+                    clock.wait_until(times[o], lead=lookahead)
+                    continue
+            if not clock.wait_until(at):
+                # Woken by seek/pause/stop; re-check before emitting
+                continue
+
+            # Events at the same time (chords) go out as one batch
+            j = i + 1
+            if j < count and times[j] == at:
+                j = bisect_right(times, at, j, count)
+            while j == count and not timeline.complete:
+                count = self._compile_more(timeline, chunk)
+                j = bisect_right(times, at, j, count)
+            if lookahead:
+                o = self._send_ahead(timeline, max(o, i), j, lookahead, loop_end)
+
+            now = time.time()
+            if j == i + 1:
+                ring.push(words[i] | flags, now)
+            else:
+                batch = words[i:j]
+                if mask is not None:
+                    batch = array('I', compress(batch, mask[i:j]))
+                if flags:
+                    batch = array('I', [word | flags for word in batch])
+                ring.push_batch(batch, array('d', [now]) * len(batch))
+            clock.record(at)
+            timeline.apply_events(i, j, self._sounding, self._sustain, mask)
+            i = j
+        return True
+
+    def _send_ahead(self, timeline: MidiTimeline, start: int, end: int, lookahead: float, limit=None) -> int:
+        """
+        Send events from `start` to the output device ahead of time.
 
-                current_tempo = self._emit_message(msg, current_tempo)
+        Events due within `lookahead` seconds, and at least those before
+        `end`, are pushed output-only with their device timestamps. Events
+        from index `limit` (the loop end) on are not sent.
 
-            if self._post_file_pass():
-                break
+        Returns:
+            int: Index of the next event to send
+        """
+        times = timeline.times
+        words = timeline.words
+        mask = self._mask
+        clock = self._clock
+        limit = len(words) if limit is None else min(limit, len(words))
+        stop = max(end, bisect_left(times, clock.position_in(lookahead), start, limit))
+        if stop <= start:
+            return start
+
+        indices = range(start, stop)
+        if mask is not None:
+            indices = compress(indices, mask[start:stop])
+        # Map perf_counter() deadlines onto the device clock, keeping timestamps non-decreasing
+        device_now = self._read_output_clock()
+        if device_now is not None:
+            offset = device_now - time.perf_counter() * 1000.0 - self._output_latency_ms
+        else:
+            # Without a clock reading every event goes out right after the last one sent
+            offset = float('-inf')
+        last = self._last_output_ms
+        batch = array('I')
+        stamps = array('d')
+        for k in indices:
+            stamp = clock.deadline(times[k]) * 1000.0 + offset
+            if stamp < last:
+                stamp = last
+            last = stamp
+            batch.append(words[k] | FLAG_OUTPUT_ONLY)
+            stamps.append(stamp)
+        if batch:
+            self._last_output_ms = last
+            self._output_until = clock.deadline(times[stop - 1])
+            self._ring.push_batch(batch, stamps)
+            timeline.apply_events(start, stop, self._sent, self._sent_sustain, mask)
+
+        if mask is not None:
+            # Do not wake up for muted events
+            stop = mask.find(1, stop)
+            if stop < 0:
+                stop = len(mask)
+        return stop
+
+    def _read_output_clock(self):
+        """
+        Return the output device clock in ms, or None if it cannot be read
+        (e.g. while MidiController.connect() restarts the backend).
 
-    def _should_stop_playback(self) -> bool:
+        A reading below the previous one means the clock restarted, so the
+        timestamps sent against the old clock no longer bound new ones.
+        """
+        try:
+            now = self._output_clock()
+        except Exception as e:
+            if not self._output_clock_failed:
+                print(f"MIDI output clock unavailable: {e}")
+                self._output_clock_failed = True
+            return None
+        self._output_clock_failed = False
+        if now < self._last_device_ms:
+            self._last_output_ms = 0.0
+            # Events sent ahead were lost with the old output
+            self._output_until = 0.0
+        self._last_device_ms = now
+        return now
+
+    def _start_clock(self, position: float):
+        """Anchor the clock at `position`, after events already sent ahead to the output have played."""
+        delay = self._output_until - time.perf_counter() if self._output_clock is not None else 0.0
+        self._clock.start(position, delay=max(0.0, delay))
+
+    def _save_timeline(self, timeline: MidiTimeline):
+        """Write `timeline` to timeline_cache once it has been compiled completely."""
+        if not timeline.complete:
+            return
+        path = self._file_path
         with self.lock:
-            return self.get_end_flag() or (not self._playing)
+            if self._unsaved.get(path) is not timeline:
+                return
+            del self._unsaved[path]
+        self.timeline_cache.store(path, timeline)
+
+    def _resolve_seek(self, timeline: MidiTimeline, target: tuple) -> int:
+        """Return the timeline index for a ('seconds' | 'tick', value) seek target."""
+        kind, value = target
+        if kind == 'tick':
+            timeline.compile_until_tick(value)
+            return timeline.index_at_tick(value)
+        timeline.compile_until_seconds(value)
+        return timeline.index_at_seconds(value)
+
+    def _chase(self, timeline: MidiTimeline, index: int, state: tuple = None):
+        """Send the notes and sustain pedal that are down just before event `index` (or `state`, see state_at)."""
+        notes, sustain = state if state is not None else timeline.state_at(index, self._enabled)
+        words = []
+        for channel, value in enumerate(sustain):
+            if value:
+                words.append(pack_event(0xB0 | channel, SUSTAIN_CONTROL, value))
+        for key, velocity in enumerate(notes):
+            if velocity:
+                words.append(pack_event(0x90 | (key >> 7), key & 0x7F, velocity))
+        self._push_state(words)
+        # Update in place: _play_timeline holds references to these arrays
+        self._sounding[:] = notes
+        self._sustain[:] = sustain
+        if self._output_clock is not None:
+            self._sent[:] = notes
+            self._sent_sustain[:] = sustain
+
+    def _resolve_loop_region(self, timeline: MidiTimeline):
+        """
+        Resolve the loop region on `timeline`, compiling up to its end, and
+        compute the state chased at its start.
 
-    def _sleep_for_delta(self, delta_ticks: int, ticks_per_beat: int, tempo: int) -> None:
-        if delta_ticks <= 0:
+        Returns:
+            tuple: (start index, end index, start seconds, end seconds), or
+                None without a region or if it lies outside the file
+        """
+        with self.lock:
+            region = self._loop_region
+            self._loop_region_changed = False
+        self._loop_state = None
+        if region is None:
+            return None
+
+        kind, start, end = region
+        if kind == 'bar':
+            timeline.compile_until_bar(end)
+            start_tick = timeline.bar_to_tick(start)
+            end_tick = timeline.bar_to_tick(end)
+            timeline.compile_until_tick(end_tick)
+            start = timeline.tick_to_seconds(start_tick)
+            end = timeline.tick_to_seconds(end_tick)
+        else:
+            timeline.compile_until_seconds(end)
+        if timeline.complete:
+            end = min(end, timeline.duration)
+        if end <= start:
+            print(f"Loop region {region} is outside the file, ignoring it")
+            return None
+
+        start_index = timeline.index_at_seconds(start)
+        self._extend_mask(timeline)
+        self._loop_state = (self._mask,) + timeline.state_at(start_index, self._enabled)
+        return (start_index, timeline.index_at_seconds(end), start, end)
+
+    def _wrap_loop(self, timeline: MidiTimeline, loop: tuple) -> int:
+        """Jump from the end of the loop region back to its start. Returns the start index."""
+        start_index, _, start, end = loop
+        if self._output_clock is not None:
+            # Release at the loop point, not when the last event sent ahead is due
+            self._output_until = max(self._output_until, self._clock.deadline(end))
+        late = self._clock.position() - end
+        self._release_sounding()
+        if late > self.LOOP_WRAP_TOLERANCE:
+            # The playhead was already past the region (seek, resume or a region set
+            # behind it); wrapping would make every missed pass overdue at once
+            self._start_clock(start)
+        else:
+            self._clock.wrap(end, start)
+        # Recompute after a mute/solo change
+        state = self._loop_state
+        if state is None or state[0] is not self._mask:
+            state = (self._mask,) + timeline.state_at(start_index, self._enabled)
+            self._loop_state = state
+        self._chase(timeline, start_index, state[1:])
+        return start_index
+
+    def _build_mask(self, timeline: MidiTimeline):
+        """Rebuild _enabled and _mask of `timeline` from the mute/solo settings."""
+        with self.lock:
+            self._mute_solo_changed = False
+            muted_tracks = set(self._muted_tracks)
+            soloed_tracks = set(self._soloed_tracks)
+            muted_channels = set(self._muted_channels)
+            soloed_channels = set(self._soloed_channels)
+        if not (muted_tracks or soloed_tracks or muted_channels or soloed_channels):
+            self._enabled = None
+            self._mask = None
             return
-        try:
-            seconds = mido.tick2second(delta_ticks, ticks_per_beat, tempo)
-        except Exception:
-            seconds = delta_ticks * 0.001
-        if seconds > 0:
-            time.sleep(seconds)
-
-    def _emit_message(self, msg, current_tempo: int) -> int:
-        msg_type = getattr(msg, 'type', None)
-        if msg_type == 'set_tempo':
-            return getattr(msg, 'tempo', current_tempo)
-
-        if msg_type in ('note_on', 'note_off'):
-            note = getattr(msg, 'note', None)
-            velocity = getattr(msg, 'velocity', 0)
-            channel = getattr(msg, 'channel', 0)
-            if note is None:
-                return current_tempo
-            if msg_type == 'note_off' or (msg_type == 'note_on' and velocity == 0):
-                status = 0x80 | (channel & 0x0F)
-                data1 = note
-                data2 = 0
+
+        enabled = bytearray(timeline.track_count * 16)
+        for track in range(timeline.track_count):
+            if track in muted_tracks or (soloed_tracks and track not in soloed_tracks):
+                continue
+            for channel in range(16):
+                if channel in muted_channels or (soloed_channels and channel not in soloed_channels):
+                    continue
+                enabled[track << 4 | channel] = 1
+        self._enabled = enabled
+        self._mask = timeline.voice_mask(enabled)
+
+    def _extend_mask(self, timeline: MidiTimeline):
+        """Cover events compiled since the mask was built."""
+        mask = self._mask
+        if mask is not None and len(mask) < len(timeline.words):
+            mask.extend(timeline.voice_mask(self._enabled, len(mask)))
+
+    def _compile_more(self, timeline: MidiTimeline, chunk: int) -> int:
+        """Compile the next chunk of `timeline` and return the number of compiled events."""
+        timeline.compile_more(chunk)
+        self._extend_mask(timeline)
+        return len(timeline.words)
+
+    def _apply_mute_solo(self, timeline: MidiTimeline, index: int, output_index: int):
+        """
+        Apply changed mute/solo settings during playback.
+
+        The mask is rebuilt, and the sounding state is moved to the masked
+        state just before `index`: notes of voices turned off are released
+        and held notes of voices turned on are sent. In lookahead mode the
+        output gets the same for `output_index`, after the events already
+        sent ahead.
+        """
+        self._build_mask(timeline)
+        notes, sustain = timeline.state_at(index, self._enabled)
+        words = self._change_words(self._sounding, self._sustain, notes, sustain)
+        if self._output_clock is not None:
+            if output_index != index:
+                sent, sent_sustain = timeline.state_at(output_index, self._enabled)
             else:
-                status = 0x90 | (channel & 0x0F)
-                data1 = note
-                data2 = velocity
-            self.event_queue.put(([status, data1, data2, 0], time.time()))
-            return current_tempo
-
-        if msg_type == 'control_change':
-            channel = getattr(msg, 'channel', 0)
-            control = getattr(msg, 'control', 0)
-            value = getattr(msg, 'value', 0)
-            status = 0xB0 | (channel & 0x0F)
-            self.event_queue.put(([status, control, value, 0], time.time()))
-        return current_tempo
+                sent, sent_sustain = notes, sustain
+            self._push_output(self._change_words(self._sent, self._sent_sustain, sent, sent_sustain))
+            self._push_now([word | FLAG_DISPLAY_ONLY for word in words])
+            self._sent[:] = sent
+            self._sent_sustain[:] = sent_sustain
+        else:
+            self._push_now(words)
+        self._sounding[:] = notes
+        self._sustain[:] = sustain
+
+    def _change_words(self, notes: bytearray, sustain: bytearray, target_notes: bytearray, target_sustain: bytearray) -> list:
+        """Return the words moving the state `notes`/`sustain` to `target_notes`/`target_sustain` (see _sounding)."""
+        releases = []
+        presses = []
+        for key, (velocity, target) in enumerate(zip(notes, target_notes)):
+            if velocity and not target:
+                releases.append(pack_event(0x80 | (key >> 7), key & 0x7F, 0))
+            elif target and not velocity:
+                presses.append(pack_event(0x90 | (key >> 7), key & 0x7F, target))
+        for channel, (value, target) in enumerate(zip(sustain, target_sustain)):
+            if value != target:
+                releases.append(pack_event(0xB0 | channel, SUSTAIN_CONTROL, target))
+        return releases + presses
+
+    def _release_sounding(self):
+        """Send Note Off for every sounding note and release held sustain pedals."""
+        if self._output_clock is not None:
+            # The output may still hold events sent ahead; release after them
+            self._push_output(self._release_words(self._sent, self._sent_sustain))
+            self._push_now([word | FLAG_DISPLAY_ONLY for word in self._release_words(self._sounding, self._sustain)])
+            self._sent[:] = bytes(len(self._sent))
+            self._sent_sustain[:] = bytes(len(self._sent_sustain))
+        else:
+            self._push_now(self._release_words(self._sounding, self._sustain))
+        self._sounding[:] = bytes(len(self._sounding))
+        self._sustain[:] = bytes(len(self._sustain))
+
+    def _release_words(self, notes: bytearray, sustain: bytearray) -> list:
+        """Return Note Off / pedal up words for the sounding `notes` and held `sustain` (see _sounding)."""
+        words = []
+        if any(notes):
+            for key, velocity in enumerate(notes):
+                if velocity:
+                    words.append(pack_event(0x80 | (key >> 7), key & 0x7F, 0))
+        for channel, value in enumerate(sustain):
+            if value:
+                words.append(pack_event(0xB0 | channel, SUSTAIN_CONTROL, 0))
+        return words
+
+    def _push_state(self, words: list):
+        """Send state changes (chase) now, or after the events sent ahead in lookahead mode."""
+        if self._output_clock is not None:
+            self._push_output(words)
+            self._push_now([word | FLAG_DISPLAY_ONLY for word in words])
+        else:
+            self._push_now(words)
+
+    def _push_output(self, words: list):
+        """Push output-only `words` timestamped after the last event sent ahead (or now)."""
+        if not words:
+            return
+        device_now = self._read_output_clock()
+        stamp = self._last_output_ms
+        if device_now is not None:
+            delay_ms = max(0.0, self._output_until - time.perf_counter()) * 1000.0
+            stamp = max(stamp, device_now + delay_ms - self._output_latency_ms)
+        self._last_output_ms = stamp
+        self._ring.push_batch([word | FLAG_OUTPUT_ONLY for word in words], [stamp] * len(words))
+
+    def _push_now(self, words: list):
+        if words:
+            now = time.time()
+            self._ring.push_batch(words, [now] * len(words))
+
+    def _should_stop_playback(self) -> bool:
+        # Lock-free: both reads are single attribute/flag lookups
+        return self.lifecycle.is_ended() or (not self._playing)
 
     def _post_file_pass(self) -> bool:
         """Update loop/playback flags after one pass. Return True to break outer loop."""
@@ -1,69 +1,66 @@
 import tkinter
-from queue import Queue, Empty
-from threading import Lock
+from midi.MidiBackend import MidiBackend
+from midi.MidiLifecycle import MidiLifecycle
+from midi.MidiEvent import MidiEventBatch, FLAG_OUTPUT_ONLY, FLAG_DISPLAY_ONLY
+from midi.MidiRingBuffer import MidiEventQueue
 
 
 class MidiHandler:
     """Handles MIDI event processing in a separate thread."""
+
+    # Seconds to wait for events before the end flag is checked again
+    WAIT_TIMEOUT = 1.0
+    # pygame.midi.Output.write() accepts at most 1024 events per call
+    MAX_WRITE_EVENTS = 1024
+    # Timestamps further ahead of the backend clock than this (ms) were stamped
+    # against a clock that has restarted since (MidiController.connect())
+    MAX_AHEAD_MS = 1000
     
-    def __init__(self, event_queue: Queue, lock: Lock, end_flag_getter, dispatcher=None):
+    def __init__(self, event_queue: MidiEventQueue, lifecycle: MidiLifecycle, dispatcher=None,
+                 midi_backend: MidiBackend = None):
         """
         Initialize MidiHandler.
         
         Args:
-            event_queue: Queue to get MIDI events from
-            lock: Threading lock for accessing shared state
-            end_flag_getter: Callable that returns the current end flag value
+            event_queue: MidiEventQueue to drain MIDI events from
+            lifecycle: Shared start/end signalling
             dispatcher: Optional UiDispatcher for thread-safe UI updates
+            midi_backend: Optional MidiBackend whose clock stamps live events
+                on outputs that honour timestamps
         """
         self.event_queue = event_queue
-        self.lock = lock
-        self.get_end_flag = end_flag_getter
+        self.lifecycle = lifecycle
         self.dispatcher = dispatcher
         self.midiout = None
         self.keyboard = None
-        
-        # NOTE_NAME mapping for MIDI key number to note name conversion
-        self.NOTE_NAME = [
-            "C-2","C#-2","D-2","D#-2","E-1","F-1","F#-1","G-2","G#-2","A-2","A#-2","B-2",
-            "C-1","C#-1","D-1","D#-1","E-1","F-1","F#-1","G-1","G#-1",
-            # 88-key piano begin
-            "A-1", "A#-1", "B-1",
-            "C0", "C#0", "D0", "D#0", "E0", "F0", "F#0", "G0", "G#0", "A0", "A#0", "B0",
-            "C1", "C#1", "D1", "D#1", "E1", "F1", "F#1", "G1", "G#1", "A1", "A#1", "B1",
-            "C2", "C#2", "D2", "D#2", "E2", "F2", "F#2", "G2", "G#2", "A2", "A#2", "B2",
-            "C3", "C#3", "D3", "D#3", "E3", "F3", "F#3", "G3", "G#3", "A3", "A#3", "B3",
-            "C4", "C#4", "D4", "D#4", "E4", "F4", "F#4", "G4", "G#4", "A4", "A#4", "B4",
-            "C5", "C#5", "D5", "D#5", "E5", "F5", "F#5", "G5", "G#5", "A5", "A#5", "B5",
-            "C6", "C#6", "D6", "D#6", "E6", "F6", "F#6", "G6", "G#6", "A6", "A#6", "B6",
-            "C7",
-            # 88-key piano end
-            "C#7", "D7", "D#7", "E7", "F7", "F#7", "G7", "G#7", "A7", "A#7", "B7",
-            "C8", "C#8", "D8", "D#8", "E8", "F8", "F#8", "G8"
-        ]
+        self.midi_backend = midi_backend
+        self._overflow_count = 0
+        # Latest timestamp written to midiout; later writes never go below it
+        self._last_timestamp = 0
 
     def run(self):
         """
-        Main handler loop. Processes events from the queue.
+        Main handler loop. Sleeps until producers push events, then drains the queue.
         """
+        batch = MidiEventBatch()
         while True:
             try:
-                event = self.event_queue.get(timeout=1.0)
-                self._handler(event)
-            except Empty:
-                with self.lock:
-                    if self.get_end_flag():
-                        print("midi process thread exit")
-                        return
+                if self.event_queue.wait(self.WAIT_TIMEOUT):
+                    batch.clear()
+                    if self.event_queue.drain(batch):
+                        self._handler(batch)
+                        self._report_overflow()
+                        continue
             except Exception:
-                with self.lock:
-                    if self.get_end_flag():
-                        print("midi process thread exit")
-                        return
+                pass
+            if self.lifecycle.is_ended():
+                print("midi process thread exit")
+                return
 
     def set_output_device(self, midiout):
         """Set the MIDI output device."""
         self.midiout = midiout
+        self._last_timestamp = 0
 
     def set_keyboard(self, keyboard):
         """Set the keyboard for UI updates."""
@@ -73,78 +70,105 @@ class MidiHandler:
         """Set the UI dispatcher for thread-safe UI updates."""
         self.dispatcher = dispatcher
 
-    def _handler(self, recv: list):
-        """
-        Process a MIDI event.
-        
-        Args:
-            recv: MIDI event tuple ([status, data1, data2, extra], timestamp)
-        """
-        [status, data1, data2, _], _ = recv
-
-        # Note Off
-        if (status & 0xF0) == 0x80:
-            self._note_off(key_name=data1)
-
-        # Note On
-        elif (status & 0xF0) == 0x90:
-            self._note_on(key_name=data1, velocity=data2)
-
-        # Control Change
-        elif (status & 0xF0) == 0xB0:
-            # Sustain On/Off
-            if data1 == 0x40:
-                self._sustain_change(status=status, value=data2)
-
-    def _note_on(self, key_name: int, velocity: int):
+    def _handler(self, batch: MidiEventBatch):
         """
-        Handle Note On event.
+        Process a batch of MIDI events as one unit.
+
+        All output messages are sent with a single midiout.write() call and
+        the resulting key states, keyed by MIDI note number, are posted to
+        the UI as one update. The dispatcher merges them with any update
+        still pending for the frame, so only the last state per key is drawn.
+
+        Events flagged FLAG_OUTPUT_ONLY are written with their batch
+        timestamp (output device clock ms) and skip the UI; events flagged
+        FLAG_DISPLAY_ONLY only update the UI. Everything else is written
+        with the backend clock (now), or 0 when the backend has no
+        timestamp support.
+
+        File events may be stamped ahead of the clock, so timestamps are
+        clamped to never go below the last one written to the output; a
+        live event is then queued behind them instead of overtaking them.
+        Timestamps more than MAX_AHEAD_MS ahead of the clock belong to a
+        clock that restarted and are written as now.
         
         Args:
-            key_name: MIDI note number
-            velocity: Note velocity (0-127)
+            batch: MidiEventBatch of packed events
         """
-        key_name_str = self._get_key_name(key_name)
-        if key_name_str == "":
-            return
-        if self.midiout is not None:
-            self.midiout.note_on(note=key_name, velocity=velocity)
+        output = []
+        key_states = {}
+        sustain = None
+        now = self._now()
+        last = self._last_timestamp
+        if now and last > now + self.MAX_AHEAD_MS:
+            last = now
+
+        for word, timestamp in zip(batch.words, batch.times):
+            status = word & 0xFF
+            data1 = (word >> 8) & 0xFF
+            data2 = (word >> 16) & 0xFF
+            kind = status & 0xF0
+            send = not (word & FLAG_DISPLAY_ONLY)
+            show = not (word & FLAG_OUTPUT_ONLY)
+            if send:
+                timestamp = int(timestamp) if not show else now
+                if now and timestamp > now + self.MAX_AHEAD_MS:
+                    timestamp = now
+                if timestamp < last:
+                    timestamp = last
+                last = timestamp
+
+            # Note Off (Note On with velocity 0 is a Note Off)
+            if kind == 0x80 or (kind == 0x90 and data2 == 0):
+                if send:
+                    output.append([[0x80, data1, 0], timestamp])
+                if show:
+                    key_states[data1] = tkinter.NORMAL
+
+            # Note On
+            elif kind == 0x90:
+                if send:
+                    output.append([[0x90, data1, data2], timestamp])
+                if show:
+                    key_states[data1] = tkinter.ACTIVE
+
+            # Control Change: Sustain On/Off
+            elif kind == 0xB0 and data1 == 0x40:
+                if send:
+                    output.append([[status, 0x40, data2], timestamp])
+                if show:
+                    sustain = data2 > 0
+
+        self._last_timestamp = last
+        self._write_output(output)
 
         if self.dispatcher:
-            self.dispatcher.post_to('keyboard', 'set_key_state', key_name_str, tkinter.ACTIVE)
-
-    def _note_off(self, key_name: int):
+            if key_states:
+                self.dispatcher.post_merged('keyboard', 'set_key_states', key_states)
+            if sustain is not None:
+                self.dispatcher.post_latest('keyboard', 'set_sustain', sustain)
+
+    def _now(self) -> int:
+        """Return the output clock in ms for live events, or 0 without timestamp support."""
+        backend = self.midi_backend
+        if backend is None or not backend.supports_timestamps():
+            return 0
+        return backend.get_time_ms()
+
+    def _write_output(self, output: list):
         """
-        Handle Note Off event.
-        
-        Args:
-            key_name: MIDI note number
-        """
-        key_name_str = self._get_key_name(key_name)
-        if key_name_str == "":
-            return
-        if self.midiout is not None:
-            self.midiout.note_off(note=key_name)
-
-        if self.dispatcher:
-            self.dispatcher.post_to('keyboard', 'set_key_state', key_name_str, tkinter.NORMAL)
+        Send messages to the output device in as few write() calls as possible.
 
-    def _sustain_change(self, status: int, value: int):
-        """
-        Handle Sustain (Control Change) event.
-        
         Args:
-            status: MIDI status byte
-            value: Control value (0-127)
+            output: List of [[status, data1, data2], timestamp]
         """
-        if self.midiout is not None:
-            self.midiout.write_short(status, 0x40, value)
-
-        if self.dispatcher:
-            self.dispatcher.post_to('keyboard', 'set_sustain', value > 0)
-
-    def _get_key_name(self, key_num: int) -> str:
-        """Get the note name for a given MIDI key number."""
-        if (key_num < 0) or (key_num >= 128):
-            return ""
-        return self.NOTE_NAME[key_num]
+        if self.midiout is None or not output:
+            return
+        for i in range(0, len(output), self.MAX_WRITE_EVENTS):
+            self.midiout.write(output[i:i + self.MAX_WRITE_EVENTS])
+
+    def _report_overflow(self):
+        """Print a warning when producers dropped events because the handler fell behind."""
+        count = self.event_queue.overflow_count
+        if count != self._overflow_count:
+            print(f"MIDI event queue overflow: {count - self._overflow_count} events dropped")
+            self._overflow_count = count
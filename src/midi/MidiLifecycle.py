@@ -0,0 +1,61 @@
+from threading import Event, Lock
+
+
+class MidiLifecycle:
+    """
+    Start/end signalling shared by the MIDI worker threads.
+
+    Reading the state never takes a lock, and waiting threads wake as soon
+    as the state changes instead of sleeping for a fixed interval.
+    """
+
+    def __init__(self):
+        self._started = Event()
+        self._ended = Event()
+        # Set while started or ended, so connect waiters wake on either
+        self._gate = Event()
+        # Serializes writers only; readers never take it
+        self._lock = Lock()
+
+    def is_started(self) -> bool:
+        """Return True if MIDI devices are connected."""
+        return self._started.is_set()
+
+    def is_ended(self) -> bool:
+        """Return True if the application is shutting down."""
+        return self._ended.is_set()
+
+    def set_started(self, started: bool):
+        """Set or clear the start flag."""
+        with self._lock:
+            if started:
+                self._started.set()
+                self._gate.set()
+            else:
+                self._started.clear()
+                if not self._ended.is_set():
+                    self._gate.clear()
+
+    def shutdown(self):
+        """Set the end flag and wake all waiting threads."""
+        with self._lock:
+            self._ended.set()
+            self._gate.set()
+
+    def wait_started(self, timeout: float = None) -> bool:
+        """
+        Wait until started or ended.
+
+        Returns:
+            bool: True if started or ended, False on timeout
+        """
+        return self._gate.wait(timeout)
+
+    def wait_ended(self, timeout: float = None) -> bool:
+        """
+        Wait until ended. Use instead of time.sleep() so shutdown is immediate.
+
+        Returns:
+            bool: True if ended, False on timeout
+        """
+        return self._ended.wait(timeout)
@@ -1,48 +1,53 @@
 import time
-from threading import Lock
-from queue import Queue
+from midi.MidiBackend import MidiBackend
+from midi.MidiLifecycle import MidiLifecycle
+from midi.MidiEvent import MidiEventBatch
+from midi.MidiRingBuffer import MidiEventQueue
 
 
 class MidiReceiver:
     """Handles MIDI device input in a separate thread."""
+
+    # Seconds a blocking wait may last before the end flag is checked again
+    WAIT_TIMEOUT = 0.1
     
-    def __init__(self, event_queue: Queue, lock: Lock, start_flag_getter, end_flag_getter):
+    def __init__(self, event_queue: MidiEventQueue, lifecycle: MidiLifecycle, midi_backend: MidiBackend = None):
         """
         Initialize MidiReceiver.
         
         Args:
-            event_queue: Queue to put received MIDI events into
-            lock: Threading lock for accessing shared state
-            start_flag_getter: Callable that returns the current start flag value
-            end_flag_getter: Callable that returns the current end flag value
+            event_queue: MidiEventQueue to push received events into
+            lifecycle: Shared start/end signalling
+            midi_backend: Optional MidiBackend used to block until input arrives
         """
         self.event_queue = event_queue
-        self.lock = lock
-        self.get_start_flag = start_flag_getter
-        self.get_end_flag = end_flag_getter
+        self._ring = event_queue.create_producer()
+        self._batch = MidiEventBatch()
+        self.lifecycle = lifecycle
+        self.midi_backend = midi_backend
         self.midiin = None
 
     def run(self):
         """
-        Main receive loop. Polls the MIDI input device for events and puts them in the queue.
+        Main receive loop. Waits for MIDI input and puts received events in the queue.
+
+        If the backend supports blocking input, the thread sleeps until data
+        arrives. Otherwise the input device is polled.
         """
         try:
-            while True:
-                with self.lock:
-                    if self.get_end_flag():
-                        break
-
+            while not self.lifecycle.is_ended():
                 self._wait_connect()
 
-                if self.midiin is not None:
-                    if self.midiin.poll():
-                        recv = self.midiin.read(100)
-                        for event in recv:
-                            self.event_queue.put(event)
-                    else:
-                        # Only sleep when no events are available
-                        time.sleep(0.001)
+                midiin = self.midiin
+                if midiin is None:
+                    time.sleep(0.001)
+                elif self._can_block():
+                    if self.midi_backend.wait_for_input(midiin, self.WAIT_TIMEOUT):
+                        self._read_events(midiin)
+                elif midiin.poll():
+                    self._read_events(midiin)
                 else:
+                    # Only sleep when no events are available
                     time.sleep(0.001)
 
         finally:
@@ -58,10 +63,25 @@ class MidiReceiver:
         """Set the MIDI input device."""
         self.midiin = midiin
 
+    def _can_block(self) -> bool:
+        """Return True if the backend can block until input arrives."""
+        if self.midi_backend is None:
+            return False
+        try:
+            return self.midi_backend.supports_blocking_input()
+        except Exception:
+            return False
+
+    def _read_events(self, midiin):
+        """Read pending events from `midiin` and push them to the ring as one batch."""
+        recv = midiin.read(100)
+        if not recv:
+            return
+        batch = self._batch
+        batch.clear()
+        batch.extend_raw(recv)
+        self._ring.push_batch(batch.words, batch.times)
+
     def _wait_connect(self):
         """Wait for the start flag to be set or end flag to be set."""
-        while True:
-            with self.lock:
-                if self.get_start_flag() or self.get_end_flag():
-                    return
-            time.sleep(0.1)
+        self.lifecycle.wait_started()
@@ -0,0 +1,233 @@
+from array import array
+from threading import Event
+from midi.MidiEvent import MidiEventBatch
+
+
+class MidiRingBuffer:
+    """
+    Bounded single-producer/single-consumer ring of packed MIDI events.
+
+    One thread pushes and one thread pops. Neither side takes a lock: the
+    producer only advances `_tail` and the consumer only advances `_head`.
+    Events that do not fit are dropped and counted in `overflow_count`.
+
+    A blocking ring applies back-pressure instead: pushes wait for the
+    consumer to make room. This suits producers that are not real time,
+    such as file playback, where a dropped note-off leaves a stuck note.
+    """
+
+    # Longest single wait for room in a blocking ring, so `abort` is checked regularly
+    SPACE_WAIT = 0.01
+
+    def __init__(self, capacity: int = 4096, wakeup: Event = None, block: bool = False, abort=None):
+        """
+        Args:
+            capacity: Maximum number of queued events (rounded up to a power of two)
+            wakeup: Optional Event set after each push to wake the consumer
+            block: Wait for the consumer to make room instead of dropping events
+            abort: With block, callable that ends a wait when it returns True
+                (e.g. on shutdown); events that are still not pushed count as overflow
+        """
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self._capacity = size
+        self._mask = size - 1
+        self._words = array('I', [0]) * size
+        self._times = array('d', [0.0]) * size
+        self._head = 0
+        self._tail = 0
+        self._wakeup = wakeup
+        # Set by the consumer after popping; only used by blocking rings
+        self._space = Event() if block else None
+        self._abort = abort
+        self.overflow_count = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def __len__(self) -> int:
+        return self._tail - self._head
+
+    def push(self, word: int, timestamp: float = 0.0) -> bool:
+        """Push one packed event. Return False if the ring is full (or a blocking wait was aborted)."""
+        tail = self._tail
+        if tail - self._head >= self._capacity and not self._wait_for_space():
+            self.overflow_count += 1
+            return False
+        i = tail & self._mask
+        self._words[i] = word
+        self._times[i] = timestamp
+        self._tail = tail + 1
+        self._notify()
+        return True
+
+    def push_batch(self, words, times) -> int:
+        """
+        Push packed events from parallel 'I' and 'd' arrays (or sequences).
+
+        A blocking ring pushes the batch in parts as the consumer makes room.
+
+        Returns:
+            int: Number of events pushed; the rest are counted as overflow
+        """
+        count = len(words)
+        if count <= 0:
+            return 0
+        if not isinstance(words, array):
+            words = array('I', words)
+        if not isinstance(times, array):
+            times = array('d', times)
+
+        pushed = self._write(words, times, 0, count)
+        while pushed < count and self._wait_for_space():
+            pushed += self._write(words, times, pushed, count)
+        if pushed < count:
+            self.overflow_count += count - pushed
+        return pushed
+
+    def _write(self, words: array, times: array, start: int, end: int) -> int:
+        """Copy as many of words/times[start:end] as fit into the ring. Returns the number copied."""
+        tail = self._tail
+        count = min(end - start, self._capacity - (tail - self._head))
+        if count <= 0:
+            return 0
+        index = tail & self._mask
+        first = min(count, self._capacity - index)
+        self._words[index:index + first] = words[start:start + first]
+        self._times[index:index + first] = times[start:start + first]
+        rest = count - first
+        if rest:
+            self._words[:rest] = words[start + first:start + count]
+            self._times[:rest] = times[start + first:start + count]
+        self._tail = tail + count
+        self._notify()
+        return count
+
+    def _wait_for_space(self) -> bool:
+        """Wait until the ring has room. Returns False at once for a dropping ring, or if aborted."""
+        space = self._space
+        if space is None:
+            return False
+        while self._tail - self._head >= self._capacity:
+            if self._abort is not None and self._abort():
+                return False
+            space.clear()
+            # Re-check after clearing, so a pop in between is not missed
+            if self._tail - self._head < self._capacity:
+                break
+            space.wait(self.SPACE_WAIT)
+        return True
+
+    def pop_batch(self, out: MidiEventBatch, max_count: int = None) -> int:
+        """
+        Move queued events into `out`.
+
+        Returns:
+            int: Number of events moved
+        """
+        head = self._head
+        count = self._tail - head
+        if max_count is not None:
+            count = min(count, max_count)
+        if count <= 0:
+            return 0
+
+        start = head & self._mask
+        first = min(count, self._capacity - start)
+        out.words.extend(self._words[start:start + first])
+        out.times.extend(self._times[start:start + first])
+        rest = count - first
+        if rest:
+            out.words.extend(self._words[:rest])
+            out.times.extend(self._times[:rest])
+        self._head = head + count
+        if self._space is not None:
+            self._space.set()
+        return count
+
+    def _notify(self):
+        wakeup = self._wakeup
+        if wakeup is not None and not wakeup.is_set():
+            wakeup.set()
+
+
+class MidiEventQueue:
+    """
+    Event queue between MIDI producers and MidiHandler.
+
+    Each producer thread gets its own MidiRingBuffer from create_producer(),
+    which keeps every ring single-producer. The handler drains all rings
+    and sleeps on a shared wake-up Event while they are empty.
+    """
+
+    def __init__(self, capacity: int = 4096):
+        """
+        Args:
+            capacity: Default capacity of each producer ring
+        """
+        self._capacity = capacity
+        self._wakeup = Event()
+        self._rings = ()
+
+    def create_producer(self, capacity: int = None, block: bool = False, abort=None) -> MidiRingBuffer:
+        """
+        Create a ring for one producer thread.
+
+        Args:
+            capacity: Ring capacity (default: the queue's capacity)
+            block: Apply back-pressure instead of dropping events (see MidiRingBuffer)
+            abort: With block, callable that ends a wait for room when it returns True
+        """
+        ring = MidiRingBuffer(capacity or self._capacity, wakeup=self._wakeup, block=block, abort=abort)
+        # Replace the tuple so the consumer never sees a partially updated list
+        self._rings = self._rings + (ring,)
+        return ring
+
+    @property
+    def overflow_count(self) -> int:
+        """Total number of events dropped because a ring was full."""
+        return sum(ring.overflow_count for ring in self._rings)
+
+    def empty(self) -> bool:
+        for ring in self._rings:
+            if len(ring):
+                return False
+        return True
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Wait until any ring has events or wake() is called.
+
+        Returns:
+            bool: True if woken, False on timeout
+        """
+        if not self.empty():
+            return True
+        woken = self._wakeup.wait(timeout)
+        # Clear only after waking: any push that set the flag is already
+        # visible to the following drain(), and wake() is never lost
+        self._wakeup.clear()
+        return woken
+
+    def wake(self):
+        """Wake a waiting consumer, e.g. on shutdown."""
+        self._wakeup.set()
+
+    def drain(self, out: MidiEventBatch, max_count: int = None) -> int:
+        """
+        Move queued events from all rings into `out`.
+
+        Returns:
+            int: Number of events moved
+        """
+        total = 0
+        for ring in self._rings:
+            if max_count is not None:
+                if total >= max_count:
+                    break
+                total += ring.pop_batch(out, max_count - total)
+            else:
+                total += ring.pop_batch(out)
+        return total
@@ -0,0 +1,461 @@
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import compress, repeat
+from operator import and_, itemgetter, lshift, or_
+from midi.MidiEvent import pack_event
+
+DEFAULT_TEMPO = 500000  # microseconds per beat (120 BPM)
+SUSTAIN_CONTROL = 64
+# Source word of a tempo change: TEMPO_STATUS | tempo << 8 (never stored in `words`)
+TEMPO_STATUS = 0xFF
+# Source word of a time signature: TIME_SIGNATURE_STATUS | numerator << 8 | log2(denominator) << 16
+# (0xF9 is an undefined real-time status, so it never collides with a playable word)
+TIME_SIGNATURE_STATUS = 0xF9
+# Default time signature 4/4 as stored in signature_values: numerator | log2(denominator) << 8
+DEFAULT_SIGNATURE = 4 | 2 << 8
+
+
+class MidiTimeline:
+    """
+    Precompiled, flat event timeline of a MIDI file.
+
+    Playable events are stored as parallel arrays sorted by time: absolute
+    seconds ('d'), absolute ticks ('q'), packed MIDI words ('I', see
+    MidiEvent.pack_event) and voices ('I', track << 4 | channel). Tempo
+    changes are resolved at compile time into a tempo map, so playback only
+    walks the arrays. Time signatures form a separate map used to convert
+    bar numbers to ticks.
+    """
+
+    # Events between state checkpoints used by state_at()
+    CHECKPOINT_INTERVAL = 1024
+    # Events between per-voice checkpoints used by state_at() with enabled voices
+    VOICE_CHECKPOINT_INTERVAL = 4096
+    # Source messages merged per compile_more() call by default
+    COMPILE_CHUNK = 4096
+
+    def __init__(self, ticks_per_beat: int = 480):
+        """
+        Args:
+            ticks_per_beat: Resolution of the source file
+        """
+        self.ticks_per_beat = ticks_per_beat or 480
+        self.times = array('d')
+        self.ticks = array('q')
+        self.words = array('I')
+        # Source track << 4 | channel of every event, see voice_mask()
+        self.voices = array('I')
+        self.track_count = 0
+        # Tempo map: segment start tick / start seconds / tempo in us per beat
+        self.tempo_ticks = array('q', [0])
+        self.tempo_times = array('d', [0.0])
+        self.tempo_values = array('I', [DEFAULT_TEMPO])
+        # Time signature map: segment start tick / bars before it / numerator | log2(denominator) << 8
+        self.signature_ticks = array('q', [0])
+        self.signature_bars = array('d', [0.0])
+        self.signature_values = array('I', [DEFAULT_SIGNATURE])
+        # End of the last message in the file (including meta events)
+        self.end_tick = 0
+        self.duration = 0.0
+        self._start_segment()
+        # (notes, sustain) snapshots before every CHECKPOINT_INTERVAL-th event, extended on use
+        self._checkpoints = None
+        # (keys, indices) snapshots before every VOICE_CHECKPOINT_INTERVAL-th event of the
+        # last event per voice << 16 | key (see _build_voice_checkpoints), extended on use
+        self._voice_checkpoints = None
+        self._voice_last = None
+        # Dense id (< 256) of every event's voice and the voice of every id, so voice_mask()
+        # is one bytes.translate(); _voice_ids is None once a file has more than 256 voices
+        self._voice_ids = bytearray()
+        self._id_voices = []
+        self._voice_id_of = {}
+        # Merged (tick, word) source still to be compiled; None once complete
+        self._source = None
+        self.complete = True
+
+    @classmethod
+    def compile(cls, mid) -> "MidiTimeline":
+        """
+        Compile a mido.MidiFile (or an object with `tracks` and `ticks_per_beat`).
+
+        Messages of all tracks are merged by absolute tick; messages on the
+        same tick keep track order.
+
+        Returns:
+            MidiTimeline: The compiled timeline
+        """
+        timeline = cls.stream(mid, chunk=0)
+        while not timeline.compile_more():
+            pass
+        return timeline
+
+    @classmethod
+    def stream(cls, mid, chunk: int = None) -> "MidiTimeline":
+        """
+        Start compiling `mid` incrementally (see compile()).
+
+        The tracks are merged lazily with a heap, so only one pending
+        message per track is held besides the compiled arrays. Call
+        compile_more() until it returns True (or `complete` is set).
+
+        Args:
+            mid: Source file, as for compile()
+            chunk: Source messages to compile right away (default COMPILE_CHUNK)
+
+        Returns:
+            MidiTimeline: The partially compiled timeline
+        """
+        tracks = [cls._track_events(track, index) for index, track in enumerate(mid.tracks)]
+        return cls.stream_events(getattr(mid, 'ticks_per_beat', 480), tracks, chunk)
+
+    @classmethod
+    def stream_events(cls, ticks_per_beat: int, tracks: list, chunk: int = None) -> "MidiTimeline":
+        """
+        Start compiling per-track event iterators incrementally (see stream()).
+
+        Args:
+            ticks_per_beat: Resolution of the source file
+            tracks: One iterator per track yielding (absolute tick, word, track
+                index) in tick order; word is a packed event, a TEMPO_STATUS
+                word or None for a message that only advances the end tick
+            chunk: Source events to compile right away (default COMPILE_CHUNK)
+
+        Returns:
+            MidiTimeline: The partially compiled timeline
+        """
+        timeline = cls(ticks_per_beat)
+        timeline.track_count = len(tracks)
+        timeline._source = heapq.merge(*tracks, key=itemgetter(0))
+        timeline.complete = False
+        if chunk is None:
+            chunk = cls.COMPILE_CHUNK
+        if chunk:
+            timeline.compile_more(chunk)
+        return timeline
+
+    @classmethod
+    def _track_events(cls, track, index: int = 0):
+        """Yield (absolute tick, word, index) of one time-ordered track of mido messages."""
+        abs_tick = 0
+        message_word = cls._message_word
+        for msg in track:
+            abs_tick += getattr(msg, 'time', 0)
+            yield abs_tick, message_word(msg), index
+
+    def compile_more(self, count: int = None) -> bool:
+        """
+        Compile up to `count` (default COMPILE_CHUNK) more source messages.
+
+        Returns:
+            bool: True once the whole file is compiled
+        """
+        if self._source is None:
+            return True
+        if count is None:
+            count = self.COMPILE_CHUNK
+        add_word = self._add_word
+        tick = self.end_tick
+        for tick, word, track in self._source:
+            if word is not None:
+                add_word(tick, word, track)
+            count -= 1
+            if count <= 0:
+                break
+        else:
+            self._source = None
+            self.complete = True
+        self.end_tick = tick
+        self.duration = self.tick_to_seconds(tick)
+        return self.complete
+
+    def compile_until_seconds(self, seconds: float):
+        """Compile until an event at or after `seconds` exists or the file is complete."""
+        while not self.complete and (not self.times or self.times[-1] < seconds):
+            self.compile_more()
+
+    def compile_until_tick(self, tick: int):
+        """Compile until an event at or after `tick` exists or the file is complete."""
+        while not self.complete and (not self.ticks or self.ticks[-1] < tick):
+            self.compile_more()
+
+    def compile_until_bar(self, bar: float):
+        """Compile until the time signature map is final at the start of `bar` (see bar_to_tick)."""
+        while not self.complete and self.bar_to_tick(bar) > self.end_tick:
+            self.compile_more()
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def tick_to_seconds(self, tick: int) -> float:
+        """Convert an absolute tick to seconds using the tempo map."""
+        i = bisect_right(self.tempo_ticks, tick) - 1
+        if i < 0:
+            i = 0
+        return self.tempo_times[i] + self._ticks_to_seconds(tick - self.tempo_ticks[i], self.tempo_values[i])
+
+    def seconds_to_tick(self, seconds: float) -> int:
+        """Convert seconds to the nearest absolute tick at or before it, using the tempo map."""
+        i = bisect_right(self.tempo_times, seconds) - 1
+        if i < 0:
+            return 0
+        delta = seconds - self.tempo_times[i]
+        return self.tempo_ticks[i] + int(delta * self.ticks_per_beat * 1000000 / self.tempo_values[i])
+
+    def index_at_seconds(self, seconds: float) -> int:
+        """Return the index of the first event at or after `seconds`."""
+        return bisect_left(self.times, seconds)
+
+    def index_at_tick(self, tick: int) -> int:
+        """Return the index of the first event at or after `tick`."""
+        return bisect_left(self.ticks, tick)
+
+    def state_at(self, index: int, enabled: bytes = None) -> tuple:
+        """
+        Return the channel state just before event `index`.
+
+        Args:
+            index: Event index
+            enabled: Optional 1 or 0 per voice, as for voice_mask(); events of
+                disabled voices are ignored. The state is then combined from
+                per-voice checkpoints, so it costs no more than without.
+
+        Returns:
+            tuple: (notes, sustain) where notes is a bytearray of 16 * 128
+                velocities indexed by channel << 7 | note (0 = not sounding)
+                and sustain is a bytearray of the CC64 value per channel
+        """
+        index = max(0, min(index, len(self.words)))
+        if enabled is not None:
+            return self._voice_state_at(index, enabled)
+        self._build_checkpoints()
+        slot = min(index // self.CHECKPOINT_INTERVAL, len(self._checkpoints) - 1)
+        notes, sustain = self._checkpoints[slot]
+        notes = bytearray(notes)
+        sustain = bytearray(sustain)
+        self.apply_events(slot * self.CHECKPOINT_INTERVAL, index, notes, sustain)
+        return notes, sustain
+
+    def apply_events(self, start: int, end: int, notes: bytearray, sustain: bytearray, mask: bytearray = None):
+        """Update `notes` and `sustain` (see state_at) with events start..end-1 enabled in `mask` (default all)."""
+        words = self.words[start:end]
+        if mask is not None:
+            words = compress(words, mask[start:end])
+        self._apply_words(words, notes, sustain)
+
+    @staticmethod
+    def _apply_words(words, notes: bytearray, sustain: bytearray):
+        for word in words:
+            kind = word & 0xF0
+            if kind == 0x90:
+                notes[(word & 0x0F) << 7 | (word >> 8) & 0x7F] = (word >> 16) & 0x7F
+            elif kind == 0x80:
+                notes[(word & 0x0F) << 7 | (word >> 8) & 0x7F] = 0
+            elif kind == 0xB0 and (word >> 8) & 0xFF == SUSTAIN_CONTROL:
+                sustain[word & 0x0F] = (word >> 16) & 0x7F
+
+    def voice_mask(self, enabled: bytes, start: int = 0) -> bytearray:
+        """
+        Return the playback mask of events from `start`.
+
+        Args:
+            enabled: 1 or 0 per voice (track << 4 | channel) for every track
+                of the file, i.e. track_count * 16 entries
+            start: First event covered by the mask
+
+        Returns:
+            bytearray: 1 for every event to play, 0 for every muted event
+        """
+        ids = self._dense_voice_ids()
+        if ids is None:
+            return bytearray(map(enabled.__getitem__, self.voices[start:]))
+        table = bytes(enabled[voice] for voice in self._id_voices).ljust(256, b'\0')
+        return ids[start:].translate(table)
+
+    def _dense_voice_ids(self):
+        """Return _voice_ids extended to all compiled events, or None with more than 256 voices."""
+        ids = self._voice_ids
+        if ids is None or len(ids) == len(self.voices):
+            return ids
+        new = self.voices[len(ids):]
+        id_of = self._voice_id_of
+        for voice in sorted(set(new).difference(id_of)):
+            if len(id_of) == 256:
+                self._voice_ids = None
+                return None
+            id_of[voice] = len(self._id_voices)
+            self._id_voices.append(voice)
+        ids.extend(map(id_of.__getitem__, new))
+        return ids
+
+    def _voice_state_at(self, index: int, enabled: bytes) -> tuple:
+        """state_at() of the voices in `enabled`, from the last per-voice checkpoint before `index`."""
+        interval = self.VOICE_CHECKPOINT_INTERVAL
+        slot = index // interval
+        self._build_voice_checkpoints(slot)
+        slot = min(slot, len(self._voice_checkpoints) - 1)
+        keys, indices = self._voice_checkpoints[slot]
+
+        # Latest event of an enabled voice per note (channel << 7 | note) and pedal (2048 + channel)
+        latest = {}
+        for key, i in zip(keys, indices):
+            if not enabled[key >> 16]:
+                continue
+            status = key & 0xFF
+            data1 = (key >> 8) & 0xFF
+            if status & 0xF0 == 0x80:
+                target = (status & 0x0F) << 7 | data1
+            elif data1 == SUSTAIN_CONTROL:
+                target = 2048 + (status & 0x0F)
+            else:
+                continue
+            if i > latest.get(target, -1):
+                latest[target] = i
+
+        notes = bytearray(16 * 128)
+        sustain = bytearray(16)
+        words = self.words
+        for target, i in latest.items():
+            word = words[i]
+            if target >= 2048:
+                sustain[target - 2048] = (word >> 16) & 0x7F
+            elif word & 0xF0 == 0x90:
+                notes[target] = (word >> 16) & 0x7F
+        start = slot * interval
+        self._apply_words(compress(words[start:index], map(enabled.__getitem__, self.voices[start:index])), notes, sustain)
+        return notes, sustain
+
+    def _build_voice_checkpoints(self, slot: int):
+        """
+        Extend the per-voice checkpoints up to `slot` (as far as events are compiled).
+
+        Each checkpoint maps voice << 16 | key to the index of the last event
+        of that key before it, where key is the event word with Note On and
+        Note Off folded together (word & 0xFFEF: status and data1). Events are
+        Note On/Off and Control Change only, so keys never collide.
+        """
+        if self._voice_checkpoints is None:
+            self._voice_checkpoints = [(array('q'), array('q'))]
+            self._voice_last = {}
+        checkpoints = self._voice_checkpoints
+        interval = self.VOICE_CHECKPOINT_INTERVAL
+        last = self._voice_last
+        slot = min(slot, len(self.words) // interval)
+        while len(checkpoints) <= slot:
+            start = (len(checkpoints) - 1) * interval
+            end = start + interval
+            keys = map(or_, map(lshift, self.voices[start:end], repeat(16)), map(and_, self.words[start:end], repeat(0xFFEF)))
+            # Later events of a key overwrite earlier ones
+            last.update(zip(keys, range(start, end)))
+            checkpoints.append((array('q', last.keys()), array('q', last.values())))
+
+    def _build_checkpoints(self):
+        # Extend from the last checkpoint, so events compiled since the last call are covered
+        if self._checkpoints is None:
+            self._checkpoints = [(bytes(16 * 128), bytes(16))]
+        checkpoints = self._checkpoints
+        interval = self.CHECKPOINT_INTERVAL
+        start = (len(checkpoints) - 1) * interval
+        if start + interval > len(self.words):
+            return
+        notes = bytearray(checkpoints[-1][0])
+        sustain = bytearray(checkpoints[-1][1])
+        for start in range(start, len(self.words) - interval + 1, interval):
+            self.apply_events(start, start + interval, notes, sustain)
+            checkpoints.append((bytes(notes), bytes(sustain)))
+
+    def bar_to_tick(self, bar: float) -> int:
+        """
+        Convert a bar number to the absolute tick at which it starts, using the time signature map.
+
+        Args:
+            bar: Bar number, 1 = first bar; fractions address positions inside a bar
+
+        Returns:
+            int: Absolute tick
+        """
+        bars = max(0.0, bar - 1)
+        i = bisect_right(self.signature_bars, bars) - 1
+        return self.signature_ticks[i] + round((bars - self.signature_bars[i]) * self._bar_ticks(self.signature_values[i]))
+
+    def tempo_at(self, tick: int) -> int:
+        """Return the tempo (us per beat) in effect at `tick`."""
+        i = bisect_right(self.tempo_ticks, tick) - 1
+        return self.tempo_values[max(i, 0)]
+
+    def _bar_ticks(self, signature: int) -> float:
+        # A bar holds numerator notes of 1/denominator, i.e. numerator * 4 / denominator beats
+        return (signature & 0xFF) * self.ticks_per_beat * 4 / (1 << (signature >> 8))
+
+    def _ticks_to_seconds(self, ticks: int, tempo: int) -> float:
+        return ticks * tempo / (self.ticks_per_beat * 1000000.0)
+
+    def _add_tempo(self, tick: int, tempo: int):
+        if tick == self.tempo_ticks[-1]:
+            # Several tempo events on one tick: the last one wins
+            self.tempo_values[-1] = tempo
+            self._start_segment()
+            return
+        self.tempo_times.append(self._segment_time + (tick - self._segment_tick) * self._seconds_per_tick)
+        self.tempo_ticks.append(tick)
+        self.tempo_values.append(tempo)
+        self._start_segment()
+
+    def _add_time_signature(self, tick: int, signature: int):
+        if tick == self.signature_ticks[-1]:
+            # Several time signatures on one tick: the last one wins
+            self.signature_values[-1] = signature
+            return
+        bars = self.signature_bars[-1] + (tick - self.signature_ticks[-1]) / self._bar_ticks(self.signature_values[-1])
+        self.signature_ticks.append(tick)
+        self.signature_bars.append(bars)
+        self.signature_values.append(signature)
+
+    @staticmethod
+    def _message_word(msg):
+        """Return the source word of a mido message, or None if it is not used."""
+        msg_type = getattr(msg, 'type', None)
+        if msg_type == 'set_tempo':
+            tempo = getattr(msg, 'tempo', None)
+            return TEMPO_STATUS | tempo << 8 if tempo else None
+        if msg_type == 'time_signature':
+            numerator = getattr(msg, 'numerator', 0)
+            denominator = getattr(msg, 'denominator', 0)
+            if not numerator or not denominator:
+                return None
+            return TIME_SIGNATURE_STATUS | (numerator & 0xFF) << 8 | (denominator.bit_length() - 1) << 16
+
+        if msg_type in ('note_on', 'note_off'):
+            note = getattr(msg, 'note', None)
+            if note is None:
+                return None
+            velocity = getattr(msg, 'velocity', 0)
+            channel = getattr(msg, 'channel', 0) & 0x0F
+            if msg_type == 'note_off' or velocity == 0:
+                return pack_event(0x80 | channel, note, 0)
+            return pack_event(0x90 | channel, note, velocity)
+
+        if msg_type == 'control_change':
+            channel = getattr(msg, 'channel', 0) & 0x0F
+            return pack_event(0xB0 | channel, getattr(msg, 'control', 0), getattr(msg, 'value', 0))
+
+        return None
+
+    def _add_word(self, tick: int, word: int, track: int = 0):
+        status = word & 0xFF
+        if status == TEMPO_STATUS:
+            self._add_tempo(tick, word >> 8)
+            return
+        if status == TIME_SIGNATURE_STATUS:
+            self._add_time_signature(tick, word >> 8)
+            return
+        self.times.append(self._segment_time + (tick - self._segment_tick) * self._seconds_per_tick)
+        self.ticks.append(tick)
+        self.words.append(word)
+        self.voices.append(track << 4 | (word & 0x0F))
+
+    def _start_segment(self):
+        # Compile adds ticks in order, so new messages always fall in the last tempo segment
+        self._segment_tick = self.tempo_ticks[-1]
+        self._segment_time = self.tempo_times[-1]
+        self._seconds_per_tick = self._ticks_to_seconds(1, self.tempo_values[-1])
@@ -0,0 +1,216 @@
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from midi.MidiTimeline import MidiTimeline
+
+
+class MidiTimelineCache:
+    """
+    On-disk cache of compiled MidiTimelines.
+
+    Each source file maps to one cache file named after a hash of its
+    absolute path. The cache file header records the source size, mtime and
+    a sampled content hash; an entry is used only if all three still match.
+    The event arrays, tempo map and time signature map are stored raw after
+    the header and are loaded as memoryviews over a read-only memory map, so
+    opening a cached file costs no parsing or copying.
+
+    The total size of the directory is capped; least recently used entries
+    (by cache file mtime, refreshed on every hit) are evicted first.
+
+    By default the cache lives in the per-user cache directory
+    (%LOCALAPPDATA%\\CKey\\timelines on Windows, $XDG_CACHE_HOME/CKey/timelines
+    or ~/.cache/CKey/timelines elsewhere), never inside the installation.
+    """
+
+    APP_NAME = "CKey"
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+    SUFFIX = ".ctl"
+    MAGIC = b"CKTL"
+    # Bump when the stored layout or MidiTimeline contents change
+    VERSION = 3
+    # Bytes hashed at the start, middle and end of the source file
+    HASH_SAMPLE = 64 * 1024
+    # magic, byte order, version, source size, source mtime_ns, content hash,
+    # ticks_per_beat, end_tick, duration, event count, tempo segment count, track count,
+    # time signature segment count
+    HEADER = struct.Struct("=4sc3xIQq16sIqdQQQQ")
+
+    def __init__(self, directory: str = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            directory: Directory holding the cache files (created on first store);
+                defaults to default_directory()
+            max_bytes: Size cap of all cache files together
+        """
+        self.directory = directory if directory is not None else self.default_directory()
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def default_directory(cls) -> str:
+        """
+        Return the per-user timeline cache directory of this platform.
+
+        Returns:
+            str: %LOCALAPPDATA%\\CKey\\timelines on Windows, otherwise
+                $XDG_CACHE_HOME/CKey/timelines or ~/.cache/CKey/timelines
+        """
+        if sys.platform == "win32":
+            base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+        else:
+            base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        return os.path.join(base, cls.APP_NAME, "timelines")
+
+    def load(self, path: str):
+        """
+        Return the cached MidiTimeline of `path`, or None if there is no valid entry.
+        """
+        source = self._source_key(path)
+        if source is None:
+            return None
+        cache_path = self._cache_path(path)
+        try:
+            with open(cache_path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            timeline = self._read(memoryview(data), source)
+        except (struct.error, ValueError, TypeError) as e:
+            print(f"Ignoring broken timeline cache '{cache_path}': {e}")
+            timeline = None
+        if timeline is None:
+            data.close()
+            return None
+
+        # Mark as recently used
+        try:
+            os.utime(cache_path)
+        except OSError:
+            pass
+        return timeline
+
+    def store(self, path: str, timeline: MidiTimeline) -> bool:
+        """
+        Write the complete `timeline` of `path` to the cache and evict old entries.
+
+        Returns:
+            bool: True if the entry was written
+        """
+        if not timeline.complete:
+            return False
+        source = self._source_key(path)
+        if source is None:
+            return False
+        size, mtime_ns, digest = source
+        header = self.HEADER.pack(
+            self.MAGIC, sys.byteorder[0].encode(), self.VERSION, size, mtime_ns, digest,
+            timeline.ticks_per_beat, timeline.end_tick, timeline.duration,
+            len(timeline.words), len(timeline.tempo_values), timeline.track_count,
+            len(timeline.signature_values),
+        )
+
+        cache_path = self._cache_path(path)
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                f.write(header)
+                for values in self._arrays(timeline):
+                    f.write(memoryview(values).cast('B'))
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            # E.g. the old entry is still mapped on Windows
+            print(f"Failed to write timeline cache '{cache_path}': {e}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return False
+
+        self._evict(keep=cache_path)
+        return True
+
+    def _read(self, view: memoryview, source: tuple):
+        (magic, byteorder, version, size, mtime_ns, digest, ticks_per_beat,
+         end_tick, duration, count, tempo_count, track_count, signature_count) = self.HEADER.unpack_from(view)
+        if (magic != self.MAGIC or byteorder != sys.byteorder[0].encode()
+                or version != self.VERSION or (size, mtime_ns, digest) != source):
+            return None
+
+        timeline = MidiTimeline(ticks_per_beat)
+        offset = self.HEADER.size
+        arrays = []
+        for typecode, length in (('d', count), ('q', count), ('q', tempo_count), ('d', tempo_count),
+                                 ('q', signature_count), ('d', signature_count),
+                                 ('I', count), ('I', count), ('I', tempo_count), ('I', signature_count)):
+            end = offset + length * struct.calcsize(typecode)
+            if end > len(view):
+                raise ValueError("truncated cache file")
+            arrays.append(view[offset:end].cast(typecode))
+            offset = end
+        (timeline.times, timeline.ticks, timeline.tempo_ticks, timeline.tempo_times,
+         timeline.signature_ticks, timeline.signature_bars,
+         timeline.words, timeline.voices, timeline.tempo_values, timeline.signature_values) = arrays
+        timeline.track_count = track_count
+        timeline.end_tick = end_tick
+        timeline.duration = duration
+        return timeline
+
+    def _arrays(self, timeline: MidiTimeline) -> tuple:
+        # 8-byte arrays first so every array starts aligned to its item size
+        return (timeline.times, timeline.ticks, timeline.tempo_ticks, timeline.tempo_times,
+                timeline.signature_ticks, timeline.signature_bars,
+                timeline.words, timeline.voices, timeline.tempo_values, timeline.signature_values)
+
+    def _evict(self, keep: str = None):
+        """Remove least recently used cache files until the directory fits max_bytes."""
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith(self.SUFFIX):
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    total += st.st_size
+                    entries.append((st.st_mtime_ns, st.st_size, entry.path))
+        except OSError:
+            return
+
+        entries.sort()
+        for _, size, entry_path in entries:
+            if total <= self.max_bytes:
+                break
+            if entry_path == keep:
+                continue
+            try:
+                os.remove(entry_path)
+                total -= size
+            except OSError:
+                # Still mapped (Windows) or already gone
+                pass
+
+    def _cache_path(self, path: str) -> str:
+        name = hashlib.sha1(os.path.abspath(path).encode('utf-8', 'surrogateescape')).hexdigest()
+        return os.path.join(self.directory, name + self.SUFFIX)
+
+    def _source_key(self, path: str):
+        """Return (size, mtime_ns, sampled content hash) of `path`, or None if it cannot be read."""
+        try:
+            st = os.stat(path)
+            digest = hashlib.blake2b(str(st.st_size).encode(), digest_size=16)
+            with open(path, 'rb') as f:
+                sample = self.HASH_SAMPLE
+                for start in (0, (st.st_size - sample) // 2, st.st_size - sample):
+                    f.seek(max(0, start))
+                    digest.update(f.read(sample))
+        except (OSError, TypeError, ValueError):
+            return None
+        return (st.st_size, st.st_mtime_ns, digest.digest())
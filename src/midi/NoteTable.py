@@ -0,0 +1,35 @@
+# Note identity tables shared by the MIDI pipeline and the keyboard.
+#
+# Octave numbers follow the keyboard labels: note 60 (middle C) is "C3" and
+# the lowest piano key, note 21, is "A-1".
+
+NOTE_COUNT = 128
+
+PITCH_CLASS_NAMES = ("C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B")
+OCTAVE_OFFSET = -2
+
+# 88-key piano range
+PIANO_LOWEST_NOTE = 21
+PIANO_HIGHEST_NOTE = 108
+
+NOTE_NAMES = tuple(
+    f"{PITCH_CLASS_NAMES[note % 12]}{note // 12 + OCTAVE_OFFSET}" for note in range(NOTE_COUNT)
+)
+NOTE_NUMBERS = {name: note for note, name in enumerate(NOTE_NAMES)}
+
+
+def note_name(note: int) -> str:
+    """Return the name of MIDI note number `note`, or "" if out of range."""
+    if 0 <= note < NOTE_COUNT:
+        return NOTE_NAMES[note]
+    return ""
+
+
+def note_number(name: str) -> int:
+    """Return the MIDI note number for `name`, or -1 if unknown."""
+    return NOTE_NUMBERS.get(name, -1)
+
+
+def is_black_key(note: int) -> bool:
+    """Return True if `note` is a sharp (black key)."""
+    return PITCH_CLASS_NAMES[note % 12].endswith("#")
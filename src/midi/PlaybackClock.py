@@ -0,0 +1,165 @@
+import math
+import time
+from collections import deque
+from threading import Event
+
+
+class PlaybackClock:
+    """
+    Absolute-deadline clock for file playback.
+
+    Timeline positions (seconds from the start of the file) are mapped to
+    perf_counter() deadlines from a single anchor, so scheduling error never
+    accumulates. Waiting sleeps on an Event until shortly before the
+    deadline and spins for the rest. Lateness of every emitted event is
+    recorded for get_timing_report().
+
+    A playback speed scales timeline positions to wall time; changing it
+    re-anchors at the current position, so nothing jumps or drifts.
+    """
+
+    # Seconds before a deadline at which sleeping switches to spinning
+    SPIN_THRESHOLD = 0.0015
+    # Number of recent lateness samples kept for percentiles
+    SAMPLE_COUNT = 4096
+    MIN_SPEED = 0.25
+    MAX_SPEED = 4.0
+
+    def __init__(self, interrupt: Event = None, spin_threshold: float = SPIN_THRESHOLD):
+        """
+        Args:
+            interrupt: Event that cuts a wait short when set (it is cleared on return)
+            spin_threshold: Seconds to spin instead of sleep before a deadline
+        """
+        self._interrupt = interrupt if interrupt is not None else Event()
+        self._spin_threshold = spin_threshold
+        # (perf_counter() at timeline 0, speed), replaced as a whole so readers never see a mix
+        self._anchor = (time.perf_counter(), 1.0)
+        self.reset_stats()
+
+    def start(self, position: float = 0.0, delay: float = 0.0):
+        """Anchor the clock so that `position` is reached `delay` wall-clock seconds from now."""
+        speed = self._anchor[1]
+        self._anchor = (time.perf_counter() + delay - position / speed, speed)
+
+    def wrap(self, end: float, start: float):
+        """Re-anchor so that `start` is due exactly when `end` was, to loop back without a gap or drift."""
+        origin, speed = self._anchor
+        self._anchor = (origin + (end - start) / speed, speed)
+
+    def position(self) -> float:
+        """Return the current timeline position in seconds."""
+        origin, speed = self._anchor
+        return (time.perf_counter() - origin) * speed
+
+    def position_in(self, seconds: float) -> float:
+        """Return the timeline position `seconds` of wall-clock time from now."""
+        origin, speed = self._anchor
+        return (time.perf_counter() + seconds - origin) * speed
+
+    def get_speed(self) -> float:
+        return self._anchor[1]
+
+    def set_speed(self, speed: float) -> float:
+        """
+        Change the playback speed, keeping the current position.
+
+        A wait in progress keeps its old deadline; set the interrupt Event
+        to make it recompute.
+
+        Args:
+            speed: Timeline seconds per wall-clock second, clamped to MIN_SPEED..MAX_SPEED
+
+        Returns:
+            float: The speed that was applied
+        """
+        speed = min(self.MAX_SPEED, max(self.MIN_SPEED, float(speed)))
+        now = time.perf_counter()
+        origin, old_speed = self._anchor
+        position = (now - origin) * old_speed
+        self._anchor = (now - position / speed, speed)
+        return speed
+
+    def deadline(self, position: float) -> float:
+        """Return the perf_counter() time at which timeline `position` is due."""
+        origin, speed = self._anchor
+        return origin + position / speed
+
+    def remaining(self, position: float) -> float:
+        """Return the wall-clock seconds left until the deadline of `position` (negative if past)."""
+        return self.deadline(position) - time.perf_counter()
+
+    def wait_until(self, position: float, lead: float = 0.0) -> bool:
+        """
+        Wait until `lead` wall-clock seconds before the deadline of timeline `position`.
+
+        Returns:
+            bool: True when the deadline is reached, False if interrupted first
+        """
+        deadline = self.deadline(position) - lead
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return True
+
+        if remaining > self._spin_threshold:
+            if self._interrupt.wait(remaining - self._spin_threshold):
+                self._interrupt.clear()
+                return False
+
+        while time.perf_counter() < deadline:
+            if self._interrupt.is_set():
+                self._interrupt.clear()
+                return False
+            # Yield the GIL while spinning
+            time.sleep(0)
+        return True
+
+    def record(self, position: float):
+        """Record the lateness of an event scheduled at `position` that was just emitted."""
+        late = time.perf_counter() - self.deadline(position)
+        if self._count == 0:
+            self._first_late = late
+        self._count += 1
+        self._sum += late
+        self._sum_sq += late * late
+        if late > self._max_late:
+            self._max_late = late
+        self._last_late = late
+        self._samples.append(late)
+
+    def reset_stats(self):
+        self._count = 0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._max_late = 0.0
+        self._first_late = 0.0
+        self._last_late = 0.0
+        self._samples = deque(maxlen=self.SAMPLE_COUNT)
+
+    def get_timing_report(self) -> dict:
+        """
+        Return timing statistics of the recorded events, in milliseconds.
+
+        Returns:
+            dict: events, mean_late_ms, jitter_ms (standard deviation of
+                lateness), p99_late_ms (over recent events), max_late_ms and
+                drift_ms (lateness of the last event minus the first)
+        """
+        count = self._count
+        if count == 0:
+            return {
+                'events': 0, 'mean_late_ms': 0.0, 'jitter_ms': 0.0,
+                'p99_late_ms': 0.0, 'max_late_ms': 0.0, 'drift_ms': 0.0,
+            }
+        mean = self._sum / count
+        variance = max(0.0, self._sum_sq / count - mean * mean)
+        samples = sorted(self._samples)
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        return {
+            'events': count,
+            'mean_late_ms': mean * 1000.0,
+            'jitter_ms': math.sqrt(variance) * 1000.0,
+            'p99_late_ms': p99 * 1000.0,
+            'max_late_ms': self._max_late * 1000.0,
+            'drift_ms': (self._last_late - self._first_late) * 1000.0,
+        }
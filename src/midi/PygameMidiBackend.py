@@ -31,5 +31,11 @@ class PygameMidiBackend(MidiBackend):
     def create_input(self, device_id: int) -> Any:
         return pygame.midi.Input(device_id)
 
-    def create_output(self, device_id: int) -> Any:
-        return pygame.midi.Output(device_id)
+    def create_output(self, device_id: int, latency: int = 0) -> Any:
+        return pygame.midi.Output(device_id, latency=latency)
+
+    def supports_timestamps(self) -> bool:
+        return True
+
+    def get_time_ms(self) -> int:
+        return pygame.midi.time()
@@ -0,0 +1,158 @@
+import mmap
+import struct
+from midi.MidiTimeline import MidiTimeline, TEMPO_STATUS, TIME_SIGNATURE_STATUS
+
+
+class SmfDecoder:
+    """
+    Standard MIDI File decoder that feeds MidiTimeline without mido.
+
+    The file is read through a memory map: the header and chunk table are
+    parsed in place and only MTrk payloads are copied out before the map is
+    closed. Tracks are decoded lazily into (tick, word, track) tuples,
+    handling variable-length deltas and running status directly. Only what
+    the timeline uses is kept: note on/off, control change, tempo and time
+    signature; other messages only advance the track's tick.
+
+    decode() raises ValueError for files it cannot read (including SMPTE
+    time division) so callers can fall back to mido. Malformed track data
+    found later, while compiling, ends that track with a warning instead.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Path of the .mid file
+        """
+        self.path = path
+        self.format = 0
+        self.ticks_per_beat = 480
+        # Raw MTrk payloads, in file order
+        self.tracks = []
+
+    def decode(self) -> "SmfDecoder":
+        """
+        Read the header and track chunks of the file.
+
+        Returns:
+            SmfDecoder: self, for chaining
+        """
+        with open(self.path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                self._read_chunks(data)
+        return self
+
+    def stream(self, chunk: int = None) -> MidiTimeline:
+        """Return a MidiTimeline compiling the decoded tracks incrementally (see MidiTimeline.stream)."""
+        tracks = [self._track_events(track, index) for index, track in enumerate(self.tracks)]
+        return MidiTimeline.stream_events(self.ticks_per_beat, tracks, chunk)
+
+    def _read_chunks(self, data):
+        if len(data) < 14 or data[0:4] != b'MThd':
+            raise ValueError("not a Standard MIDI File")
+        header_length = struct.unpack_from('>I', data, 4)[0]
+        if header_length < 6:
+            raise ValueError("short MThd chunk")
+        self.format, track_count, division = struct.unpack_from('>HHH', data, 8)
+        if division & 0x8000:
+            raise ValueError("SMPTE time division is not supported")
+        self.ticks_per_beat = division
+
+        tracks = []
+        pos = 8 + header_length
+        size = len(data)
+        while pos + 8 <= size and len(tracks) < track_count:
+            chunk_type = data[pos:pos + 4]
+            length = struct.unpack_from('>I', data, pos + 4)[0]
+            pos += 8
+            if chunk_type == b'MTrk':
+                # Copy the payload out; a truncated last chunk keeps what is there
+                tracks.append(data[pos:pos + length])
+            pos += length
+        self.tracks = tracks
+
+    @staticmethod
+    def _track_events(data: bytes, index: int = 0):
+        """
+        Yield (absolute tick, word, index) of one MTrk payload (see MidiTimeline.stream_events).
+
+        A final (end tick, None, index) marks the end of the track.
+        """
+        pos = 0
+        end = len(data)
+        tick = 0
+        status = 0
+        try:
+            while pos < end:
+                # Variable-length delta time
+                b = data[pos]
+                pos += 1
+                delta = b & 0x7F
+                while b & 0x80:
+                    b = data[pos]
+                    pos += 1
+                    delta = (delta << 7) | (b & 0x7F)
+                tick += delta
+
+                b = data[pos]
+                if b & 0x80:
+                    pos += 1
+                    if b == 0xFF:
+                        meta_type = data[pos]
+                        pos += 1
+                        length, pos = SmfDecoder._read_vlq(data, pos)
+                        if meta_type == 0x51 and length == 3:
+                            tempo = data[pos] << 16 | data[pos + 1] << 8 | data[pos + 2]
+                            if tempo:
+                                yield tick, TEMPO_STATUS | tempo << 8, index
+                        elif meta_type == 0x58 and length >= 2:
+                            if data[pos] and data[pos + 1] < 8:
+                                yield tick, TIME_SIGNATURE_STATUS | data[pos] << 8 | data[pos + 1] << 16, index
+                        elif meta_type == 0x2F:
+                            break
+                        pos += length
+                        continue
+                    if b == 0xF0 or b == 0xF7:
+                        length, pos = SmfDecoder._read_vlq(data, pos)
+                        pos += length
+                        continue
+                    if b > 0xF0:
+                        print(f"SMF track: unexpected status 0x{b:02X} at byte {pos - 1}, skipping the rest of the track")
+                        break
+                    status = b
+                elif not status:
+                    print(f"SMF track: data byte without status at byte {pos}, skipping the rest of the track")
+                    break
+
+                kind = status & 0xF0
+                if kind == 0xC0 or kind == 0xD0:
+                    pos += 1
+                    continue
+                data1 = data[pos]
+                data2 = data[pos + 1]
+                pos += 2
+                if kind == 0x90:
+                    if data2:
+                        yield tick, status | data1 << 8 | data2 << 16, index
+                    else:
+                        yield tick, (status & 0x8F) | data1 << 8, index
+                elif kind == 0x80:
+                    yield tick, status | data1 << 8, index
+                elif kind == 0xB0:
+                    yield tick, status | data1 << 8 | data2 << 16, index
+        except IndexError:
+            # Truncated track: keep the events decoded so far
+            pass
+        yield tick, None, index
+
+    @staticmethod
+    def _read_vlq(data: bytes, pos: int) -> tuple:
+        """Return (value, next position) of the variable-length quantity at `pos`."""
+        b = data[pos]
+        pos += 1
+        value = b & 0x7F
+        while b & 0x80:
+            b = data[pos]
+            pos += 1
+            value = (value << 7) | (b & 0x7F)
+        return value, pos
@@ -9,7 +9,7 @@ from src.config.Setting import (
     MIN_WIDTH, MAX_WIDTH, DEFAULT_WIDTH,
     MIN_HEIGHT, MAX_HEIGHT, DEFAULT_HEIGHT,
     DEFAULT_KEY_PUSHED_COLOR, DEFAULT_ENABLE_MIDI_FILE,
-    DEFAULT_SHOW_IMAGE_FRAME,
+    DEFAULT_SHOW_IMAGE_FRAME, DEFAULT_CANVAS_KEYBOARD,
     round
 )
 
@@ -92,6 +92,7 @@ class TestGuiSettingInitialization:
         assert gui_setting.EnableMidiFile == DEFAULT_ENABLE_MIDI_FILE
         assert gui_setting.ImagePath == ""
         assert gui_setting.ShowImageFrame == DEFAULT_SHOW_IMAGE_FRAME
+        assert gui_setting.CanvasKeyboard == DEFAULT_CANVAS_KEYBOARD
 
 
 class TestGuiSettingWidth:
@@ -583,6 +584,58 @@ class TestGuiSettingShowImageFrame:
         assert gui_setting.ShowImageFrame is False
 
 
+class TestGuiSettingCanvasKeyboard:
+    """Test GuiSetting CanvasKeyboard property."""
+    
+    def test_canvas_keyboard_default_value(self):
+        # Arrange
+        gui_setting = GuiSetting()
+        
+        # Act & Assert
+        assert gui_setting.CanvasKeyboard is False
+
+    def test_canvas_keyboard_set_bool_true(self):
+        # Arrange
+        gui_setting = GuiSetting()
+        
+        # Act
+        gui_setting.CanvasKeyboard = True
+        
+        # Assert
+        assert gui_setting.CanvasKeyboard is True
+
+    def test_canvas_keyboard_string_true(self):
+        # Arrange
+        gui_setting = GuiSetting()
+        
+        # Act
+        gui_setting.CanvasKeyboard = "True"
+        
+        # Assert
+        assert gui_setting.CanvasKeyboard is True
+
+    def test_canvas_keyboard_string_false(self):
+        # Arrange
+        gui_setting = GuiSetting()
+        gui_setting.CanvasKeyboard = True
+        
+        # Act
+        gui_setting.CanvasKeyboard = "false"
+        
+        # Assert
+        assert gui_setting.CanvasKeyboard is False
+
+    def test_canvas_keyboard_int_nonzero(self):
+        # Arrange
+        gui_setting = GuiSetting()
+        
+        # Act
+        gui_setting.CanvasKeyboard = 1
+        
+        # Assert
+        assert gui_setting.CanvasKeyboard is True
+
+
 class TestSettingInitialization:
     """Test Setting initialization with config file handling."""
     
@@ -693,6 +746,7 @@ class TestSettingLoadSave:
                 setting.gui.EnableMidiFile = False
                 setting.gui.ImagePath = "/path/to/image.png"
                 setting.gui.ShowImageFrame = False
+                setting.gui.CanvasKeyboard = True
                 setting.save_setting()
             
             # Assert
@@ -706,6 +760,7 @@ class TestSettingLoadSave:
             assert parser["GUI"]["EnableMidiFile"] == "False"
             assert parser["GUI"]["ImagePath"] == "/path/to/image.png"
             assert parser["GUI"]["ShowImageFrame"] == "False"
+            assert parser["GUI"]["CanvasKeyboard"] == "True"
         finally:
             shutil.rmtree(temp_dir)
 
@@ -789,6 +844,52 @@ class TestSettingLoadSave:
         finally:
             shutil.rmtree(temp_dir)
 
+    def test_load_setting_with_missing_canvas_keyboard(self):
+        # Arrange
+        temp_dir = tempfile.mkdtemp()
+        config_path = os.path.join(temp_dir, "config.ini")
+        
+        try:
+            # Create config without CanvasKeyboard
+            import configparser
+            parser = configparser.ConfigParser()
+            parser["GUI"] = {
+                "Width": "1000",
+                "Height": "500",
+                "KeyPushedColor": "blue"
+            }
+            with open(config_path, 'w') as f:
+                parser.write(f)
+            
+            # Act
+            with mock.patch.object(Setting, 'CONFIG_FILE', config_path):
+                setting = Setting()
+            
+            # Assert - Should use default value
+            assert setting.gui.CanvasKeyboard == DEFAULT_CANVAS_KEYBOARD
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_load_setting_with_canvas_keyboard(self):
+        # Arrange
+        temp_dir = tempfile.mkdtemp()
+        config_path = os.path.join(temp_dir, "config.ini")
+        
+        try:
+            with mock.patch.object(Setting, 'CONFIG_FILE', config_path):
+                setting1 = Setting()
+                setting1.gui.CanvasKeyboard = True
+                setting1.save_setting()
+            
+            # Act - Load in new instance
+            with mock.patch.object(Setting, 'CONFIG_FILE', config_path):
+                setting2 = Setting()
+            
+            # Assert
+            assert setting2.gui.CanvasKeyboard is True
+        finally:
+            shutil.rmtree(temp_dir)
+
     def test_load_setting_with_image_path(self):
         # Arrange
         temp_dir = tempfile.mkdtemp()
@@ -874,5 +975,6 @@ class TestSettingDefaultConfig:
             assert parser["GUI"]["EnableMidiFile"] == str(DEFAULT_ENABLE_MIDI_FILE)
             assert parser["GUI"]["ImagePath"] == ""
             assert parser["GUI"]["ShowImageFrame"] == str(DEFAULT_SHOW_IMAGE_FRAME)
+            assert parser["GUI"]["CanvasKeyboard"] == str(DEFAULT_CANVAS_KEYBOARD)
         finally:
             shutil.rmtree(temp_dir)
@@ -0,0 +1,190 @@
+import sys
+import types
+import pytest
+
+# Arrange: provide a safe fake tkinter before importing modules under test
+class _FakeFrame:
+    def __init__(self, *args, **kwargs):
+        pass
+    def config(self, **kwargs):
+        pass
+    def place(self, **kwargs):
+        pass
+    def bind(self, *args, **kwargs):
+        pass
+    def after_idle(self, func):
+        self.__dict__.setdefault("idle_calls", []).append(func)
+
+
+class _FakeCanvas(_FakeFrame):
+    def __init__(self, *args, **kwargs):
+        self.items = {}
+        self.itemconfigure_calls = []
+    def pack(self, **kwargs):
+        pass
+    def delete(self, *args, **kwargs):
+        pass
+    def winfo_width(self):
+        return 100
+    def winfo_height(self):
+        return 100
+    def create_oval(self, *args, **kwargs):
+        return self._create(args, kwargs)
+    def create_rectangle(self, *args, **kwargs):
+        return self._create(args, kwargs)
+    def _create(self, coords, options):
+        item = len(self.items) + 1
+        self.items[item] = {"coords": list(coords), **options}
+        return item
+    def itemconfigure(self, item, **kwargs):
+        self.itemconfigure_calls.append((item, kwargs))
+        self.items[item].update(kwargs)
+    def coords(self, item, *coords):
+        self.items[item]["coords"] = list(coords)
+
+
+fake_tkinter = types.SimpleNamespace(
+    ACTIVE="active",
+    NORMAL="normal",
+    BOTH="both",
+    Frame=_FakeFrame,
+    Button=_FakeFrame,
+    Canvas=_FakeCanvas,
+)
+sys.modules.setdefault("tkinter", fake_tkinter)
+
+from src.config.Setting import Setting
+from src.gui.piano.CanvasKeyBoard import CanvasKeyBoard
+from src.midi.NoteTable import PIANO_LOWEST_NOTE, PIANO_HIGHEST_NOTE, note_number
+
+
+class FakeMidi:
+    def __init__(self):
+        self.events = []
+    def add_key_event(self, note, is_note_on, velocity=100):
+        self.events.append((note, is_note_on))
+
+
+class FakeEvent:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+@pytest.fixture
+def setting():
+    s = Setting()
+    s.gui.Width = 1040
+    s.gui.Height = 600
+    s.gui.KeyPushedColor = "lightblue"
+    return s
+
+
+@pytest.fixture
+def keyboard(setting, monkeypatch):
+    # Use this module's fake canvas even if another test installed its own tkinter fake first
+    monkeypatch.setattr(sys.modules[CanvasKeyBoard.__module__], "tkinter", fake_tkinter)
+    return CanvasKeyBoard(master=None, setting=setting, midi=FakeMidi())
+
+
+def test_creates_one_rectangle_per_piano_key(keyboard):
+    # Arrange
+    notes = range(PIANO_LOWEST_NOTE, PIANO_HIGHEST_NOTE + 1)
+    # Act
+    items = [keyboard._find_key(note) for note in notes]
+    # Assert
+    assert None not in items
+    assert len(set(items)) == 88
+    assert len(keyboard.canvas.items) == 88
+
+
+def test_set_key_state_changes_fill_with_itemconfigure(keyboard):
+    # Arrange
+    note = note_number("C3")
+    item = keyboard._find_key(note)
+    # Act
+    keyboard.set_key_state(note, "active")
+    # Assert
+    assert keyboard.canvas.items[item]["fill"] == "lightblue"
+    # Act
+    keyboard.set_key_state(note, "normal")
+    # Assert
+    assert keyboard.canvas.items[item]["fill"] == "white"
+
+
+def test_black_key_returns_to_black(keyboard):
+    # Arrange
+    note = note_number("C#3")
+    item = keyboard._find_key(note)
+    # Act
+    keyboard.set_key_state(note, "active")
+    keyboard.set_key_state(note, "normal")
+    # Assert
+    assert keyboard.canvas.items[item]["fill"] == "black"
+
+
+def test_set_key_state_skips_unchanged_state(keyboard):
+    # Arrange
+    note = note_number("C3")
+    # Act
+    keyboard.set_key_state(note, "normal")
+    keyboard.set_key_state(note, "active")
+    keyboard.set_key_state(note, "active")
+    # Assert
+    assert len(keyboard.canvas.itemconfigure_calls) == 1
+
+
+def test_set_key_states_applies_every_entry(keyboard):
+    # Arrange
+    c3, e3 = note_number("C3"), note_number("E3")
+    # Act
+    keyboard.set_key_states({c3: "active", e3: "active"})
+    # Assert
+    assert keyboard.canvas.items[keyboard._find_key(c3)]["fill"] == "lightblue"
+    assert keyboard.canvas.items[keyboard._find_key(e3)]["fill"] == "lightblue"
+
+
+def test_set_key_state_ignores_unknown_notes(keyboard, capsys):
+    # Arrange
+    # Act
+    keyboard.set_key_state(-1, "active")
+    # Assert
+    assert keyboard.canvas.itemconfigure_calls == []
+    assert capsys.readouterr().out == ""
+
+
+def test_resize_moves_rectangles(keyboard):
+    # Arrange
+    note = note_number("B-1")
+    item = keyboard._find_key(note)
+    # Act
+    keyboard.resize_keyboard(520, 300)
+    for func in keyboard.__dict__.pop("idle_calls", []):
+        func()
+    # Assert: second white key, 10 px wide
+    assert keyboard.canvas.items[item]["coords"] == [10, 0, 20, 50]
+
+
+def test_press_and_release_send_note_under_pointer(keyboard):
+    # Arrange: 20 px white keys, black keys 10 px wide starting 15 px into a slot
+    white = FakeEvent(5, 90)
+    black = FakeEvent(18, 10)
+    # Act
+    keyboard._on_press(white)
+    keyboard._on_release(white)
+    keyboard._on_press(black)
+    keyboard._on_release(FakeEvent(500, 90))
+    # Assert: release always ends the pressed note
+    assert keyboard.midi.events == [
+        (note_number("A-1"), True), (note_number("A-1"), False),
+        (note_number("A#-1"), True), (note_number("A#-1"), False),
+    ]
+
+
+def test_press_outside_keys_is_ignored(keyboard):
+    # Arrange
+    # Act
+    keyboard._on_press(FakeEvent(5, keyboard.KEY_HEIGHT + 1))
+    keyboard._on_release(FakeEvent(5, keyboard.KEY_HEIGHT + 1))
+    # Assert
+    assert keyboard.midi.events == []
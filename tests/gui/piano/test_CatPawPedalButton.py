@@ -0,0 +1,130 @@
+import sys
+import types
+import pytest
+
+# Arrange: provide a safe fake tkinter before importing modules under test
+class _FakeFrame:
+    def __init__(self, *args, **kwargs):
+        pass
+    def config(self, **kwargs):
+        pass
+    def place(self, **kwargs):
+        pass
+    def bind(self, *args, **kwargs):
+        pass
+
+
+fake_tkinter = types.SimpleNamespace(
+    ACTIVE="active",
+    NORMAL="normal",
+    BOTH="both",
+    Frame=_FakeFrame,
+    Button=_FakeFrame,
+    Canvas=_FakeFrame,
+)
+sys.modules.setdefault("tkinter", fake_tkinter)
+
+from src.config.Setting import Setting
+from src.gui.piano.CatPawPedalButton import CatPawPedalButton
+
+
+class RecordingCanvas:
+    """Canvas fake that records item calls."""
+    def __init__(self, *args, **kwargs):
+        self.width = 100
+        self.height = 100
+        self.created = []
+        self.fills = []
+        self.moved = []
+        self.deleted = 0
+    def config(self, **kwargs):
+        pass
+    def pack(self, **kwargs):
+        pass
+    def bind(self, *args, **kwargs):
+        pass
+    def winfo_width(self):
+        return self.width
+    def winfo_height(self):
+        return self.height
+    def delete(self, *args):
+        self.deleted += 1
+    def create_oval(self, *coords, **kwargs):
+        self.created.append((coords, kwargs))
+        return len(self.created)
+    def itemconfigure(self, item, **kwargs):
+        self.fills.append((item, kwargs["fill"]))
+    def coords(self, item, *coords):
+        self.moved.append((item, coords))
+
+
+@pytest.fixture
+def paw(monkeypatch):
+    monkeypatch.setattr(sys.modules[CatPawPedalButton.__module__], "Canvas", RecordingCanvas)
+    setting = Setting()
+    setting.gui.KeyPushedColor = "lightblue"
+    return CatPawPedalButton(setting=setting)
+
+
+def test_creates_seven_ovals_once(paw):
+    # Arrange
+    # Act
+    paw._draw_paw()
+    # Assert
+    assert len(paw.canvas.created) == 7
+    assert all(kwargs["fill"] == "white" for _, kwargs in paw.canvas.created)
+
+
+def test_state_change_only_updates_fill(paw):
+    # Arrange
+    canvas = paw.canvas
+    # Act
+    paw.config(state="active")
+    # Assert
+    assert len(canvas.created) == 7
+    assert canvas.deleted == 0
+    assert canvas.fills == [(item, "lightblue") for item in range(1, 8)]
+    # Act
+    paw.config(state="normal")
+    # Assert
+    assert canvas.fills[7:] == [(item, "white") for item in range(1, 8)]
+
+
+def test_repeated_state_does_not_touch_canvas(paw):
+    # Arrange
+    paw.config(state="active")
+    count = len(paw.canvas.fills)
+    # Act
+    paw.config(state="active")
+    paw._on_press(None)
+    # Assert
+    assert len(paw.canvas.fills) == count
+
+
+def test_press_and_release_update_fill(paw):
+    # Arrange
+    # Act
+    paw._on_press(None)
+    paw._on_release(None)
+    # Assert
+    assert [fill for _, fill in paw.canvas.fills] == ["lightblue"] * 7 + ["white"] * 7
+
+
+def test_configure_with_same_size_keeps_geometry(paw):
+    # Arrange
+    # Act
+    paw._on_configure(None)
+    # Assert
+    assert paw.canvas.moved == []
+
+
+def test_configure_with_new_size_moves_existing_ovals(paw):
+    # Arrange
+    paw.canvas.width = 60
+    paw.canvas.height = 60
+    # Act
+    paw._on_configure(None)
+    # Assert
+    assert len(paw.canvas.created) == 7
+    assert [item for item, _ in paw.canvas.moved] == list(range(1, 8))
+    assert paw.canvas.moved[0][1] == (20.0, 20.0, 40.0, 40.0)
@@ -12,6 +12,8 @@ class _FakeFrame:
     def place(self, **kwargs):
         # Will be monkeypatched in tests
         pass
+    def after_idle(self, func):
+        self.__dict__.setdefault("idle_calls", []).append(func)
 
 
 class _FakeButton(_FakeFrame):
@@ -34,6 +36,10 @@ class _FakeCanvas(_FakeFrame):
         return 100
     def create_oval(self, *args, **kwargs):
         pass
+    def itemconfigure(self, *args, **kwargs):
+        pass
+    def coords(self, *args):
+        pass
 
 
 fake_tkinter = types.SimpleNamespace(
@@ -48,6 +54,7 @@ sys.modules.setdefault("tkinter", fake_tkinter)
 
 from src.config.Setting import Setting
 from src.gui.piano.KeyBoard import KeyBoard
+from src.midi.NoteTable import PIANO_LOWEST_NOTE, PIANO_HIGHEST_NOTE, note_name
 
 
 @pytest.fixture
@@ -77,19 +84,29 @@ def test__get_white_key_num_counts_all_white_keys(keyboard):
 
 def test__find_key_returns_key_when_exists(keyboard):
     # Arrange
-    name = keyboard.white_keys[0].name
+    note = keyboard.white_keys[0].note
     # Act
-    key = keyboard._find_key(name)
+    key = keyboard._find_key(note)
     # Assert
     assert key is keyboard.white_keys[0]
 
 
+def test__find_key_maps_every_piano_note(keyboard):
+    # Arrange
+    notes = range(PIANO_LOWEST_NOTE, PIANO_HIGHEST_NOTE + 1)
+    # Act
+    keys = [keyboard._find_key(note) for note in notes]
+    # Assert
+    assert [key.name for key in keys] == [note_name(note) for note in notes]
+
+
 def test__find_key_returns_none_for_empty_or_unknown(keyboard):
     # Arrange
-    # Act & Assert: empty string -> None
-    assert keyboard._find_key("") is None
-    # Act & Assert: unknown -> None
-    assert keyboard._find_key("NoSuchKey") is None
+    # Act & Assert: empty slot (-1) -> None
+    assert keyboard._find_key(-1) is None
+    # Act & Assert: outside the piano range -> None
+    assert keyboard._find_key(0) is None
+    assert keyboard._find_key(128) is None
 
 
 def test_set_key_state_calls_config_on_found_key(keyboard, monkeypatch):
@@ -100,15 +117,27 @@ def test_set_key_state_calls_config_on_found_key(keyboard, monkeypatch):
         called.update(kwargs)
     monkeypatch.setattr(target, "config", fake_config)
     # Act
-    keyboard.set_key_state(target.name, "disabled")
+    keyboard.set_key_state(target.note, "disabled")
     # Assert
     assert called.get("state") == "disabled"
 
 
+def test_set_key_states_applies_every_entry(keyboard, monkeypatch):
+    # Arrange
+    first, second = keyboard.white_keys[0], keyboard.white_keys[1]
+    called = {}
+    monkeypatch.setattr(first, "config", lambda **kwargs: called.setdefault(first.name, kwargs["state"]))
+    monkeypatch.setattr(second, "config", lambda **kwargs: called.setdefault(second.name, kwargs["state"]))
+    # Act
+    keyboard.set_key_states({first.note: "active", second.note: "normal"})
+    # Assert
+    assert called == {first.name: "active", second.name: "normal"}
+
+
 def test_set_key_state_ignores_empty_name(keyboard, capsys):
     # Arrange
     # Act
-    keyboard.set_key_state("", "disabled")
+    keyboard.set_key_state(-1, "disabled")
     # Assert
     # No exception and no output indicating config call
     captured = capsys.readouterr()
@@ -203,3 +232,59 @@ def test_place_keyboard_places_sustain_centered_below_keys(keyboard, monkeypatch
     assert placed["y"] == keyboard.KEY_HEIGHT
     assert placed["width"] == keyboard.PEDAL_WIDTH
     assert placed["height"] == keyboard.PEDAL_HEIGHT
+
+
+def run_idle(widget):
+    calls = widget.__dict__.pop("idle_calls", [])
+    for func in calls:
+        func()
+    return len(calls)
+
+
+def test_resize_keyboard_is_deferred_to_idle(keyboard, monkeypatch):
+    # Arrange
+    placed = []
+    monkeypatch.setattr(keyboard.sustain, "place", lambda **kwargs: placed.append(kwargs))
+    # Act
+    keyboard.resize_keyboard(2000, 600)
+    # Assert
+    assert placed == []
+    assert run_idle(keyboard) == 1
+    assert placed[0]["x"] == 1000
+
+
+def test_resize_keyboard_collapses_repeated_requests(keyboard, monkeypatch):
+    # Arrange
+    widths = []
+    monkeypatch.setattr(keyboard, "_calculate_dimensions", lambda width: widths.append(width))
+    monkeypatch.setattr(keyboard, "_place_keyboard", lambda changed_only=False: None)
+    # Act
+    for width in (1100, 1200, 1300):
+        keyboard.resize_keyboard(width, 600)
+    # Assert: one idle callback applies the last size
+    assert run_idle(keyboard) == 1
+    assert widths == [1300]
+
+
+def test_resize_only_replaces_widgets_that_moved(keyboard, monkeypatch):
+    # Arrange: same key width (1000 // 52 == 1010 // 52), only the pedal moves
+    calls = []
+    for widget in keyboard.keys + [keyboard.sustain]:
+        monkeypatch.setattr(widget, "place", lambda widget=widget, **kwargs: calls.append(widget))
+    # Act
+    keyboard.resize_keyboard(1010, 600)
+    run_idle(keyboard)
+    # Assert
+    assert calls == [keyboard.sustain]
+
+
+def test_resize_with_new_key_width_replaces_every_key(keyboard, monkeypatch):
+    # Arrange
+    calls = []
+    for widget in keyboard.keys + [keyboard.sustain]:
+        monkeypatch.setattr(widget, "place", lambda widget=widget, **kwargs: calls.append(widget))
+    # Act
+    keyboard.resize_keyboard(2000, 600)
+    run_idle(keyboard)
+    # Assert: every real key plus the pedal
+    assert len(calls) == 88 + 1
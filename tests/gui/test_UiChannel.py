@@ -0,0 +1,122 @@
+import gc
+
+from src.gui.UiDispatcher import UiDispatcher
+
+
+class FakeRoot:
+    def after(self, ms, func):
+        return 1
+    def after_cancel(self, after_id):
+        pass
+
+
+class FakeKeyboard:
+    def __init__(self):
+        self.calls = []
+    def set_key_state(self, note, state):
+        self.calls.append((note, state))
+
+
+def make_dispatcher(keyboard):
+    dispatcher = UiDispatcher(FakeRoot())
+    dispatcher.register('keyboard', keyboard)
+    return dispatcher
+
+
+def test_channel_posts_call_to_widget():
+    # Arrange
+    keyboard = FakeKeyboard()
+    dispatcher = make_dispatcher(keyboard)
+    channel = dispatcher.channel('keyboard', 'set_key_state')
+    # Act
+    assert channel.post(60, "active") is True
+    dispatcher._poll()
+    # Assert
+    assert keyboard.calls == [(60, "active")]
+
+
+def test_channel_is_cached_per_method():
+    # Arrange
+    dispatcher = make_dispatcher(FakeKeyboard())
+    # Act
+    first = dispatcher.channel('keyboard', 'set_key_state')
+    second = dispatcher.channel('keyboard', 'set_key_state')
+    # Assert
+    assert first is second
+
+
+def test_channel_returns_none_for_unknown_widget_or_method():
+    # Arrange
+    dispatcher = make_dispatcher(FakeKeyboard())
+    # Act & Assert
+    assert dispatcher.channel('missing', 'set_key_state') is None
+    assert dispatcher.channel('keyboard', 'no_such_method') is None
+
+
+def test_unregister_invalidates_channel():
+    # Arrange
+    keyboard = FakeKeyboard()
+    dispatcher = make_dispatcher(keyboard)
+    channel = dispatcher.channel('keyboard', 'set_key_state')
+    # Act
+    dispatcher.unregister('keyboard')
+    # Assert
+    assert channel.is_valid is False
+    assert channel.post(60, "active") is False
+    dispatcher._poll()
+    assert keyboard.calls == []
+
+
+def test_unregister_drops_calls_already_queued():
+    # Arrange
+    keyboard = FakeKeyboard()
+    dispatcher = make_dispatcher(keyboard)
+    channel = dispatcher.channel('keyboard', 'set_key_state')
+    channel.post(60, "active")
+    # Act
+    dispatcher.unregister('keyboard')
+    dispatcher._poll()
+    # Assert
+    assert keyboard.calls == []
+
+
+def test_register_replacement_widget_gets_new_channel():
+    # Arrange
+    old_keyboard = FakeKeyboard()
+    new_keyboard = FakeKeyboard()
+    dispatcher = make_dispatcher(old_keyboard)
+    old_channel = dispatcher.channel('keyboard', 'set_key_state')
+    # Act
+    dispatcher.register('keyboard', new_keyboard)
+    new_channel = dispatcher.channel('keyboard', 'set_key_state')
+    new_channel.post(62, "normal")
+    dispatcher._poll()
+    # Assert
+    assert old_channel.is_valid is False
+    assert new_keyboard.calls == [(62, "normal")]
+    assert old_keyboard.calls == []
+
+
+def test_collected_widget_invalidates_channel():
+    # Arrange
+    keyboard = FakeKeyboard()
+    dispatcher = make_dispatcher(keyboard)
+    channel = dispatcher.channel('keyboard', 'set_key_state')
+    # Act
+    del keyboard
+    gc.collect()
+    # Assert
+    assert channel.is_valid is False
+    assert dispatcher.channel('keyboard', 'set_key_state') is None
+
+
+def test_channel_does_not_keep_widget_alive():
+    # Arrange
+    keyboard = FakeKeyboard()
+    dispatcher = make_dispatcher(keyboard)
+    dispatcher.channel('keyboard', 'set_key_state')
+    # Act
+    del keyboard
+    gc.collect()
+    # Assert
+    assert dispatcher._channels.get('keyboard', {}) == {}
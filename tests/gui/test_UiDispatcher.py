@@ -0,0 +1,385 @@
+import time
+from threading import Event
+
+import pytest
+
+from src.gui.UiDispatcher import UiDispatcher
+
+
+class FakeRoot:
+    def __init__(self):
+        self.scheduled = []
+        self.cancelled = []
+    def after(self, ms, func):
+        self.scheduled.append((ms, func))
+        return len(self.scheduled)
+    def after_cancel(self, after_id):
+        self.cancelled.append(after_id)
+
+
+class FakeKeyboard:
+    def __init__(self):
+        self.key_state_calls = []
+        self.sustain_calls = []
+    def set_key_states(self, states):
+        self.key_state_calls.append(states)
+    def set_sustain(self, pressed):
+        self.sustain_calls.append(pressed)
+
+
+@pytest.fixture
+def keyboard():
+    return FakeKeyboard()
+
+
+@pytest.fixture
+def dispatcher(keyboard):
+    d = UiDispatcher(FakeRoot())
+    d.register('keyboard', keyboard)
+    return d
+
+
+def test_post_to_runs_callback_on_poll(dispatcher, keyboard):
+    # Arrange
+    dispatcher.post_to('keyboard', 'set_sustain', True)
+    # Act
+    dispatcher._poll()
+    # Assert
+    assert keyboard.sustain_calls == [True]
+
+
+def test_post_to_ignores_unknown_widget(dispatcher, keyboard):
+    # Arrange
+    dispatcher.post_to('missing', 'set_sustain', True)
+    # Act
+    dispatcher._poll()
+    # Assert
+    assert keyboard.sustain_calls == []
+
+
+def test_post_merged_keeps_last_state_per_key(dispatcher, keyboard):
+    # Arrange
+    dispatcher.post_merged('keyboard', 'set_key_states', {60: "active", 62: "active"})
+    dispatcher.post_merged('keyboard', 'set_key_states', {60: "normal"})
+    dispatcher.post_merged('keyboard', 'set_key_states', {60: "active", 64: "normal"})
+    # Act
+    dispatcher._poll()
+    # Assert
+    assert keyboard.key_state_calls == [{60: "active", 62: "active", 64: "normal"}]
+    assert dispatcher.elided_count == 2
+
+
+def test_post_merged_starts_a_new_frame_after_poll(dispatcher, keyboard):
+    # Arrange
+    dispatcher.post_merged('keyboard', 'set_key_states', {60: "active"})
+    dispatcher._poll()
+    # Act
+    dispatcher.post_merged('keyboard', 'set_key_states', {60: "normal"})
+    dispatcher._poll()
+    # Assert
+    assert keyboard.key_state_calls == [{60: "active"}, {60: "normal"}]
+    assert dispatcher.elided_count == 0
+
+
+def test_post_merged_does_not_alias_caller_dict(dispatcher, keyboard):
+    # Arrange
+    updates = {60: "active"}
+    dispatcher.post_merged('keyboard', 'set_key_states', updates)
+    # Act
+    dispatcher.post_merged('keyboard', 'set_key_states', {62: "active"})
+    # Assert
+    assert updates == {60: "active"}
+
+
+def test_post_latest_applies_only_last_call(dispatcher, keyboard):
+    # Arrange
+    dispatcher.post_latest('keyboard', 'set_sustain', True)
+    dispatcher.post_latest('keyboard', 'set_sustain', False)
+    dispatcher.post_latest('keyboard', 'set_sustain', True)
+    # Act
+    dispatcher._poll()
+    # Assert
+    assert keyboard.sustain_calls == [True]
+    assert dispatcher.elided_count == 2
+
+
+def test_coalesce_disabled_runs_every_update(keyboard):
+    # Arrange
+    dispatcher = UiDispatcher(FakeRoot(), coalesce=False)
+    dispatcher.register('keyboard', keyboard)
+    dispatcher.post_merged('keyboard', 'set_key_states', {60: "active"})
+    dispatcher.post_merged('keyboard', 'set_key_states', {60: "normal"})
+    dispatcher.post_latest('keyboard', 'set_sustain', True)
+    dispatcher.post_latest('keyboard', 'set_sustain', False)
+    # Act
+    dispatcher._poll()
+    # Assert
+    assert keyboard.key_state_calls == [{60: "active"}, {60: "normal"}]
+    assert keyboard.sustain_calls == [True, False]
+    assert dispatcher.elided_count == 0
+
+
+def test_coalesced_updates_skip_unregistered_widget(dispatcher, keyboard):
+    # Arrange
+    dispatcher.post_merged('keyboard', 'set_key_states', {60: "active"})
+    dispatcher.unregister('keyboard')
+    # Act
+    dispatcher._poll()
+    # Assert
+    assert keyboard.key_state_calls == []
+
+
+def test_callback_error_does_not_stop_poll(dispatcher, keyboard, capsys):
+    # Arrange
+    def broken(states):
+        raise RuntimeError("boom")
+    keyboard.set_key_states = broken
+    dispatcher.post_merged('keyboard', 'set_key_states', {60: "active"})
+    dispatcher.post_to('keyboard', 'set_sustain', True)
+    # Act
+    dispatcher._poll()
+    # Assert
+    assert keyboard.sustain_calls == [True]
+    assert "UiDispatcher callback error" in capsys.readouterr().out
+
+
+def test_max_callbacks_carries_leftover_to_next_frame(keyboard):
+    # Arrange
+    root = FakeRoot()
+    dispatcher = UiDispatcher(root, max_callbacks=3)
+    dispatcher.register('keyboard', keyboard)
+    dispatcher.start()
+    for i in range(5):
+        dispatcher.post_to('keyboard', 'set_sustain', i)
+    # Act
+    dispatcher._poll()
+    # Assert: first frame limited, next frame scheduled right away
+    assert keyboard.sustain_calls == [0, 1, 2]
+    assert root.scheduled[-1][0] == UiDispatcher.CARRY_OVER_MS
+    # Act: next frame finishes the work and returns to the idle interval
+    dispatcher._poll()
+    # Assert
+    assert keyboard.sustain_calls == [0, 1, 2, 3, 4]
+    assert root.scheduled[-1][0] == 10
+
+
+def test_frame_budget_stops_queue_when_exhausted(keyboard):
+    # Arrange
+    dispatcher = UiDispatcher(FakeRoot(), frame_budget_ms=0)
+    dispatcher.register('keyboard', keyboard)
+    for i in range(3):
+        dispatcher.post_to('keyboard', 'set_sustain', i)
+    # Act
+    dispatcher._poll()
+    # Assert: at least one callback runs so the queue always makes progress
+    assert keyboard.sustain_calls == [0]
+    assert dispatcher.has_pending()
+
+
+def test_priority_lane_runs_even_when_budget_is_exhausted(keyboard):
+    # Arrange
+    dispatcher = UiDispatcher(FakeRoot(), frame_budget_ms=0)
+    dispatcher.register('keyboard', keyboard)
+    dispatcher.post_to('keyboard', 'set_sustain', True)
+    dispatcher.post_to('keyboard', 'set_sustain', False)
+    dispatcher.post_merged('keyboard', 'set_key_states', {60: "active"})
+    # Act
+    dispatcher._poll()
+    # Assert
+    assert keyboard.key_state_calls == [{60: "active"}]
+
+
+def test_low_priority_runs_after_other_lanes(keyboard):
+    # Arrange
+    order = []
+    keyboard.refresh = lambda: order.append("low")
+    keyboard.set_sustain = lambda pressed: order.append("normal")
+    keyboard.set_key_states = lambda states: order.append("priority")
+    dispatcher = UiDispatcher(FakeRoot())
+    dispatcher.register('keyboard', keyboard)
+    dispatcher.post_low('keyboard', 'refresh')
+    dispatcher.post_to('keyboard', 'set_sustain', True)
+    dispatcher.post_merged('keyboard', 'set_key_states', {60: "active"})
+    # Act
+    dispatcher._poll()
+    # Assert
+    assert order == ["priority", "normal", "low"]
+
+
+def test_low_priority_is_deferred_while_frame_is_full(keyboard):
+    # Arrange
+    calls = []
+    keyboard.refresh = lambda: calls.append("refresh")
+    dispatcher = UiDispatcher(FakeRoot(), max_callbacks=1)
+    dispatcher.register('keyboard', keyboard)
+    dispatcher.post_to('keyboard', 'set_sustain', True)
+    dispatcher.post_low('keyboard', 'refresh')
+    dispatcher.post_low('keyboard', 'refresh')
+    # Act
+    dispatcher._poll()
+    # Assert: deferred and collapsed into one pending call
+    assert calls == []
+    assert dispatcher.elided_count == 1
+    # Act
+    dispatcher._poll()
+    # Assert
+    assert calls == ["refresh"]
+    assert not dispatcher.has_pending()
+
+
+def _wait_for(predicate, timeout=1.0):
+    """Wait for the waker thread to act."""
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return predicate()
+
+
+def _wakes(root):
+    return [func for ms, func in root.scheduled if ms == 0]
+
+
+def test_wake_on_post_schedules_one_drain_per_burst(keyboard):
+    # Arrange
+    root = FakeRoot()
+    dispatcher = UiDispatcher(root, wake_on_post=True)
+    dispatcher.register('keyboard', keyboard)
+    dispatcher.start()
+    # Act
+    dispatcher.post_merged('keyboard', 'set_key_states', {60: "active"})
+    dispatcher.post_merged('keyboard', 'set_key_states', {62: "active"})
+    dispatcher.post_latest('keyboard', 'set_sustain', True)
+    # Assert
+    assert _wait_for(lambda: _wakes(root))
+    time.sleep(0.02)
+    assert len(_wakes(root)) == 1
+    # Act: the Tk thread runs the wake
+    _wakes(root)[0]()
+    # Assert
+    assert keyboard.key_state_calls == [{60: "active", 62: "active"}]
+    assert keyboard.sustain_calls == [True]
+    dispatcher.stop()
+
+
+def test_wake_on_post_sleeps_when_idle(keyboard):
+    # Arrange
+    root = FakeRoot()
+    dispatcher = UiDispatcher(root, wake_on_post=True)
+    dispatcher.register('keyboard', keyboard)
+    dispatcher.start()
+    # Act
+    dispatcher._poll()
+    # Assert: only the slow safety poll is scheduled
+    assert root.scheduled[-1][0] == UiDispatcher.IDLE_POLL_MS
+    dispatcher.stop()
+
+
+def test_wake_replaces_pending_timer(keyboard):
+    # Arrange
+    root = FakeRoot()
+    dispatcher = UiDispatcher(root, wake_on_post=True)
+    dispatcher.register('keyboard', keyboard)
+    dispatcher.start()
+    idle_timer = len(root.scheduled)
+    dispatcher.post_to('keyboard', 'set_sustain', True)
+    assert _wait_for(lambda: _wakes(root))
+    # Act
+    _wakes(root)[0]()
+    # Assert: the drain reschedules the single timer instead of adding one
+    assert keyboard.sustain_calls == [True]
+    assert root.cancelled == [idle_timer]
+    dispatcher.stop()
+
+
+def test_post_after_wake_schedules_again(keyboard):
+    # Arrange
+    root = FakeRoot()
+    dispatcher = UiDispatcher(root, wake_on_post=True)
+    dispatcher.register('keyboard', keyboard)
+    dispatcher.start()
+    dispatcher.post_to('keyboard', 'set_sustain', True)
+    assert _wait_for(lambda: _wakes(root))
+    _wakes(root)[0]()
+    # Act
+    dispatcher.post_to('keyboard', 'set_sustain', False)
+    # Assert
+    assert _wait_for(lambda: len(_wakes(root)) == 2)
+    dispatcher.stop()
+
+
+def test_post_does_not_wait_for_the_tk_thread(keyboard):
+    # Arrange: after() blocks like a cross-thread call while Tk is busy
+    root = FakeRoot()
+    release = Event()
+    entered = Event()
+    def busy_after(ms, func):
+        if ms == 0:
+            entered.set()
+            release.wait(2.0)
+        return FakeRoot.after(root, ms, func)
+    root.after = busy_after
+    dispatcher = UiDispatcher(root, wake_on_post=True)
+    dispatcher.register('keyboard', keyboard)
+    dispatcher.start()
+    dispatcher.post_to('keyboard', 'set_sustain', True)
+    assert entered.wait(1.0)
+    # Act
+    started = time.perf_counter()
+    dispatcher.post_merged('keyboard', 'set_key_states', {60: "active"})
+    dispatcher.post_to('keyboard', 'set_sustain', False)
+    elapsed = time.perf_counter() - started
+    release.set()
+    # Assert
+    assert elapsed < 0.05
+    dispatcher.stop()
+
+
+def test_wake_failure_polls_and_retries_on_next_post(keyboard, capsys):
+    # Arrange
+    root = FakeRoot()
+    dispatcher = UiDispatcher(root, wake_on_post=True)
+    dispatcher.register('keyboard', keyboard)
+    dispatcher.start()
+    original_after = root.after
+    def broken_after(ms, func):
+        if ms == 0:
+            raise RuntimeError("main thread is not in main loop")
+        return original_after(ms, func)
+    root.after = broken_after
+    # Act
+    dispatcher.post_to('keyboard', 'set_sustain', True)
+    assert _wait_for(lambda: dispatcher._wake_failed)
+    dispatcher._poll()
+    # Assert: polls every poll_ms meanwhile
+    assert root.scheduled[-1][0] == 10
+    assert "wake failed" in capsys.readouterr().out
+    # Act: Tk takes calls now
+    root.after = original_after
+    dispatcher.post_to('keyboard', 'set_sustain', False)
+    # Assert
+    assert _wait_for(lambda: _wakes(root))
+    assert _wait_for(lambda: not dispatcher._wake_failed)
+    dispatcher.stop()
+
+
+def test_stop_ends_waker_thread(keyboard):
+    # Arrange
+    dispatcher = UiDispatcher(FakeRoot(), wake_on_post=True)
+    dispatcher.start()
+    waker = dispatcher._waker
+    # Act
+    dispatcher.stop()
+    # Assert
+    waker.join(1.0)
+    assert not waker.is_alive()
+
+
+def test_wake_is_ignored_until_started(keyboard):
+    # Arrange
+    root = FakeRoot()
+    dispatcher = UiDispatcher(root, wake_on_post=True)
+    dispatcher.register('keyboard', keyboard)
+    # Act
+    dispatcher.post_to('keyboard', 'set_sustain', True)
+    # Assert
+    assert root.scheduled == []
@@ -4,6 +4,7 @@ Shared fixtures and test doubles for MIDI tests.
 import sys
 import os
 import types
+import threading
 import pytest
 
 from src.midi.MidiBackend import MidiBackend
@@ -43,6 +44,10 @@ class FakeTkCanvas:
         pass
     def create_oval(self, *args, **kwargs):
         pass
+    def itemconfigure(self, *args, **kwargs):
+        pass
+    def coords(self, *args):
+        pass
     def winfo_width(self):
         return 100
     def winfo_height(self):
@@ -81,6 +86,7 @@ class FakeMidiInput:
         self.device_id = device_id
         self.closed = False
         self._events = []
+        self._data_ready = threading.Event()
 
     def poll(self) -> bool:
         return len(self._events) > 0
@@ -88,6 +94,8 @@ class FakeMidiInput:
     def read(self, num_events: int) -> list:
         events = self._events[:num_events]
         self._events = self._events[num_events:]
+        if not self._events:
+            self._data_ready.clear()
         return events
 
     def close(self):
@@ -96,6 +104,11 @@ class FakeMidiInput:
     def add_test_event(self, event):
         """Helper method to inject test events."""
         self._events.append(event)
+        self._data_ready.set()
+
+    def wait(self, timeout: float) -> bool:
+        """Block until events are available or timeout elapses."""
+        return self._data_ready.wait(timeout)
 
 
 class FakeMidiOutput:
@@ -116,6 +129,16 @@ class FakeMidiOutput:
     def write_short(self, status: int, data1: int, data2: int):
         self.control_changes.append((status, data1, data2))
 
+    def write(self, data: list):
+        """Record [[status, data1, data2], timestamp] events like pygame.midi.Output.write."""
+        for (status, data1, data2), _ in data:
+            if (status & 0xF0) == 0x90:
+                self.notes_on.append((data1, data2, status & 0x0F))
+            elif (status & 0xF0) == 0x80:
+                self.notes_off.append((data1, data2, status & 0x0F))
+            else:
+                self.control_changes.append((status, data1, data2))
+
     def close(self):
         self.closed = True
 
@@ -132,6 +155,9 @@ class FakeMidiBackend(MidiBackend):
         self._default_output_id = -1
         self._created_inputs = []
         self._created_outputs = []
+        self._blocking_input = False
+        self._timestamps = False
+        self.time_ms = 0
 
     def init(self) -> None:
         self._initialized = True
@@ -158,11 +184,26 @@ class FakeMidiBackend(MidiBackend):
         self._created_inputs.append(inp)
         return inp
 
-    def create_output(self, device_id: int):
+    def create_output(self, device_id: int, latency: int = 0):
         out = FakeMidiOutput(device_id)
+        out.latency = latency
         self._created_outputs.append(out)
         return out
 
+    def supports_blocking_input(self) -> bool:
+        return self._blocking_input
+
+    def supports_timestamps(self) -> bool:
+        return self._timestamps
+
+    def get_time_ms(self) -> int:
+        return self.time_ms
+
+    def wait_for_input(self, midiin, timeout: float) -> bool:
+        if not self._blocking_input:
+            return super().wait_for_input(midiin, timeout)
+        return midiin.wait(timeout)
+
     # Test helper methods
     def add_device(self, interface: bytes, name: bytes, is_input: int, is_output: int, opened: int = 0):
         """Add a fake MIDI device for testing."""
@@ -174,6 +215,14 @@ class FakeMidiBackend(MidiBackend):
     def set_default_output(self, device_id: int):
         self._default_output_id = device_id
 
+    def set_blocking_input(self, blocking: bool):
+        """Enable or disable blocking input support."""
+        self._blocking_input = blocking
+
+    def set_timestamps(self, supported: bool):
+        """Enable or disable timestamped output support."""
+        self._timestamps = supported
+
 
 class FakeUiDispatcher:
     """Fake UiDispatcher for testing."""
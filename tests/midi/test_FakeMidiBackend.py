@@ -1,6 +1,5 @@
 import sys
 import os
-import pytest
 
 # Import test doubles directly from conftest definitions
 sys.path.insert(0, os.path.dirname(__file__))
@@ -51,6 +50,14 @@ class TestFakeMidiBackend:
         assert out.notes_off == [(60, 0, 0)]
         assert out.control_changes == [(0xB0, 0x40, 127)]
 
+    def test_fake_output_device_write(self):
+        out = FakeMidiOutput(0)
+        out.write([[[0x91, 60, 100], 0], [[0x80, 60, 0], 0], [[0xB0, 0x40, 127], 0]])
+
+        assert out.notes_on == [(60, 100, 1)]
+        assert out.notes_off == [(60, 0, 0)]
+        assert out.control_changes == [(0xB0, 0x40, 127)]
+
     def test_fake_backend_input_creation(self):
         """Backend should create FakeMidiInput instances."""
         backend = FakeMidiBackend()
@@ -86,3 +93,19 @@ class TestFakeMidiBackend:
 
         assert backend.get_default_input_id() == 0
         assert backend.get_default_output_id() == 1
+
+    def test_fake_backend_blocking_input(self):
+        """Blocking mode should wait on the input device until data arrives."""
+        backend = FakeMidiBackend()
+        inp = backend.create_input(0)
+        assert backend.supports_blocking_input() is False
+
+        backend.set_blocking_input(True)
+        assert backend.supports_blocking_input() is True
+        assert backend.wait_for_input(inp, 0.01) is False
+
+        inp.add_test_event(([0x90, 60, 100, 0], 0))
+        assert backend.wait_for_input(inp, 0.01) is True
+
+        inp.read(10)
+        assert backend.wait_for_input(inp, 0.01) is False
@@ -1,6 +1,7 @@
 import pytest
-from queue import Empty
 from src.midi.MidiController import MidiController
+from src.midi.MidiEvent import MidiEventBatch
+from src.midi.NoteTable import NOTE_COUNT, note_number
 
 
 class TestMidiControllerInitialization:
@@ -30,6 +31,21 @@ class TestMidiControllerInitialization:
         assert controller.midi_out_id == -1
         assert controller.midiin is None
         assert controller.midiout is None
+        assert controller.handler.midi_backend is fake_backend
+
+    def test_shutdown_sets_end_flag_on_shared_lifecycle(self, fake_backend, fake_dispatcher):
+        """shutdown() should signal the lifecycle shared with the workers."""
+        # Arrange
+        controller = MidiController(dispatcher=fake_dispatcher, midi_backend=fake_backend)
+
+        # Act
+        controller.shutdown()
+
+        # Assert
+        assert controller.end is True
+        assert controller.receiver.lifecycle is controller.lifecycle
+        assert controller.handler.lifecycle is controller.lifecycle
+        assert controller.lifecycle.is_ended() is True
 
 
 class TestMidiControllerDeviceDiscovery:
@@ -72,6 +88,30 @@ class TestMidiControllerDeviceDiscovery:
         assert len(fake_backend_with_devices._created_outputs) == 1
         assert fake_backend_with_devices._created_outputs[0].device_id == 1
 
+    def test_connect_opens_output_with_latency_when_timestamps_are_supported(self, fake_backend_with_devices, fake_dispatcher):
+        """Outputs get a latency only on backends with timestamp support, so timestamps are honoured."""
+        # Arrange
+        fake_backend_with_devices.set_timestamps(True)
+
+        # Act
+        MidiController(
+            dispatcher=fake_dispatcher,
+            midi_backend=fake_backend_with_devices
+        )
+
+        # Assert
+        assert fake_backend_with_devices._created_outputs[0].latency == MidiController.OUTPUT_LATENCY_MS
+
+    def test_connect_opens_output_without_latency_by_default(self, fake_backend_with_devices, fake_dispatcher):
+        # Act
+        MidiController(
+            dispatcher=fake_dispatcher,
+            midi_backend=fake_backend_with_devices
+        )
+
+        # Assert
+        assert fake_backend_with_devices._created_outputs[0].latency == 0
+
     def test_reconnect_reinitializes_backend(self, fake_backend_with_devices, fake_dispatcher):
         """Reconnecting should quit and reinit the backend."""
         # Arrange
@@ -101,8 +141,8 @@ class TestMidiControllerEventQueue:
 
         # Assert
         assert controller.event_queue is not None
-        assert hasattr(controller.event_queue, 'get')
-        assert hasattr(controller.event_queue, 'put')
+        assert hasattr(controller.event_queue, 'drain')
+        assert hasattr(controller.event_queue, 'create_producer')
 
     def test_event_queue_starts_empty(self, fake_dispatcher, fake_backend):
         """Event queue should be empty on initialization."""
@@ -113,8 +153,26 @@ class TestMidiControllerEventQueue:
         )
 
         # Assert
-        with pytest.raises(Empty):
-            controller.event_queue.get_nowait()
+        assert controller.event_queue.empty() is True
+        assert controller.event_queue.drain(MidiEventBatch()) == 0
+
+    def test_shutdown_wakes_waiting_consumer(self, fake_dispatcher, fake_backend):
+        """shutdown() should wake a handler blocked on the event queue."""
+        # Arrange
+        controller = MidiController(dispatcher=fake_dispatcher, midi_backend=fake_backend)
+
+        # Act
+        controller.shutdown()
+
+        # Assert
+        assert controller.event_queue.wait(0) is True
+
+
+def drain_events(controller) -> list:
+    """Drain all queued events as (status, data1, data2, timestamp) tuples."""
+    batch = MidiEventBatch()
+    controller.event_queue.drain(batch)
+    return list(batch)
 
 
 class TestMidiControllerKeyEvents:
@@ -127,36 +185,30 @@ class TestMidiControllerKeyEvents:
     def test_add_key_event_enqueues_note_on(self, controller):
         """add_key_event with pressed=True should enqueue a Note On message."""
         # Arrange
-        note_name = "C4"
-        note_num = controller.handler.NOTE_NAME.index(note_name)
+        note_num = note_number("C4")
         velocity = 64
 
         # Act
-        controller.add_key_event(note_name, True, velocity)
+        controller.add_key_event(note_num, True, velocity)
 
         # Assert
-        event = controller.event_queue.get(timeout=1.0)
-        expected = ([0x90, note_num, velocity, 0], 0)
-        assert event == expected
+        assert drain_events(controller) == [(0x90, note_num, velocity, 0.0)]
 
     def test_add_key_event_enqueues_note_off(self, controller):
         """add_key_event with pressed=False should enqueue a Note Off message."""
         # Arrange
-        note_name = "C4"
-        note_num = controller.handler.NOTE_NAME.index(note_name)
+        note_num = note_number("C4")
 
         # Act
-        controller.add_key_event(note_name, False, 0)
+        controller.add_key_event(note_num, False, 0)
 
         # Assert
-        event_off = controller.event_queue.get(timeout=1.0)
-        expected_off = ([0x80, note_num, 0, 0], 0)
-        assert event_off == expected_off
+        assert drain_events(controller) == [(0x80, note_num, 0, 0.0)]
 
     def test_add_key_event_multiple_notes(self, controller):
         """Multiple key events should all be queued."""
         # Arrange
-        notes = ["C4", "D4", "E4"]
+        notes = [note_number(name) for name in ("C4", "D4", "E4")]
         velocities = [64, 80, 100]
 
         # Act
@@ -164,49 +216,52 @@ class TestMidiControllerKeyEvents:
             controller.add_key_event(note, True, velocity)
 
         # Assert
-        for note, velocity in zip(notes, velocities):
-            event = controller.event_queue.get(timeout=1.0)
-            note_num = controller.handler.NOTE_NAME.index(note)
-            expected = ([0x90, note_num, velocity, 0], 0)
-            assert event == expected
+        expected = [
+            (0x90, note, velocity, 0.0)
+            for note, velocity in zip(notes, velocities)
+        ]
+        assert drain_events(controller) == expected
 
     def test_add_key_event_enqueues_on_then_off(self, controller):
         """Key press followed by release should produce both messages."""
         # Arrange
-        note_name = "G4"
-        note_num = controller.handler.NOTE_NAME.index(note_name)
+        note_num = note_number("G4")
         velocity = 80
 
         # Act
-        controller.add_key_event(note_name, True, velocity)
-        controller.add_key_event(note_name, False, 0)
-
-        # Assert - Note On
-        event_on = controller.event_queue.get(timeout=1.0)
-        expected_on = ([0x90, note_num, velocity, 0], 0)
-        assert event_on == expected_on
+        controller.add_key_event(note_num, True, velocity)
+        controller.add_key_event(note_num, False, 0)
 
-        # Assert - Note Off
-        event_off = controller.event_queue.get(timeout=1.0)
-        expected_off = ([0x80, note_num, 0, 0], 0)
-        assert event_off == expected_off
+        # Assert
+        assert drain_events(controller) == [
+            (0x90, note_num, velocity, 0.0),
+            (0x80, note_num, 0, 0.0),
+        ]
 
     def test_add_key_event_with_edge_case_notes(self, controller):
         """Key events for first and last notes should work correctly."""
         # Arrange
-        first_note = controller.handler.NOTE_NAME[0]
-        last_note = controller.handler.NOTE_NAME[-1]
+        first_note = 0
+        last_note = NOTE_COUNT - 1
 
         # Act
         controller.add_key_event(first_note, True, 100)
         controller.add_key_event(last_note, True, 100)
 
         # Assert
-        event1 = controller.event_queue.get(timeout=1.0)
-        event2 = controller.event_queue.get(timeout=1.0)
+        event1, event2 = drain_events(controller)
+
+        assert event1[1] == 0  # First note = index 0
+        assert event2[1] == NOTE_COUNT - 1  # Last note
 
-        assert event1[0][1] == 0  # First note = index 0
-        assert event2[0][1] == len(controller.handler.NOTE_NAME) - 1  # Last note
+    def test_add_key_event_ignores_out_of_range_notes(self, controller):
+        """Notes outside 0-127 should not be queued."""
+        # Act
+        controller.add_key_event(-1, True, 100)
+        controller.add_key_event(NOTE_COUNT, True, 100)
+
+        # Assert
+        assert drain_events(controller) == []
 
 
 class TestMidiControllerDependencyInjection:
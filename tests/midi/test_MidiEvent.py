@@ -0,0 +1,53 @@
+from src.midi.MidiEvent import MidiEventBatch, pack_event, unpack_event
+
+
+def test_pack_event_uses_portmidi_byte_order():
+    # Arrange / Act
+    word = pack_event(0x90, 60, 100)
+    # Assert
+    assert word == 0x90 | (60 << 8) | (100 << 16)
+
+
+def test_unpack_event_round_trips():
+    # Arrange
+    word = pack_event(0xB3, 0x40, 127)
+    # Act / Assert
+    assert unpack_event(word) == (0xB3, 0x40, 127)
+
+
+def test_pack_event_masks_out_of_range_bytes():
+    # Arrange / Act
+    word = pack_event(0x190, 0x13C, 0x100)
+    # Assert
+    assert unpack_event(word) == (0x90, 0x3C, 0x00)
+
+
+def test_batch_append_holds_event():
+    # Arrange
+    batch = MidiEventBatch()
+    # Act
+    batch.append(pack_event(0x80, 61, 0), 1.5)
+    # Assert
+    assert len(batch) == 1
+    assert list(batch) == [(0x80, 61, 0, 1.5)]
+
+
+def test_batch_extend_raw_converts_pygame_events():
+    # Arrange
+    batch = MidiEventBatch()
+    raw = [([0x90, 60, 100, 0], 10), ([0xB0, 0x40, 127, 0], 12)]
+    # Act
+    batch.extend_raw(raw)
+    # Assert
+    assert list(batch) == [(0x90, 60, 100, 10.0), (0xB0, 0x40, 127, 12.0)]
+
+
+def test_batch_clear_removes_events():
+    # Arrange
+    batch = MidiEventBatch()
+    batch.append(pack_event(0x90, 60, 100))
+    # Act
+    batch.clear()
+    # Assert
+    assert len(batch) == 0
+    assert list(batch) == []
@@ -1,10 +1,11 @@
 import pytest
-from unittest import mock
-from queue import Queue
-from threading import Lock
+import threading
 import time
 
 from midi.MidiFilePlayer import MidiFilePlayer
+from midi.MidiLifecycle import MidiLifecycle
+from midi.MidiEvent import MidiEventBatch, pack_event, FLAG_OUTPUT_ONLY, FLAG_DISPLAY_ONLY
+from midi.MidiRingBuffer import MidiEventQueue
 
 class DummyMidiMsg:
     def __init__(self, type, time=0, note=None, velocity=0, channel=0, control=0, value=0, tempo=None):
@@ -35,23 +36,23 @@ def patch_mido(monkeypatch):
 # Test: Initialization
 def test_init_sets_defaults():
     # Arrange
-    q = Queue()
-    lock = Lock()
+    q = MidiEventQueue()
+    lifecycle = MidiLifecycle()
     # Act
-    player = MidiFilePlayer(q, lock, lambda: True, lambda: False)
+    player = MidiFilePlayer(q, lifecycle)
     # Assert
     assert player._file_path is None
     assert player._loop is False
     assert player._playing is False
     assert player._paused is False
-    assert player._paused_tick == 0
+    assert player._paused_index == 0
 
 # Test: set_file sets file path
 def test_set_file_sets_path():
     # Arrange
-    q = Queue()
-    lock = Lock()
-    player = MidiFilePlayer(q, lock, lambda: True, lambda: False)
+    q = MidiEventQueue()
+    lifecycle = MidiLifecycle()
+    player = MidiFilePlayer(q, lifecycle)
     # Act
     player.set_file("dummy.mid")
     # Assert
@@ -60,9 +61,9 @@ def test_set_file_sets_path():
 # Test: set_loop sets loop flag
 def test_set_loop_sets_flag():
     # Arrange
-    q = Queue()
-    lock = Lock()
-    player = MidiFilePlayer(q, lock, lambda: True, lambda: False)
+    q = MidiEventQueue()
+    lifecycle = MidiLifecycle()
+    player = MidiFilePlayer(q, lifecycle)
     # Act
     player.set_loop(True)
     # Assert
@@ -73,9 +74,9 @@ def test_set_loop_sets_flag():
 # Test: play/stop changes playing state
 def test_play_and_stop_change_state():
     # Arrange
-    q = Queue()
-    lock = Lock()
-    player = MidiFilePlayer(q, lock, lambda: True, lambda: False)
+    q = MidiEventQueue()
+    lifecycle = MidiLifecycle()
+    player = MidiFilePlayer(q, lifecycle)
     player.set_file("dummy.mid")
     # Act
     result = player.play()
@@ -87,30 +88,12 @@ def test_play_and_stop_change_state():
     # Assert
     assert player.is_playing() is False
 
-# Test: _collect_events returns sorted events and ticks_per_beat
-def test_collect_events_returns_sorted_and_ticks():
-    # Arrange
-    dummy_file = DummyMidiFile([
-        [DummyMidiMsg("note_on", time=0, note=60), DummyMidiMsg("note_off", time=5, note=60)],
-        [DummyMidiMsg("control_change", time=2, control=64, value=127)]
-    ], ticks_per_beat=960)
-    q = Queue()
-    lock = Lock()
-    player = MidiFilePlayer(q, lock, lambda: True, lambda: False)
-    # Act
-    events, ticks = player._collect_events(dummy_file)
-    # Assert
-    assert ticks == 960
-    assert events[0][1].type == "note_on"
-    assert events[1][1].type == "control_change"
-    assert events[2][1].type == "note_off"
-
 # Test: _play_file enqueues events (integration)
 def test_play_file_enqueues_events(monkeypatch):
     # Arrange
-    q = Queue()
-    lock = Lock()
-    player = MidiFilePlayer(q, lock, lambda: True, lambda: False)
+    q = MidiEventQueue()
+    lifecycle = MidiLifecycle()
+    player = MidiFilePlayer(q, lifecycle)
     player.set_file("dummy.mid")
     player._playing = True
     player._loop = False
@@ -119,11 +102,10 @@ def test_play_file_enqueues_events(monkeypatch):
     # Act
     player._play_file()
     # Assert
-    events = []
-    while not q.empty():
-        events.append(q.get())
+    events = MidiEventBatch()
+    q.drain(events)
     # Should contain note_on, control_change, note_off
-    types = [e[0][0] & 0xF0 for e in events]
+    types = [status & 0xF0 for status, _, _, _ in events]
     assert 0x90 in types  # note_on
     assert 0x80 in types  # note_off
     assert 0xB0 in types  # control_change
@@ -133,9 +115,9 @@ def test_play_file_enqueues_events(monkeypatch):
 # Test: pause/resume functionality
 def test_pause_and_resume_state():
     # Arrange
-    q = Queue()
-    lock = Lock()
-    player = MidiFilePlayer(q, lock, lambda: True, lambda: False)
+    q = MidiEventQueue()
+    lifecycle = MidiLifecycle()
+    player = MidiFilePlayer(q, lifecycle)
     player.set_file("dummy.mid")
     # Act: Play then pause
     player.play()
@@ -154,9 +136,9 @@ def test_pause_and_resume_state():
 # Test: stop clears paused state
 def test_stop_clears_paused_state():
     # Arrange
-    q = Queue()
-    lock = Lock()
-    player = MidiFilePlayer(q, lock, lambda: True, lambda: False)
+    q = MidiEventQueue()
+    lifecycle = MidiLifecycle()
+    player = MidiFilePlayer(q, lifecycle)
     player.set_file("dummy.mid")
     player.play()
     player.pause()
@@ -165,14 +147,14 @@ def test_stop_clears_paused_state():
     # Assert
     assert player.is_playing() is False
     assert player.is_paused() is False
-    assert player._paused_tick == 0
+    assert player._paused_index == 0
 
 # Test: pause saves playback position
 def test_pause_saves_position(monkeypatch):
     # Arrange
-    q = Queue()
-    lock = Lock()
-    player = MidiFilePlayer(q, lock, lambda: True, lambda: False)
+    q = MidiEventQueue()
+    lifecycle = MidiLifecycle()
+    player = MidiFilePlayer(q, lifecycle)
     player.set_file("dummy.mid")
     player._playing = True
     player._loop = False
@@ -189,16 +171,16 @@ def test_pause_saves_position(monkeypatch):
     monkeypatch.setattr(player, "_should_stop_playback", mock_should_stop)
     # Act
     player._play_file()
-    # Assert: paused_tick should be set after playback stops
+    # Assert: paused_index should be set after playback stops
     # (In this case, it should be at least at the first note event position)
-    assert player._paused_tick >= 0
+    assert player._paused_index >= 0
 
 # Test: pause-resume-pause sequence
 def test_pause_resume_pause_sequence():
     # Arrange
-    q = Queue()
-    lock = Lock()
-    player = MidiFilePlayer(q, lock, lambda: True, lambda: False)
+    q = MidiEventQueue()
+    lifecycle = MidiLifecycle()
+    player = MidiFilePlayer(q, lifecycle)
     player.set_file("dummy.mid")
     # Act & Assert: Play
     player.play()
@@ -209,7 +191,7 @@ def test_pause_resume_pause_sequence():
     player.pause()
     assert player.is_playing() is False
     assert player.is_paused() is True
-    first_paused_tick = player._paused_tick
+    first_paused_index = player._paused_index
 
     # Resume
     player.resume()
@@ -220,3 +202,872 @@ def test_pause_resume_pause_sequence():
     player.pause()
     assert player.is_playing() is False
     assert player.is_paused() is True
+
+# Test: timeline cache
+def _count_loads(monkeypatch):
+    loads = []
+    def fake_midifile(path):
+        loads.append(path)
+        return DummyMidiFile([[DummyMidiMsg("note_on", time=0, note=60, velocity=100)]])
+    monkeypatch.setattr("mido.MidiFile", fake_midifile)
+    return loads
+
+def test_timeline_is_parsed_once_for_unchanged_file(monkeypatch, tmp_path):
+    # Arrange
+    path = tmp_path / "song.mid"
+    path.write_bytes(b"MThd")
+    loads = _count_loads(monkeypatch)
+    player = MidiFilePlayer(MidiEventQueue(), MidiLifecycle())
+    player.set_file(str(path))
+    # Act
+    first = player._get_timeline()
+    second = player._get_timeline()
+    # Assert
+    assert loads == [str(path)]
+    assert first is second
+
+def test_timeline_is_reparsed_when_file_changes(monkeypatch, tmp_path):
+    # Arrange
+    path = tmp_path / "song.mid"
+    path.write_bytes(b"MThd")
+    loads = _count_loads(monkeypatch)
+    player = MidiFilePlayer(MidiEventQueue(), MidiLifecycle())
+    player.set_file(str(path))
+    player._get_timeline()
+    # Act: different size
+    path.write_bytes(b"MThd-longer")
+    player._get_timeline()
+    # Assert
+    assert len(loads) == 2
+
+def test_set_file_with_same_path_keeps_cached_timeline(monkeypatch, tmp_path):
+    # Arrange
+    path = tmp_path / "song.mid"
+    path.write_bytes(b"MThd")
+    loads = _count_loads(monkeypatch)
+    player = MidiFilePlayer(MidiEventQueue(), MidiLifecycle())
+    player.set_file(str(path))
+    first = player._get_timeline()
+    # Act: PianoTab sets the file again on every Play
+    player.set_file(str(path))
+    second = player._get_timeline()
+    # Assert
+    assert len(loads) == 1
+    assert first is second
+
+def test_selecting_another_file_invalidates_its_cached_timeline(monkeypatch, tmp_path):
+    # Arrange
+    path = tmp_path / "song.mid"
+    other = tmp_path / "other.mid"
+    path.write_bytes(b"MThd")
+    other.write_bytes(b"MThd")
+    loads = _count_loads(monkeypatch)
+    player = MidiFilePlayer(MidiEventQueue(), MidiLifecycle())
+    player.set_file(str(path))
+    player._get_timeline()
+    # Act
+    player.set_file(str(other))
+    player.set_file(str(path))
+    player._get_timeline()
+    # Assert
+    assert loads == [str(path), str(path)]
+
+def test_timeline_is_not_cached_for_missing_file(monkeypatch):
+    # Arrange
+    loads = _count_loads(monkeypatch)
+    player = MidiFilePlayer(MidiEventQueue(), MidiLifecycle())
+    player.set_file("dummy.mid")
+    # Act
+    player._get_timeline()
+    player._get_timeline()
+    # Assert
+    assert len(loads) == 2
+
+def test_timeline_cache_is_bounded(monkeypatch, tmp_path):
+    # Arrange
+    _count_loads(monkeypatch)
+    player = MidiFilePlayer(MidiEventQueue(), MidiLifecycle())
+    paths = []
+    for i in range(MidiFilePlayer.TIMELINE_CACHE_SIZE + 2):
+        path = tmp_path / f"song{i}.mid"
+        path.write_bytes(b"MThd")
+        paths.append(str(path))
+    # Act
+    for path in paths:
+        player.set_file(path)
+        player._get_timeline()
+    # Assert: oldest entries were evicted
+    assert list(player._timelines) == paths[-MidiFilePlayer.TIMELINE_CACHE_SIZE:]
+
+def test_loop_pass_reuses_cached_timeline(monkeypatch, tmp_path):
+    # Arrange
+    path = tmp_path / "song.mid"
+    path.write_bytes(b"MThd")
+    loads = _count_loads(monkeypatch)
+    monkeypatch.setattr(time, "sleep", lambda s: None)
+    q = MidiEventQueue()
+    player = MidiFilePlayer(q, MidiLifecycle())
+    player.set_file(str(path))
+    player._playing = True
+    player._loop = True
+    passes = [0]
+    def post_pass():
+        passes[0] += 1
+        return passes[0] >= 3
+    monkeypatch.setattr(player, "_post_file_pass", post_pass)
+    # Act
+    player._play_file()
+    # Assert
+    assert passes[0] == 3
+    assert len(loads) == 1
+
+def test_resume_continues_from_paused_index(monkeypatch):
+    # Arrange
+    monkeypatch.setattr(time, "sleep", lambda s: None)
+    q = MidiEventQueue()
+    player = MidiFilePlayer(q, MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.play()
+    pushed = []
+    original_push = player._ring.push
+    def push_then_pause(word, ts=0.0):
+        pushed.append(word & 0xFF)
+        original_push(word, ts)
+        if len(pushed) == 1:
+            player.pause()
+    monkeypatch.setattr(player._ring, "push", push_then_pause)
+    # Act: first pass stops after one event
+    player._play_file()
+    # Assert
+    assert player.is_paused() is True
+    assert player._paused_index == 1
+    # Act: resume plays the rest without repeating the first event
+    player.resume()
+    player._play_file()
+    # Assert: note_on, then the remaining note_off and control_change
+    assert pushed == [0x90, 0x80, 0xB0]
+    assert player._paused_index == 0
+
+# Test: seek
+C4_ON, PEDAL_DOWN, E4_ON = pack_event(0x90, 60, 100), pack_event(0xB0, 64, 127), pack_event(0x90, 64, 90)
+C4_OFF, E4_OFF, PEDAL_UP = pack_event(0x80, 60, 0), pack_event(0x80, 64, 0), pack_event(0xB0, 64, 0)
+
+def _seek_file():
+    return DummyMidiFile([[
+        DummyMidiMsg("note_on", time=0, note=60, velocity=100),
+        DummyMidiMsg("control_change", time=0, control=64, value=127),
+        DummyMidiMsg("note_on", time=480, note=64, velocity=90),
+        DummyMidiMsg("note_off", time=480, note=60),
+        DummyMidiMsg("note_off", time=0, note=64),
+    ]])
+
+def _drain_words(q):
+    batch = MidiEventBatch()
+    q.drain(batch)
+    return [(status, data1, data2) for status, data1, data2, _ in batch]
+
+def _after_pedal_chord(monkeypatch, player, action):
+    """Call `action` right after the tick-0 chord (C4 + pedal down) of _seek_file is pushed."""
+    original_push_batch = player._ring.push_batch
+    def push_batch_then_act(words, times):
+        count = original_push_batch(words, times)
+        if PEDAL_DOWN in list(words):
+            action()
+        return count
+    monkeypatch.setattr(player._ring, "push_batch", push_batch_then_act)
+
+def test_seek_while_stopped_starts_from_target_with_chased_state(monkeypatch):
+    # Arrange
+    monkeypatch.setattr("mido.MidiFile", lambda path: _seek_file())
+    q = MidiEventQueue()
+    player = MidiFilePlayer(q, MidiLifecycle())
+    player.set_file("dummy.mid")
+    # Act: 0.5 s is tick 480 at the default tempo
+    player.seek(0.5)
+    player.play()
+    player._play_file()
+    # Assert: pedal and C4 are chased, then playback continues from E4
+    assert _drain_words(q) == [
+        (0xB0, 64, 127), (0x90, 60, 100),
+        (0x90, 64, 90), (0x80, 60, 0), (0x80, 64, 0),
+        (0xB0, 64, 0),
+    ]
+
+def test_seek_tick_uses_tick_position(monkeypatch):
+    # Arrange
+    monkeypatch.setattr("mido.MidiFile", lambda path: _seek_file())
+    q = MidiEventQueue()
+    player = MidiFilePlayer(q, MidiLifecycle())
+    player.set_file("dummy.mid")
+    # Act
+    player.seek_tick(960)
+    player.play()
+    player._play_file()
+    # Assert: both notes are still down just before tick 960, then released there
+    assert _drain_words(q) == [
+        (0xB0, 64, 127), (0x90, 60, 100), (0x90, 64, 90),
+        (0x80, 60, 0), (0x80, 64, 0),
+        (0xB0, 64, 0),
+    ]
+
+def test_seek_during_playback_releases_notes_and_jumps(monkeypatch):
+    # Arrange
+    monkeypatch.setattr("mido.MidiFile", lambda path: _seek_file())
+    q = MidiEventQueue()
+    player = MidiFilePlayer(q, MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.play()
+    _after_pedal_chord(monkeypatch, player, lambda: player.seek(10.0))
+    # Act: seeking past the end finishes the pass immediately
+    start = time.perf_counter()
+    player._play_file()
+    elapsed = time.perf_counter() - start
+    # Assert
+    assert elapsed < 0.4
+    assert _drain_words(q) == [
+        (0x90, 60, 100), (0xB0, 64, 127),
+        (0x80, 60, 0), (0xB0, 64, 0),
+    ]
+
+def test_pause_releases_sounding_notes(monkeypatch):
+    # Arrange
+    monkeypatch.setattr("mido.MidiFile", lambda path: _seek_file())
+    q = MidiEventQueue()
+    player = MidiFilePlayer(q, MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.play()
+    _after_pedal_chord(monkeypatch, player, player.pause)
+    # Act
+    player._play_file()
+    # Assert
+    assert _drain_words(q) == [
+        (0x90, 60, 100), (0xB0, 64, 127),
+        (0x80, 60, 0), (0xB0, 64, 0),
+    ]
+    assert player._paused_index == 2
+
+def test_piano_tab_play_after_pause_resumes_and_pauses_again(monkeypatch):
+    # Arrange: PianoTab's Play button calls set_file() then play(), also to resume
+    monkeypatch.setattr("mido.MidiFile", lambda path: _seek_file())
+    q = MidiEventQueue()
+    player = MidiFilePlayer(q, MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.play()
+    original_push_batch = player._ring.push_batch
+    _after_pedal_chord(monkeypatch, player, player.pause)
+    player._play_file()
+    _drain_words(q)
+    monkeypatch.setattr(player._ring, "push_batch", original_push_batch)
+    original_push = player._ring.push
+    def push_then_pause(word, ts=0.0):
+        count = original_push(word, ts)
+        if word == E4_ON:
+            player.pause()
+        return count
+    monkeypatch.setattr(player._ring, "push", push_then_pause)
+    # Act
+    player.set_file("dummy.mid")
+    player.play()
+    resumed_paused = player.is_paused()
+    player._play_file()
+    # Assert: continues at E4 with C4 and the pedal chased, then the second pause holds
+    assert resumed_paused is False
+    assert _drain_words(q) == [
+        (0xB0, 64, 127), (0x90, 60, 100), (0x90, 64, 90),
+        (0x80, 60, 0), (0x80, 64, 0), (0xB0, 64, 0),
+    ]
+    assert player.is_playing() is False
+    assert player.is_paused() is True
+    assert player._paused_index == 3
+
+def test_stop_clears_pending_seek():
+    # Arrange
+    player = MidiFilePlayer(MidiEventQueue(), MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.seek(3.0)
+    # Act
+    player.stop()
+    # Assert
+    assert player._seek_target is None
+
+# Test: playback speed
+def test_set_speed_clamps_to_supported_range():
+    # Arrange
+    player = MidiFilePlayer(MidiEventQueue(), MidiLifecycle())
+    # Act & Assert
+    assert player.set_speed(10) == 4.0
+    assert player.set_speed(0.1) == 0.25
+    assert player.set_speed(2) == 2.0
+    assert player.get_speed() == 2.0
+
+def test_set_speed_scales_playback_time(monkeypatch):
+    # Arrange: the file lasts 1 s at its own tempo
+    monkeypatch.setattr("mido.MidiFile", lambda path: _seek_file())
+    q = MidiEventQueue()
+    player = MidiFilePlayer(q, MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.set_speed(4.0)
+    player.play()
+    # Act
+    start = time.perf_counter()
+    player._play_file()
+    elapsed = time.perf_counter() - start
+    # Assert
+    assert 0.24 <= elapsed < 0.5
+    assert len(_drain_words(q)) == 6
+
+def test_set_speed_during_playback_keeps_position(monkeypatch):
+    # Arrange
+    monkeypatch.setattr("mido.MidiFile", lambda path: _seek_file())
+    q = MidiEventQueue()
+    player = MidiFilePlayer(q, MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.play()
+    _after_pedal_chord(monkeypatch, player, lambda: player.set_speed(4.0))
+    # Act: the remaining 1 s of file time plays in 0.25 s
+    start = time.perf_counter()
+    player._play_file()
+    elapsed = time.perf_counter() - start
+    # Assert
+    assert 0.24 <= elapsed < 0.5
+    assert _drain_words(q) == [
+        (0x90, 60, 100), (0xB0, 64, 127),
+        (0x90, 64, 90), (0x80, 60, 0), (0x80, 64, 0),
+        (0xB0, 64, 0),
+    ]
+
+# Test: incremental compile
+def test_playback_compiles_timeline_while_playing(monkeypatch, tmp_path):
+    # Arrange: one chunk per message; a real file so the timeline is cached
+    monkeypatch.setattr("midi.MidiTimeline.MidiTimeline.COMPILE_CHUNK", 1)
+    monkeypatch.setattr("mido.MidiFile", lambda path: _seek_file())
+    path = tmp_path / "song.mid"
+    path.write_bytes(b"MThd")
+    q = MidiEventQueue()
+    player = MidiFilePlayer(q, MidiLifecycle(), compile_window=1)
+    player.set_file(str(path))
+    player.play()
+    # Act
+    timeline = player._get_timeline()
+    compiled_before = len(timeline)
+    player._play_file()
+    # Assert
+    assert compiled_before == 1
+    assert timeline.complete
+    assert len(_drain_words(q)) == 6
+
+def test_seek_compiles_up_to_target(monkeypatch):
+    # Arrange
+    monkeypatch.setattr("midi.MidiTimeline.MidiTimeline.COMPILE_CHUNK", 1)
+    monkeypatch.setattr("mido.MidiFile", lambda path: _seek_file())
+    q = MidiEventQueue()
+    player = MidiFilePlayer(q, MidiLifecycle())
+    player.set_file("dummy.mid")
+    # Act
+    player.seek(0.5)
+    player.play()
+    player._play_file()
+    # Assert
+    assert _drain_words(q) == [
+        (0xB0, 64, 127), (0x90, 60, 100),
+        (0x90, 64, 90), (0x80, 60, 0), (0x80, 64, 0),
+        (0xB0, 64, 0),
+    ]
+
+# Test: chord batching
+def _chord_file():
+    return DummyMidiFile([[
+        DummyMidiMsg("note_on", time=0, note=60, velocity=100),
+        DummyMidiMsg("note_on", time=0, note=64, velocity=100),
+        DummyMidiMsg("note_on", time=0, note=67, velocity=100),
+        DummyMidiMsg("note_off", time=48, note=60),
+        DummyMidiMsg("note_off", time=0, note=64),
+        DummyMidiMsg("note_off", time=0, note=67),
+    ]])
+
+@pytest.mark.parametrize("chunk", [4096, 1])
+def test_events_at_same_time_are_pushed_as_one_batch(monkeypatch, chunk):
+    # Arrange: with chunk=1 the chord spans several compile chunks
+    monkeypatch.setattr("midi.MidiTimeline.MidiTimeline.COMPILE_CHUNK", chunk)
+    monkeypatch.setattr("mido.MidiFile", lambda path: _chord_file())
+    q = MidiEventQueue()
+    player = MidiFilePlayer(q, MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.play()
+    batches = []
+    original_push_batch = player._ring.push_batch
+    def record_batch(words, times):
+        batches.append((list(words), set(times)))
+        return original_push_batch(words, times)
+    monkeypatch.setattr(player._ring, "push_batch", record_batch)
+    monkeypatch.setattr(player._ring, "push", lambda word, ts=0.0: pytest.fail("single push"))
+    # Act
+    player._play_file()
+    # Assert: one batch and one timestamp per chord
+    assert [[word & 0xFF for word in words] for words, _ in batches] == [[0x90] * 3, [0x80] * 3]
+    assert all(len(times) == 1 for _, times in batches)
+
+# Test: lookahead output
+def _raw_batches(player, monkeypatch):
+    """Record (perf_counter at push, words, times) of every push/push_batch."""
+    pushes = []
+    original_push_batch = player._ring.push_batch
+    original_push = player._ring.push
+    def push_batch(words, times):
+        pushes.append((time.perf_counter(), list(words), list(times)))
+        return original_push_batch(words, times)
+    def push(word, ts=0.0):
+        pushes.append((time.perf_counter(), [word], [ts]))
+        return original_push(word, ts)
+    monkeypatch.setattr(player._ring, "push_batch", push_batch)
+    monkeypatch.setattr(player._ring, "push", push)
+    return pushes
+
+def test_lookahead_sends_output_early_with_device_timestamps(monkeypatch):
+    # Arrange: device clock in ms on the perf_counter() time base
+    monkeypatch.setattr("mido.MidiFile", lambda path: _seek_file())
+    player = MidiFilePlayer(MidiEventQueue(), MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.set_lookahead(0.1, lambda: time.perf_counter() * 1000.0, latency_ms=1)
+    player.play()
+    pushes = _raw_batches(player, monkeypatch)
+    # Act
+    player._play_file()
+    # Assert: output events carry exact deadlines (minus latency) and leave ~100 ms early
+    output = [(pushed, word & 0xFFFFFF, stamp) for pushed, words, stamps in pushes
+              for word, stamp in zip(words, stamps) if word & FLAG_OUTPUT_ONLY]
+    display = [word & 0xFFFFFF for _, words, _ in pushes for word in words if word & FLAG_DISPLAY_ONLY]
+    assert [word for _, word, _ in output] == [C4_ON, PEDAL_DOWN, E4_ON, C4_OFF, E4_OFF, PEDAL_UP]
+    assert display == [C4_ON, PEDAL_DOWN, E4_ON, C4_OFF, E4_OFF, PEDAL_UP]
+    start = output[0][2]
+    assert [round(stamp - start) for _, _, stamp in output[:5]] == [0, 0, 500, 1000, 1000]
+    pushed, _, stamp = output[2]
+    assert 80 <= stamp + 1 - pushed * 1000.0 <= 101
+
+def test_lookahead_pause_releases_output_after_events_sent_ahead(monkeypatch):
+    # Arrange
+    monkeypatch.setattr("mido.MidiFile", lambda path: _seek_file())
+    player = MidiFilePlayer(MidiEventQueue(), MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.set_lookahead(0.6, lambda: time.perf_counter() * 1000.0)
+    player.play()
+    pushes = _raw_batches(player, monkeypatch)
+    original_push = player._ring.push_batch
+    def pause_after_chord(words, times):
+        count = original_push(words, times)
+        if any(word & FLAG_DISPLAY_ONLY and word & 0xFFFFFF == PEDAL_DOWN for word in words):
+            player.pause()
+        return count
+    monkeypatch.setattr(player._ring, "push_batch", pause_after_chord)
+    # Act
+    player._play_file()
+    # Assert: E4 at 0.5 s was already sent ahead; its release is stamped no earlier
+    output = [(word & 0xFFFFFF, stamp) for _, words, stamps in pushes
+              for word, stamp in zip(words, stamps) if word & FLAG_OUTPUT_ONLY]
+    sent_e4 = dict(output)[E4_ON]
+    releases = output[-3:]
+    assert sorted(word for word, _ in releases) == [C4_OFF, E4_OFF, PEDAL_UP]
+    assert all(stamp >= sent_e4 for _, stamp in releases)
+    display = [word & 0xFFFFFF for _, words, _ in pushes for word in words if word & FLAG_DISPLAY_ONLY]
+    assert display == [C4_ON, PEDAL_DOWN, C4_OFF, PEDAL_UP]
+    assert player._paused_index == 2
+
+def test_restarted_device_clock_is_not_clamped_to_old_timestamps(monkeypatch):
+    # Arrange: the device clock ran 10 minutes, then the backend was restarted
+    device = [600000.0]
+    player = MidiFilePlayer(MidiEventQueue(), MidiLifecycle())
+    player.set_lookahead(0.03, lambda: device[0])
+    player._output_clock = player._device_clock
+    pushes = _raw_batches(player, monkeypatch)
+    player._push_output([C4_ON])
+    # Act
+    device[0] = 5.0
+    player._push_output([E4_ON])
+    # Assert
+    assert [stamps for _, _, stamps in pushes] == [[600000.0], [5.0]]
+
+def test_new_pass_is_not_clamped_to_earlier_timestamps(monkeypatch):
+    # Arrange: an earlier pass left a timestamp of a clock that has restarted since
+    monkeypatch.setattr("mido.MidiFile", lambda path: _seek_file())
+    player = MidiFilePlayer(MidiEventQueue(), MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.set_lookahead(0.1, lambda: time.perf_counter() * 1000.0)
+    player._last_output_ms = time.perf_counter() * 1000.0 + 600000.0
+    player.play()
+    pushes = _raw_batches(player, monkeypatch)
+    # Act
+    player._play_file()
+    # Assert
+    stamps = [stamp for _, words, stamps in pushes for word, stamp in zip(words, stamps) if word & FLAG_OUTPUT_ONLY]
+    assert len(stamps) == 6
+    assert max(stamps) < time.perf_counter() * 1000.0 + 1000.0
+
+def test_unreadable_device_clock_does_not_end_playback(monkeypatch, capsys):
+    # Arrange: the backend is between quit() and init()
+    def device_clock():
+        raise RuntimeError("pygame.midi not initialised")
+    monkeypatch.setattr("mido.MidiFile", lambda path: _seek_file())
+    player = MidiFilePlayer(MidiEventQueue(), MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.set_lookahead(0.1, device_clock)
+    player.play()
+    pushes = _raw_batches(player, monkeypatch)
+    # Act
+    player._play_file()
+    # Assert: events go out right away instead of killing the player thread
+    output = [(word & 0xFFFFFF, stamp) for _, words, stamps in pushes
+              for word, stamp in zip(words, stamps) if word & FLAG_OUTPUT_ONLY]
+    assert [word for word, _ in output] == [C4_ON, PEDAL_DOWN, E4_ON, C4_OFF, E4_OFF, PEDAL_UP]
+    assert all(stamp == 0.0 for _, stamp in output)
+    assert capsys.readouterr().out.count("MIDI output clock unavailable") == 1
+
+def test_set_lookahead_without_clock_disables_it():
+    # Arrange
+    player = MidiFilePlayer(MidiEventQueue(), MidiLifecycle())
+    # Act
+    player.set_lookahead(0.05, None)
+    # Assert
+    assert player._lookahead == 0.0
+
+# Test: mute/solo
+E4_CH2_ON, E4_CH2_OFF = pack_event(0x92, 64, 90), pack_event(0x82, 64, 0)
+
+def _two_track_file():
+    # Track 0: C4 on channel 0 for 0.5 s; track 1: E4 on channel 2 for 0.25 s
+    return DummyMidiFile([
+        [DummyMidiMsg("note_on", time=0, note=60, velocity=100),
+         DummyMidiMsg("note_off", time=480, note=60)],
+        [DummyMidiMsg("note_on", time=0, note=64, velocity=90, channel=2),
+         DummyMidiMsg("note_off", time=240, note=64, channel=2)],
+    ])
+
+def _packed(words):
+    return [pack_event(*word) for word in words]
+
+def test_track_mute_skips_muted_events(monkeypatch):
+    # Arrange
+    monkeypatch.setattr("mido.MidiFile", lambda path: _two_track_file())
+    q = MidiEventQueue()
+    player = MidiFilePlayer(q, MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.set_track_mute(1)
+    player.play()
+    # Act
+    player._play_file()
+    # Assert
+    assert _packed(_drain_words(q)) == [C4_ON, C4_OFF]
+
+def test_channel_solo_plays_only_soloed_channel(monkeypatch):
+    # Arrange
+    monkeypatch.setattr("mido.MidiFile", lambda path: _two_track_file())
+    q = MidiEventQueue()
+    player = MidiFilePlayer(q, MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.set_channel_solo(2)
+    player.play()
+    # Act
+    start = time.perf_counter()
+    player._play_file()
+    elapsed = time.perf_counter() - start
+    # Assert: the muted C4 off at 0.5 s is not waited for
+    assert _packed(_drain_words(q)) == [E4_CH2_ON, E4_CH2_OFF]
+    assert 0.24 <= elapsed < 0.4
+
+def test_mute_during_playback_releases_muted_notes(monkeypatch):
+    # Arrange
+    monkeypatch.setattr("mido.MidiFile", lambda path: _seek_file())
+    q = MidiEventQueue()
+    player = MidiFilePlayer(q, MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.play()
+    _after_pedal_chord(monkeypatch, player, lambda: player.set_channel_mute(0))
+    # Act
+    start = time.perf_counter()
+    player._play_file()
+    elapsed = time.perf_counter() - start
+    # Assert: released right away, and the rest of the file is skipped
+    assert _packed(_drain_words(q)) == [C4_ON, PEDAL_DOWN, C4_OFF, PEDAL_UP]
+    assert elapsed < 0.4
+
+def test_unmute_during_playback_sends_held_notes(monkeypatch):
+    # Arrange
+    monkeypatch.setattr("mido.MidiFile", lambda path: _two_track_file())
+    q = MidiEventQueue()
+    player = MidiFilePlayer(q, MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.set_track_mute(0)
+    player.play()
+    original_push = player._ring.push
+    def push_then_unmute(word, ts=0.0):
+        count = original_push(word, ts)
+        if word == E4_CH2_ON:
+            player.set_track_mute(0, False)
+        return count
+    monkeypatch.setattr(player._ring, "push", push_then_unmute)
+    # Act
+    player._play_file()
+    # Assert: C4, held since tick 0, is sent when track 0 is unmuted
+    assert _packed(_drain_words(q)) == [E4_CH2_ON, C4_ON, E4_CH2_OFF, C4_OFF]
+
+def test_clear_mute_solo_plays_everything_again(monkeypatch):
+    # Arrange
+    monkeypatch.setattr("mido.MidiFile", lambda path: _two_track_file())
+    q = MidiEventQueue()
+    player = MidiFilePlayer(q, MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.set_track_solo(0)
+    player.set_channel_mute(2)
+    # Act
+    player.clear_mute_solo()
+    player.play()
+    player._play_file()
+    # Assert
+    assert _packed(_drain_words(q)) == [C4_ON, E4_CH2_ON, E4_CH2_OFF, C4_OFF]
+
+def test_lookahead_does_not_send_muted_events(monkeypatch):
+    # Arrange
+    monkeypatch.setattr("mido.MidiFile", lambda path: _two_track_file())
+    player = MidiFilePlayer(MidiEventQueue(), MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.set_lookahead(0.1, lambda: time.perf_counter() * 1000.0)
+    player.set_track_solo(1)
+    player.play()
+    pushes = _raw_batches(player, monkeypatch)
+    # Act
+    player._play_file()
+    # Assert
+    output = [word & 0xFFFFFF for _, words, _ in pushes for word in words if word & FLAG_OUTPUT_ONLY]
+    display = [word & 0xFFFFFF for _, words, _ in pushes for word in words if word & FLAG_DISPLAY_ONLY]
+    assert output == [E4_CH2_ON, E4_CH2_OFF]
+    assert display == [E4_CH2_ON, E4_CH2_OFF]
+
+@pytest.mark.parametrize("setter, value", [
+    ("set_channel_mute", 16),
+    ("set_channel_solo", -1),
+    ("set_track_mute", -1),
+])
+def test_mute_solo_rejects_invalid_voices(setter, value):
+    # Arrange
+    player = MidiFilePlayer(MidiEventQueue(), MidiLifecycle())
+    # Act & Assert
+    with pytest.raises(ValueError):
+        getattr(player, setter)(value)
+
+# Test: A-B loop region
+def _stop_on_second_pedal_chord(monkeypatch, player):
+    """Stop playback right after the tick-0 chord of _seek_file is pushed the second time."""
+    chords = []
+    def stop_on_second():
+        chords.append(time.perf_counter())
+        if len(chords) == 2:
+            player.stop()
+    _after_pedal_chord(monkeypatch, player, stop_on_second)
+    return chords
+
+def test_loop_region_wraps_without_reloading(monkeypatch):
+    # Arrange
+    loads = []
+    def load(path):
+        loads.append(path)
+        return _seek_file()
+    monkeypatch.setattr("mido.MidiFile", load)
+    q = MidiEventQueue()
+    player = MidiFilePlayer(q, MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.set_loop_region(0.0, 0.75)
+    player.play()
+    chords = _stop_on_second_pedal_chord(monkeypatch, player)
+    # Act
+    player._play_file()
+    # Assert: notes held across the loop end are released before the start plays again
+    assert _packed(_drain_words(q)) == [
+        C4_ON, PEDAL_DOWN, E4_ON,
+        C4_OFF, E4_OFF, PEDAL_UP,
+        C4_ON, PEDAL_DOWN,
+        C4_OFF, PEDAL_UP,
+    ]
+    assert 0.74 <= chords[1] - chords[0] < 0.8
+    assert len(loads) == 1
+
+def test_loop_region_chases_state_at_loop_start(monkeypatch):
+    # Arrange: the loop starts while C4 and the pedal are down
+    monkeypatch.setattr("mido.MidiFile", lambda path: _seek_file())
+    q = MidiEventQueue()
+    player = MidiFilePlayer(q, MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.set_loop_region(0.25, 0.75)
+    player.seek(0.5)
+    player.play()
+    original_push = player._ring.push
+    wraps = []
+    def push_then_stop(word, ts=0.0):
+        count = original_push(word, ts)
+        if word == E4_ON:
+            wraps.append(word)
+            if len(wraps) == 2:
+                player.stop()
+        return count
+    monkeypatch.setattr(player._ring, "push", push_then_stop)
+    # Act
+    player._play_file()
+    # Assert
+    assert _packed(_drain_words(q)) == [
+        PEDAL_DOWN, C4_ON, E4_ON,
+        C4_OFF, E4_OFF, PEDAL_UP,
+        PEDAL_DOWN, C4_ON, E4_ON,
+        C4_OFF, E4_OFF, PEDAL_UP,
+    ]
+
+def test_loop_bars_resolve_with_time_signature(monkeypatch):
+    # Arrange: 3/4 at 480 ticks per beat; notes at the start of bars 1, 2 and 3
+    time_signature = DummyMidiMsg("time_signature")
+    time_signature.numerator, time_signature.denominator = 3, 4
+    monkeypatch.setattr("mido.MidiFile", lambda path: DummyMidiFile([[
+        time_signature,
+        DummyMidiMsg("note_on", time=0, note=60, velocity=100),
+        DummyMidiMsg("note_on", time=1440, note=62, velocity=100),
+        DummyMidiMsg("note_on", time=1440, note=64, velocity=100),
+    ]]))
+    player = MidiFilePlayer(MidiEventQueue(), MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.set_loop_bars(2, 2)
+    timeline = player._get_timeline()
+    # Act
+    loop = player._resolve_loop_region(timeline)
+    # Assert: bar 2 is 1.5 s to 3 s at 120 BPM
+    assert loop == (1, 2, 1.5, 3.0)
+
+def test_loop_region_outside_file_is_ignored(monkeypatch, capsys):
+    # Arrange
+    monkeypatch.setattr("mido.MidiFile", lambda path: _seek_file())
+    q = MidiEventQueue()
+    player = MidiFilePlayer(q, MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.set_loop_region(5.0, 6.0)
+    player.play()
+    # Act
+    player._play_file()
+    # Assert: one normal pass
+    assert len(_drain_words(q)) == 6
+    assert "outside the file" in capsys.readouterr().out
+
+def test_clear_loop_region_during_playback_plays_to_the_end(monkeypatch):
+    # Arrange
+    monkeypatch.setattr("mido.MidiFile", lambda path: _seek_file())
+    q = MidiEventQueue()
+    player = MidiFilePlayer(q, MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.set_loop_region(0.0, 0.75)
+    player.play()
+    _after_pedal_chord(monkeypatch, player, player.clear_loop_region)
+    # Act
+    player._play_file()
+    # Assert
+    assert len(_drain_words(q)) == 6
+    assert player.get_loop_region() is None
+
+def test_lookahead_loop_wrap_is_seamless_on_the_device_clock(monkeypatch):
+    # Arrange
+    monkeypatch.setattr("mido.MidiFile", lambda path: _seek_file())
+    player = MidiFilePlayer(MidiEventQueue(), MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.set_lookahead(0.1, lambda: time.perf_counter() * 1000.0)
+    player.set_loop_region(0.0, 0.75)
+    player.play()
+    pushes = _raw_batches(player, monkeypatch)
+    original_push = player._ring.push_batch
+    chords = []
+    def stop_on_second_chord(words, times):
+        count = original_push(words, times)
+        if any(word & FLAG_DISPLAY_ONLY and word & 0xFFFFFF == PEDAL_DOWN for word in words):
+            chords.append(True)
+            if len(chords) == 2:
+                player.stop()
+        return count
+    monkeypatch.setattr(player._ring, "push_batch", stop_on_second_chord)
+    # Act
+    player._play_file()
+    # Assert: the release and the next pass are stamped at the loop end
+    output = [(word & 0xFFFFFF, stamp) for _, words, stamps in pushes
+              for word, stamp in zip(words, stamps) if word & FLAG_OUTPUT_ONLY]
+    start = output[0][1]
+    assert [word for word, _ in output[:8]] == [C4_ON, PEDAL_DOWN, E4_ON, C4_OFF, E4_OFF, PEDAL_UP, C4_ON, PEDAL_DOWN]
+    assert [round(stamp - start) for _, stamp in output[3:8]] == [750] * 5
+
+def _scale_file(count):
+    """`count` notes of 0.05 s, one every 0.1 s at 120 BPM."""
+    messages = []
+    for n in range(count):
+        messages.append(DummyMidiMsg("note_on", time=0 if n == 0 else 48, note=40 + n % 40, velocity=100))
+        messages.append(DummyMidiMsg("note_off", time=48, note=40 + n % 40))
+    return DummyMidiFile([messages])
+
+@pytest.mark.parametrize("set_region_first", [True, False])
+def test_loop_region_behind_the_playhead_restarts_at_its_start(monkeypatch, set_region_first):
+    # Arrange: play from 3 s with the region 0.5 s - 0.8 s already behind the playhead
+    monkeypatch.setattr("mido.MidiFile", lambda path: _scale_file(40))
+    q = MidiEventQueue()
+    player = MidiFilePlayer(q, MidiLifecycle())
+    player.set_file("dummy.mid")
+    if set_region_first:
+        player.set_loop_region(0.5, 0.8)
+    player.seek(3.0)
+    player.play()
+    original_push = player._ring.push
+    note_ons = []
+    def push_then_stop(word, ts=0.0):
+        count = original_push(word, ts)
+        if word & 0xF0 == 0x90 and word >> 16:
+            note_ons.append((time.perf_counter(), (word >> 8) & 0x7F))
+            if len(note_ons) == 1 and not set_region_first:
+                player.set_loop_region(0.5, 0.8)
+            if len(note_ons) == 7:
+                player.stop()
+        return count
+    monkeypatch.setattr(player._ring, "push", push_then_stop)
+    # Act
+    player._play_file()
+    # Assert: the region plays at its own pace, not as a burst of missed passes
+    loop = note_ons[[note for _, note in note_ons].index(45):]
+    assert [note for _, note in loop[:6]] == [45, 46, 47] * 2
+    assert all(b[0] - a[0] > 0.07 for a, b in zip(loop, loop[1:]))
+
+@pytest.mark.parametrize("setter, start, end", [
+    ("set_loop_region", 2.0, 1.0),
+    ("set_loop_region", 1.0, 1.0),
+    ("set_loop_bars", 3, 2),
+])
+def test_invalid_loop_region_raises(setter, start, end):
+    # Arrange
+    player = MidiFilePlayer(MidiEventQueue(), MidiLifecycle())
+    # Act & Assert
+    with pytest.raises(ValueError):
+        getattr(player, setter)(start, end)
+    assert player.get_loop_region() is None
+
+# Test: back-pressure
+def test_chord_larger_than_the_ring_is_delivered_completely(monkeypatch):
+    # Arrange: a 40-note chord and its release through a ring of 16
+    monkeypatch.setattr("mido.MidiFile", lambda path: DummyMidiFile([
+        [DummyMidiMsg("note_on", time=0, note=20 + n, velocity=100) for n in range(40)]
+        + [DummyMidiMsg("note_off", time=48 if n == 0 else 0, note=20 + n) for n in range(40)]
+    ]))
+    q = MidiEventQueue(capacity=16)
+    player = MidiFilePlayer(q, MidiLifecycle())
+    player.set_file("dummy.mid")
+    player.play()
+    out = MidiEventBatch()
+    done = threading.Event()
+    def consume():
+        while not done.is_set() or not q.empty():
+            q.wait(0.01)
+            q.drain(out)
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    # Act
+    player._play_file()
+    done.set()
+    consumer.join(timeout=2.0)
+    # Assert
+    assert [word & 0xF0 for word in out.words] == [0x90] * 40 + [0x80] * 40
+    assert q.overflow_count == 0
@@ -37,6 +37,9 @@ sys.modules.setdefault("pygame", types.SimpleNamespace(midi=fake_pygame.midi))
 sys.modules.setdefault("pygame.midi", fake_pygame.midi)
 
 from src.midi.MidiHandler import MidiHandler
+from src.midi.MidiLifecycle import MidiLifecycle
+from src.midi.MidiEvent import MidiEventBatch, pack_event, FLAG_OUTPUT_ONLY, FLAG_DISPLAY_ONLY
+from src.midi.NoteTable import note_number
 
 
 # Helper fake key and keyboard classes
@@ -57,18 +60,22 @@ class FakeKeyboard:
         self._key = FakeKey()
         self.sustain = FakeSustain()
         self.last_find = None
-    def _find_key(self, name):
-        self.last_find = name
-        if name == "":
-            return ""
+    def _find_key(self, note):
+        self.last_find = note
+        if note < 0:
+            return None
         return self._key
 
-    def set_key_state(self, name, state):
-        key = self._find_key(name)
-        if key == "":
+    def set_key_state(self, note, state):
+        key = self._find_key(note)
+        if key is None:
             return
         key.config(state=state)
 
+    def set_key_states(self, states):
+        for note, state in states.items():
+            self.set_key_state(note, state)
+
     def set_sustain(self, pressed):
         state = fake_tkinter.ACTIVE if pressed else fake_tkinter.NORMAL
         self.sustain.config(state=state)
@@ -91,6 +98,10 @@ class FakeUiDispatcher:
         if func is None:
             return
         return func(*args, **kwargs)
+    def post_merged(self, name, method_name, updates):
+        return self.post_to(name, method_name, updates)
+    def post_latest(self, name, method_name, *args):
+        return self.post_to(name, method_name, *args)
 
 
 @pytest.fixture
@@ -102,34 +113,11 @@ def fake_dispatcher():
 def handler(fake_dispatcher):
     return MidiHandler(
         event_queue=None,
-        lock=None,
-        end_flag_getter=lambda: False,
+        lifecycle=MidiLifecycle(),
         dispatcher=fake_dispatcher
     )
 
 
-def test__get_key_name_returns_first_note(handler):
-    # Arrange / Act
-    result = handler._get_key_name(0)
-    # Assert
-    assert result == handler.NOTE_NAME[0]
-
-
-def test__get_key_name_returns_C4_for_index(handler):
-    # Arrange
-    idx_c4 = handler.NOTE_NAME.index("C4")
-    # Act
-    result = handler._get_key_name(idx_c4)
-    # Assert
-    assert result == "C4"
-
-
-def test__get_key_name_returns_empty_for_invalid_indices(handler):
-    # Arrange / Act / Assert
-    assert handler._get_key_name(-1) == ""
-    assert handler._get_key_name(128) == ""
-
-
 def test_handler_note_on_updates_midiout_and_key_state(handler, fake_dispatcher):
     # Arrange
     kb = FakeKeyboard()
@@ -137,15 +125,16 @@ def test_handler_note_on_updates_midiout_and_key_state(handler, fake_dispatcher)
     fake_dispatcher.register('keyboard', kb)
     midiout = mock.Mock()
     handler.set_output_device(midiout)
-    note_name = "C4"
-    note_num = handler.NOTE_NAME.index(note_name)
+    note_num = note_number("C4")
     velocity = 77
-    on_event = ([0x90, note_num, velocity, 0], 0)
+    on_event = MidiEventBatch()
+    on_event.append(pack_event(0x90, note_num, velocity))
     # Act
     handler._handler(on_event)
     # Assert
-    midiout.note_on.assert_called_with(note=note_num, velocity=velocity)
+    midiout.write.assert_called_once_with([[[0x90, note_num, velocity], 0]])
     assert kb._key.last_state == fake_tkinter.ACTIVE
+    assert kb.last_find == note_num
 
 
 def test_handler_note_off_updates_midiout_and_key_state(handler, fake_dispatcher):
@@ -155,13 +144,13 @@ def test_handler_note_off_updates_midiout_and_key_state(handler, fake_dispatcher
     fake_dispatcher.register('keyboard', kb)
     midiout = mock.Mock()
     handler.set_output_device(midiout)
-    note_name = "C4"
-    note_num = handler.NOTE_NAME.index(note_name)
-    off_event = ([0x80, note_num, 0, 0], 0)
+    note_num = note_number("C4")
+    off_event = MidiEventBatch()
+    off_event.append(pack_event(0x80, note_num, 0))
     # Act
     handler._handler(off_event)
     # Assert
-    midiout.note_off.assert_called_with(note=note_num)
+    midiout.write.assert_called_once_with([[[0x80, note_num, 0], 0]])
     assert kb._key.last_state == fake_tkinter.NORMAL
 
 
@@ -173,11 +162,12 @@ def test_handler_sustain_on_writes_midiout_and_updates_sustain(handler, fake_dis
     midiout = mock.Mock()
     handler.set_output_device(midiout)
     status = 0xB0
-    cc_on_event = ([status, 0x40, 127, 0], 0)
+    cc_on_event = MidiEventBatch()
+    cc_on_event.append(pack_event(status, 0x40, 127))
     # Act
     handler._handler(cc_on_event)
     # Assert
-    midiout.write_short.assert_called_with(status, 0x40, 127)
+    midiout.write.assert_called_once_with([[[status, 0x40, 127], 0]])
     assert kb.sustain.last_state == fake_tkinter.ACTIVE
 
 
@@ -189,9 +179,207 @@ def test_handler_sustain_off_writes_midiout_and_updates_sustain(handler, fake_di
     midiout = mock.Mock()
     handler.set_output_device(midiout)
     status = 0xB0
-    cc_off_event = ([status, 0x40, 0, 0], 0)
+    cc_off_event = MidiEventBatch()
+    cc_off_event.append(pack_event(status, 0x40, 0))
     # Act
     handler._handler(cc_off_event)
     # Assert
-    midiout.write_short.assert_called_with(status, 0x40, 0)
+    midiout.write.assert_called_once_with([[[status, 0x40, 0], 0]])
     assert kb.sustain.last_state == fake_tkinter.NORMAL
+
+
+def test_handler_sends_batch_in_one_write_and_one_ui_update(handler, fake_dispatcher):
+    # Arrange
+    kb = FakeKeyboard()
+    handler.set_keyboard(kb)
+    fake_dispatcher.register('keyboard', kb)
+    midiout = mock.Mock()
+    handler.set_output_device(midiout)
+    batch = MidiEventBatch()
+    batch.append(pack_event(0x90, 60, 100))
+    batch.append(pack_event(0x90, 64, 90))
+    batch.append(pack_event(0x80, 60, 0))
+    # Act
+    handler._handler(batch)
+    # Assert
+    midiout.write.assert_called_once_with([
+        [[0x90, 60, 100], 0],
+        [[0x90, 64, 90], 0],
+        [[0x80, 60, 0], 0],
+    ])
+    assert fake_dispatcher.calls == [
+        ('keyboard', 'set_key_states', ({60: fake_tkinter.NORMAL, 64: fake_tkinter.ACTIVE},), {}),
+    ]
+
+
+def test_handler_routes_output_only_and_display_only_events(handler, fake_dispatcher):
+    # Arrange: C4 sent ahead with a device timestamp, E4 only displayed, G4 live
+    kb = FakeKeyboard()
+    fake_dispatcher.register('keyboard', kb)
+    midiout = mock.Mock()
+    handler.set_output_device(midiout)
+    batch = MidiEventBatch()
+    batch.append(pack_event(0x90, 60, 100) | FLAG_OUTPUT_ONLY, 1234.0)
+    batch.append(pack_event(0x90, 64, 90) | FLAG_DISPLAY_ONLY, 99.0)
+    batch.append(pack_event(0x90, 67, 80), 99.0)
+    # Act
+    handler._handler(batch)
+    # Assert: the live G4 is not stamped before the C4 already queued ahead
+    midiout.write.assert_called_once_with([
+        [[0x90, 60, 100], 1234],
+        [[0x90, 67, 80], 1234],
+    ])
+    assert fake_dispatcher.calls == [
+        ('keyboard', 'set_key_states', ({64: fake_tkinter.ACTIVE, 67: fake_tkinter.ACTIVE},), {}),
+    ]
+
+
+def test_handler_stamps_live_events_with_backend_clock(fake_dispatcher, fake_backend):
+    # Arrange
+    fake_backend.set_timestamps(True)
+    fake_backend.time_ms = 500
+    handler = MidiHandler(event_queue=None, lifecycle=MidiLifecycle(),
+                          dispatcher=fake_dispatcher, midi_backend=fake_backend)
+    midiout = mock.Mock()
+    handler.set_output_device(midiout)
+    batch = MidiEventBatch()
+    batch.append(pack_event(0x90, 60, 100))
+    # Act
+    handler._handler(batch)
+    # Assert
+    midiout.write.assert_called_once_with([[[0x90, 60, 100], 500]])
+
+
+def test_handler_keeps_timestamps_monotonic_across_batches(fake_dispatcher, fake_backend):
+    # Arrange: file events were queued up to 530 ms, live input arrives at 505
+    fake_backend.set_timestamps(True)
+    handler = MidiHandler(event_queue=None, lifecycle=MidiLifecycle(),
+                          dispatcher=fake_dispatcher, midi_backend=fake_backend)
+    midiout = mock.Mock()
+    handler.set_output_device(midiout)
+    ahead = MidiEventBatch()
+    ahead.append(pack_event(0x90, 60, 100) | FLAG_OUTPUT_ONLY, 530.0)
+    ahead.append(pack_event(0x80, 60, 0) | FLAG_OUTPUT_ONLY, 520.0)
+    live = MidiEventBatch()
+    live.append(pack_event(0x90, 64, 90))
+    # Act
+    handler._handler(ahead)
+    fake_backend.time_ms = 505
+    handler._handler(live)
+    fake_backend.time_ms = 600
+    handler._handler(live)
+    # Assert
+    writes = [c.args[0] for c in midiout.write.call_args_list]
+    assert writes == [
+        [[[0x90, 60, 100], 530], [[0x80, 60, 0], 530]],
+        [[[0x90, 64, 90], 530]],
+        [[[0x90, 64, 90], 600]],
+    ]
+
+
+def test_handler_rewrites_timestamps_of_a_restarted_clock(fake_dispatcher, fake_backend):
+    # Arrange: a file event stamped before the backend clock restarted
+    fake_backend.set_timestamps(True)
+    fake_backend.time_ms = 20
+    handler = MidiHandler(event_queue=None, lifecycle=MidiLifecycle(),
+                          dispatcher=fake_dispatcher, midi_backend=fake_backend)
+    midiout = mock.Mock()
+    handler.set_output_device(midiout)
+    stale = MidiEventBatch()
+    stale.append(pack_event(0x90, 60, 100) | FLAG_OUTPUT_ONLY, 600000.0)
+    live = MidiEventBatch()
+    live.append(pack_event(0x90, 64, 90))
+    # Act
+    handler._handler(stale)
+    fake_backend.time_ms = 30
+    handler._handler(live)
+    # Assert
+    writes = [c.args[0] for c in midiout.write.call_args_list]
+    assert writes == [[[[0x90, 60, 100], 20]], [[[0x90, 64, 90], 30]]]
+
+
+def test_handler_restarts_timestamps_for_a_new_output(handler):
+    # Arrange
+    first = mock.Mock()
+    handler.set_output_device(first)
+    ahead = MidiEventBatch()
+    ahead.append(pack_event(0x90, 60, 100) | FLAG_OUTPUT_ONLY, 530.0)
+    handler._handler(ahead)
+    second = mock.Mock()
+    live = MidiEventBatch()
+    live.append(pack_event(0x90, 64, 90))
+    # Act
+    handler.set_output_device(second)
+    handler._handler(live)
+    # Assert
+    second.write.assert_called_once_with([[[0x90, 64, 90], 0]])
+
+
+def test_handler_treats_note_on_with_zero_velocity_as_note_off(handler, fake_dispatcher):
+    # Arrange
+    midiout = mock.Mock()
+    handler.set_output_device(midiout)
+    batch = MidiEventBatch()
+    batch.append(pack_event(0x90, 60, 0))
+    # Act
+    handler._handler(batch)
+    # Assert
+    midiout.write.assert_called_once_with([[[0x80, 60, 0], 0]])
+    assert fake_dispatcher.calls[0][2] == ({60: fake_tkinter.NORMAL},)
+
+
+def test_handler_splits_large_batches_into_limited_writes(handler):
+    # Arrange
+    midiout = mock.Mock()
+    handler.set_output_device(midiout)
+    batch = MidiEventBatch()
+    for i in range(handler.MAX_WRITE_EVENTS + 1):
+        batch.append(pack_event(0x90, i % 128, 100))
+    # Act
+    handler._handler(batch)
+    # Assert
+    sizes = [len(c.args[0]) for c in midiout.write.call_args_list]
+    assert sizes == [handler.MAX_WRITE_EVENTS, 1]
+
+
+def test_handler_ignores_unrelated_messages(handler, fake_dispatcher):
+    # Arrange
+    midiout = mock.Mock()
+    handler.set_output_device(midiout)
+    batch = MidiEventBatch()
+    batch.append(pack_event(0xB0, 0x07, 100))
+    batch.append(pack_event(0xE0, 0, 64))
+    # Act
+    handler._handler(batch)
+    # Assert
+    midiout.write.assert_not_called()
+    assert fake_dispatcher.calls == []
+
+
+def test_run_drains_queue_until_shutdown(fake_dispatcher):
+    # Arrange
+    import threading
+    from src.midi.MidiRingBuffer import MidiEventQueue
+    queue = MidiEventQueue()
+    producer = queue.create_producer()
+    lifecycle = MidiLifecycle()
+    handler = MidiHandler(event_queue=queue, lifecycle=lifecycle, dispatcher=fake_dispatcher)
+    midiout = mock.Mock()
+    written = []
+    midiout.write.side_effect = written.extend
+    handler.set_output_device(midiout)
+    t = threading.Thread(target=handler.run)
+    t.start()
+    # Act
+    producer.push(pack_event(0x90, 60, 100))
+    producer.push(pack_event(0x80, 60, 0))
+    for _ in range(100):
+        if len(written) == 2:
+            break
+        threading.Event().wait(0.01)
+    lifecycle.shutdown()
+    queue.wake()
+    t.join(timeout=1.0)
+    # Assert
+    assert not t.is_alive()
+    assert written == [[[0x90, 60, 100], 0], [[0x80, 60, 0], 0]]
@@ -0,0 +1,67 @@
+import threading
+import time
+
+from src.midi.MidiLifecycle import MidiLifecycle
+
+
+def test_initial_state_is_not_started_and_not_ended():
+    # Arrange / Act
+    lifecycle = MidiLifecycle()
+    # Assert
+    assert lifecycle.is_started() is False
+    assert lifecycle.is_ended() is False
+
+
+def test_set_started_toggles_start_flag():
+    # Arrange
+    lifecycle = MidiLifecycle()
+    # Act / Assert
+    lifecycle.set_started(True)
+    assert lifecycle.is_started() is True
+    lifecycle.set_started(False)
+    assert lifecycle.is_started() is False
+
+
+def test_wait_started_times_out_while_stopped():
+    # Arrange
+    lifecycle = MidiLifecycle()
+    # Act
+    result = lifecycle.wait_started(0.01)
+    # Assert
+    assert result is False
+
+
+def test_wait_started_returns_after_shutdown():
+    # Arrange
+    lifecycle = MidiLifecycle()
+    # Act
+    lifecycle.shutdown()
+    # Assert
+    assert lifecycle.wait_started(0.01) is True
+    assert lifecycle.is_started() is False
+
+
+def test_clearing_start_after_shutdown_keeps_waiters_awake():
+    # Arrange
+    lifecycle = MidiLifecycle()
+    lifecycle.set_started(True)
+    lifecycle.shutdown()
+    # Act
+    lifecycle.set_started(False)
+    # Assert
+    assert lifecycle.wait_started(0.01) is True
+
+
+def test_wait_ended_wakes_immediately_on_shutdown():
+    # Arrange
+    lifecycle = MidiLifecycle()
+    results = []
+    t = threading.Thread(target=lambda: results.append(lifecycle.wait_ended(5.0)))
+    t.start()
+    # Act
+    start = time.perf_counter()
+    lifecycle.shutdown()
+    t.join(timeout=1.0)
+    # Assert
+    assert results == [True]
+    assert time.perf_counter() - start < 1.0
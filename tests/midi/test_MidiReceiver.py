@@ -2,8 +2,6 @@ import sys
 import types
 import threading
 import unittest
-from queue import Queue
-from unittest import mock
 
 # Provide safe fake tkinter and pygame.midi before importing MidiReceiver
 fake_tkinter = types.SimpleNamespace(ACTIVE="active", NORMAL="normal")
@@ -40,6 +38,11 @@ sys.modules.setdefault("pygame.midi", fake_pygame.midi)
 
 # Import the class under test after fakes are in place
 from src.midi.MidiReceiver import MidiReceiver
+from src.midi.MidiLifecycle import MidiLifecycle
+from src.midi.MidiEvent import MidiEventBatch
+from src.midi.MidiRingBuffer import MidiEventQueue
+
+from tests.midi.conftest import FakeMidiBackend
 
 
 class TestMidiReceiver(unittest.TestCase):
@@ -47,42 +50,41 @@ class TestMidiReceiver(unittest.TestCase):
 
     def test_wait_connect_returns_when_start_true(self):
         # Arrange
-        flags = {"start": True, "end": False}
-        q = Queue()
+        lifecycle = MidiLifecycle()
+        lifecycle.set_started(True)
+        q = MidiEventQueue()
         receiver = MidiReceiver(
             event_queue=q,
-            lock=threading.Lock(),
-            start_flag_getter=lambda: flags["start"],
-            end_flag_getter=lambda: flags["end"]
+            lifecycle=lifecycle
         )
 
         # Act: call wait_connect (should return quickly because start flag is True)
         receiver._wait_connect()
 
         # Assert: if we reached here, the function returned (no explicit state change expected)
-        self.assertTrue(flags["start"])  # sanity assertion
+        self.assertTrue(lifecycle.is_started())  # sanity assertion
 
     def test_wait_connect_returns_when_end_true(self):
         # Arrange
-        flags = {"start": False, "end": True}
-        q = Queue()
+        lifecycle = MidiLifecycle()
+        lifecycle.shutdown()
+        q = MidiEventQueue()
         receiver = MidiReceiver(
             event_queue=q,
-            lock=threading.Lock(),
-            start_flag_getter=lambda: flags["start"],
-            end_flag_getter=lambda: flags["end"]
+            lifecycle=lifecycle
         )
 
         # Act: call wait_connect (should return quickly because end flag is True)
         receiver._wait_connect()
 
         # Assert: function returned; flags unchanged
-        self.assertTrue(flags["end"])  # sanity assertion
+        self.assertTrue(lifecycle.is_ended())  # sanity assertion
 
     def test_run_puts_events_into_queue(self):
         # Arrange
-        flags = {"start": True, "end": False}
-        q = Queue()
+        lifecycle = MidiLifecycle()
+        lifecycle.set_started(True)
+        q = MidiEventQueue()
 
         class FakeInputDevice:
             def __init__(self):
@@ -98,9 +100,7 @@ class TestMidiReceiver(unittest.TestCase):
 
         receiver = MidiReceiver(
             event_queue=q,
-            lock=threading.Lock(),
-            start_flag_getter=lambda: flags["start"],
-            end_flag_getter=lambda: flags["end"]
+            lifecycle=lifecycle
         )
         receiver.set_input_device(FakeInputDevice())
 
@@ -108,12 +108,65 @@ class TestMidiReceiver(unittest.TestCase):
         t = threading.Thread(target=receiver.run)
         t.start()
 
-        # Assert: an event should appear on the queue
-        evt = q.get(timeout=1.0)
-        self.assertIsNotNone(evt)
+        # Assert: the read events should appear on the queue as one batch
+        self.assertTrue(q.wait(1.0))
+        batch = MidiEventBatch()
+        q.drain(batch)
+        self.assertEqual(list(batch), [(0x90, 60, 100, 0.0)])
 
         # Cleanup: signal end and join thread
-        flags["end"] = True
+        lifecycle.shutdown()
+        t.join(timeout=1.0)
+        self.assertFalse(t.is_alive())
+
+    def test_run_blocks_on_backend_until_input_arrives(self):
+        # Arrange
+        lifecycle = MidiLifecycle()
+        lifecycle.set_started(True)
+        q = MidiEventQueue()
+        backend = FakeMidiBackend()
+        backend.set_blocking_input(True)
+        midiin = backend.create_input(0)
+
+        receiver = MidiReceiver(
+            event_queue=q,
+            lifecycle=lifecycle,
+            midi_backend=backend
+        )
+        receiver.set_input_device(midiin)
+        poll_calls = []
+        midiin.poll = lambda: poll_calls.append(1) or False
+
+        t = threading.Thread(target=receiver.run)
+        t.start()
+
+        # Act: inject an event while the receiver is blocked in wait_for_input
+        midiin.add_test_event(([0x90, 60, 100, 0], 0))
+
+        # Assert: the event is delivered without polling the device
+        self.assertTrue(q.wait(1.0))
+        batch = MidiEventBatch()
+        q.drain(batch)
+        self.assertEqual(list(batch), [(0x90, 60, 100, 0.0)])
+        self.assertEqual(poll_calls, [])
+
+        # Cleanup
+        lifecycle.shutdown()
+        t.join(timeout=1.0)
+        self.assertFalse(t.is_alive())
+        self.assertTrue(midiin.closed)
+
+    def test_wait_connect_wakes_on_shutdown(self):
+        # Arrange
+        lifecycle = MidiLifecycle()
+        receiver = MidiReceiver(event_queue=MidiEventQueue(), lifecycle=lifecycle)
+        t = threading.Thread(target=receiver._wait_connect)
+        t.start()
+
+        # Act
+        lifecycle.shutdown()
+
+        # Assert: the waiting thread returns without polling
         t.join(timeout=1.0)
         self.assertFalse(t.is_alive())
 
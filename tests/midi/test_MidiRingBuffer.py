@@ -0,0 +1,178 @@
+import threading
+
+from src.midi.MidiEvent import MidiEventBatch, pack_event
+from src.midi.MidiRingBuffer import MidiRingBuffer, MidiEventQueue
+
+
+def test_capacity_rounds_up_to_power_of_two():
+    # Arrange / Act
+    ring = MidiRingBuffer(capacity=100)
+    # Assert
+    assert ring.capacity == 128
+
+
+def test_push_and_pop_preserve_order():
+    # Arrange
+    ring = MidiRingBuffer(capacity=8)
+    out = MidiEventBatch()
+    # Act
+    ring.push(pack_event(0x90, 60, 100), 1.0)
+    ring.push(pack_event(0x80, 60, 0), 2.0)
+    count = ring.pop_batch(out)
+    # Assert
+    assert count == 2
+    assert list(out) == [(0x90, 60, 100, 1.0), (0x80, 60, 0, 2.0)]
+    assert len(ring) == 0
+
+
+def test_push_counts_overflow_when_full():
+    # Arrange
+    ring = MidiRingBuffer(capacity=2)
+    # Act
+    results = [ring.push(pack_event(0x90, n, 100)) for n in range(3)]
+    # Assert
+    assert results == [True, True, False]
+    assert ring.overflow_count == 1
+    assert len(ring) == 2
+
+
+def test_push_batch_wraps_around_the_end():
+    # Arrange
+    ring = MidiRingBuffer(capacity=4)
+    out = MidiEventBatch()
+    for n in range(3):
+        ring.push(pack_event(0x90, n, 1), float(n))
+    ring.pop_batch(out)
+    out.clear()
+    # Act: tail is at index 3, so this batch wraps to the start
+    pushed = ring.push_batch([pack_event(0x90, n, 1) for n in range(3, 6)], [3.0, 4.0, 5.0])
+    ring.pop_batch(out)
+    # Assert
+    assert pushed == 3
+    assert [(d1, ts) for _, d1, _, ts in out] == [(3, 3.0), (4, 4.0), (5, 5.0)]
+
+
+def test_push_batch_drops_and_counts_what_does_not_fit():
+    # Arrange
+    ring = MidiRingBuffer(capacity=4)
+    # Act
+    pushed = ring.push_batch([pack_event(0x90, n, 1) for n in range(6)], [0.0] * 6)
+    # Assert
+    assert pushed == 4
+    assert ring.overflow_count == 2
+
+
+def test_pop_batch_honours_max_count():
+    # Arrange
+    ring = MidiRingBuffer(capacity=8)
+    out = MidiEventBatch()
+    for n in range(5):
+        ring.push(pack_event(0x90, n, 1))
+    # Act
+    count = ring.pop_batch(out, max_count=3)
+    # Assert
+    assert count == 3
+    assert len(ring) == 2
+
+
+def test_queue_drains_all_producers():
+    # Arrange
+    queue = MidiEventQueue(capacity=8)
+    first = queue.create_producer()
+    second = queue.create_producer()
+    out = MidiEventBatch()
+    first.push(pack_event(0x90, 60, 100))
+    second.push(pack_event(0xB0, 0x40, 127))
+    # Act
+    count = queue.drain(out)
+    # Assert
+    assert count == 2
+    assert sorted(status for status, _, _, _ in out) == [0x90, 0xB0]
+    assert queue.empty() is True
+
+
+def test_queue_overflow_count_sums_producers():
+    # Arrange
+    queue = MidiEventQueue(capacity=1)
+    first = queue.create_producer()
+    second = queue.create_producer()
+    # Act
+    for ring in (first, second):
+        ring.push(pack_event(0x90, 60, 100))
+        ring.push(pack_event(0x90, 61, 100))
+    # Assert
+    assert queue.overflow_count == 2
+
+
+def test_queue_wait_times_out_when_empty():
+    # Arrange
+    queue = MidiEventQueue()
+    queue.create_producer()
+    # Act / Assert
+    assert queue.wait(0.01) is False
+
+
+def test_queue_wait_wakes_on_push_from_another_thread():
+    # Arrange
+    queue = MidiEventQueue()
+    ring = queue.create_producer()
+    results = []
+    t = threading.Thread(target=lambda: results.append(queue.wait(5.0)))
+    t.start()
+    # Act
+    ring.push(pack_event(0x90, 60, 100))
+    t.join(timeout=1.0)
+    # Assert
+    assert results == [True]
+
+
+def test_queue_wait_returns_immediately_when_events_pending():
+    # Arrange
+    queue = MidiEventQueue()
+    ring = queue.create_producer()
+    ring.push(pack_event(0x90, 60, 100))
+    queue.wait(0)
+    # Act / Assert: events are still pending even though the wake-up was consumed
+    assert queue.wait(0) is True
+
+
+def _consume(queue, expected, out):
+    """Drain `queue` from another thread until `expected` events arrived."""
+    def run():
+        while len(out) < expected:
+            queue.wait(0.5)
+            queue.drain(out)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_blocking_push_batch_waits_for_room_instead_of_dropping():
+    # Arrange
+    queue = MidiEventQueue(capacity=4)
+    ring = queue.create_producer(block=True)
+    words = [pack_event(0x90, n, 1) for n in range(100)]
+    out = MidiEventBatch()
+    consumer = _consume(queue, len(words), out)
+    # Act
+    pushed = ring.push_batch(words, [0.0] * len(words))
+    ring.push(pack_event(0x80, 1, 0))
+    consumer.join(timeout=2.0)
+    queue.drain(out)
+    # Assert
+    assert pushed == 100
+    assert list(out.words) == words + [pack_event(0x80, 1, 0)]
+    assert ring.overflow_count == 0
+
+
+def test_blocking_push_stops_waiting_when_aborted():
+    # Arrange: nobody consumes
+    ended = threading.Event()
+    ring = MidiRingBuffer(capacity=2, block=True, abort=ended.is_set)
+    threading.Timer(0.05, ended.set).start()
+    # Act
+    pushed = ring.push_batch([pack_event(0x90, n, 1) for n in range(5)], [0.0] * 5)
+    # Assert
+    assert pushed == 2
+    assert ring.overflow_count == 3
+    assert ring.push(pack_event(0x80, 1, 0)) is False
@@ -0,0 +1,404 @@
+import pytest
+
+from midi.MidiTimeline import MidiTimeline, DEFAULT_TEMPO
+from midi.MidiEvent import pack_event
+
+
+class DummyMidiMsg:
+    def __init__(self, type, time=0, note=None, velocity=0, channel=0, control=0, value=0, tempo=None):
+        self.type = type
+        self.time = time
+        self.note = note
+        self.velocity = velocity
+        self.channel = channel
+        self.control = control
+        self.value = value
+        self.tempo = tempo
+
+class DummyMidiFile:
+    def __init__(self, tracks, ticks_per_beat=480):
+        self.tracks = tracks
+        self.ticks_per_beat = ticks_per_beat
+
+
+def test_compile_merges_tracks_in_tick_order():
+    # Arrange
+    mid = DummyMidiFile([
+        [DummyMidiMsg("note_on", time=0, note=60, velocity=100), DummyMidiMsg("note_off", time=5, note=60)],
+        [DummyMidiMsg("control_change", time=2, control=64, value=127)]
+    ], ticks_per_beat=960)
+    # Act
+    timeline = MidiTimeline.compile(mid)
+    # Assert
+    assert timeline.ticks_per_beat == 960
+    assert list(timeline.ticks) == [0, 2, 5]
+    assert list(timeline.words) == [
+        pack_event(0x90, 60, 100),
+        pack_event(0xB0, 64, 127),
+        pack_event(0x80, 60, 0),
+    ]
+
+
+def test_compile_packs_channel_and_velocity_zero_note_off():
+    # Arrange
+    mid = DummyMidiFile([[
+        DummyMidiMsg("note_on", time=0, note=64, velocity=90, channel=3),
+        DummyMidiMsg("note_on", time=10, note=64, velocity=0, channel=3),
+    ]])
+    # Act
+    timeline = MidiTimeline.compile(mid)
+    # Assert
+    assert list(timeline.words) == [pack_event(0x93, 64, 90), pack_event(0x83, 64, 0)]
+
+
+def test_compile_skips_non_playable_messages():
+    # Arrange
+    mid = DummyMidiFile([[
+        DummyMidiMsg("program_change", time=0),
+        DummyMidiMsg("set_tempo", time=0, tempo=600000),
+        DummyMidiMsg("note_on", time=0, note=60, velocity=1),
+        DummyMidiMsg("end_of_track", time=480),
+    ]])
+    # Act
+    timeline = MidiTimeline.compile(mid)
+    # Assert
+    assert len(timeline) == 1
+    assert timeline.end_tick == 480
+    assert timeline.duration == pytest.approx(0.6)
+
+
+def test_absolute_times_follow_tempo_changes():
+    # Arrange: one beat at 120 BPM, then one beat at 60 BPM
+    mid = DummyMidiFile([[
+        DummyMidiMsg("note_on", time=0, note=60, velocity=100),
+        DummyMidiMsg("set_tempo", time=480, tempo=1000000),
+        DummyMidiMsg("note_on", time=0, note=62, velocity=100),
+        DummyMidiMsg("note_on", time=480, note=64, velocity=100),
+    ]], ticks_per_beat=480)
+    # Act
+    timeline = MidiTimeline.compile(mid)
+    # Assert
+    assert list(timeline.times) == pytest.approx([0.0, 0.5, 1.5])
+    assert list(timeline.tempo_ticks) == [0, 480]
+    assert list(timeline.tempo_times) == pytest.approx([0.0, 0.5])
+    assert list(timeline.tempo_values) == [DEFAULT_TEMPO, 1000000]
+
+
+def test_tempo_from_another_track_applies_to_all_tracks():
+    # Arrange
+    mid = DummyMidiFile([
+        [DummyMidiMsg("set_tempo", time=0, tempo=250000)],
+        [DummyMidiMsg("note_on", time=480, note=60, velocity=100)],
+    ])
+    # Act
+    timeline = MidiTimeline.compile(mid)
+    # Assert
+    assert timeline.times[0] == pytest.approx(0.25)
+
+
+def test_last_tempo_on_same_tick_wins():
+    # Arrange
+    mid = DummyMidiFile([[
+        DummyMidiMsg("set_tempo", time=0, tempo=400000),
+        DummyMidiMsg("set_tempo", time=0, tempo=250000),
+        DummyMidiMsg("note_on", time=480, note=60, velocity=100),
+    ]])
+    # Act
+    timeline = MidiTimeline.compile(mid)
+    # Assert
+    assert list(timeline.tempo_values) == [250000]
+    assert timeline.times[0] == pytest.approx(0.25)
+
+
+def test_tick_and_seconds_conversion_round_trip():
+    # Arrange
+    mid = DummyMidiFile([[
+        DummyMidiMsg("set_tempo", time=960, tempo=1000000),
+        DummyMidiMsg("note_on", time=960, note=60, velocity=100),
+    ]])
+    timeline = MidiTimeline.compile(mid)
+    # Act & Assert
+    assert timeline.tick_to_seconds(960) == pytest.approx(1.0)
+    assert timeline.tick_to_seconds(1440) == pytest.approx(2.0)
+    assert timeline.seconds_to_tick(2.0) == 1440
+    assert timeline.seconds_to_tick(0.5) == 480
+    assert timeline.tempo_at(100) == DEFAULT_TEMPO
+    assert timeline.tempo_at(960) == 1000000
+
+
+def test_empty_file_compiles_to_empty_timeline():
+    # Arrange
+    mid = DummyMidiFile([])
+    # Act
+    timeline = MidiTimeline.compile(mid)
+    # Assert
+    assert len(timeline) == 0
+    assert timeline.duration == 0.0
+
+
+def _chord_file():
+    # C4 and E4 down at tick 0, pedal down at 240, C4 up at 480, E4 up at 960
+    return DummyMidiFile([[
+        DummyMidiMsg("note_on", time=0, note=60, velocity=100),
+        DummyMidiMsg("note_on", time=0, note=64, velocity=80, channel=1),
+        DummyMidiMsg("control_change", time=240, control=64, value=127),
+        DummyMidiMsg("note_off", time=240, note=60),
+        DummyMidiMsg("note_off", time=480, note=64, channel=1),
+    ]])
+
+
+def test_index_lookups_bisect_into_timeline():
+    # Arrange
+    timeline = MidiTimeline.compile(_chord_file())
+    # Act & Assert
+    assert timeline.index_at_seconds(0.0) == 0
+    assert timeline.index_at_seconds(0.2) == 2
+    assert timeline.index_at_seconds(0.5) == 3
+    assert timeline.index_at_seconds(99.0) == len(timeline)
+    assert timeline.index_at_tick(240) == 2
+    assert timeline.index_at_tick(241) == 3
+
+
+@pytest.mark.parametrize("interval", [1024, 2, 1])
+def test_state_at_reports_sounding_notes_and_sustain(interval):
+    # Arrange
+    timeline = MidiTimeline.compile(_chord_file())
+    timeline.CHECKPOINT_INTERVAL = interval
+    # Act
+    notes, sustain = timeline.state_at(3)
+    # Assert: before C4's note off
+    assert notes[60] == 100
+    assert notes[1 << 7 | 64] == 80
+    assert sustain[0] == 127
+    # Act
+    notes, sustain = timeline.state_at(len(timeline))
+    # Assert
+    assert not any(notes)
+    assert sustain[0] == 127
+
+
+def test_state_at_start_is_silent():
+    # Arrange
+    timeline = MidiTimeline.compile(_chord_file())
+    # Act
+    notes, sustain = timeline.state_at(0)
+    # Assert
+    assert not any(notes)
+    assert not any(sustain)
+
+
+def test_stream_compiles_only_the_first_chunk():
+    # Arrange
+    mid = _chord_file()
+    # Act
+    timeline = MidiTimeline.stream(mid, chunk=2)
+    # Assert
+    assert not timeline.complete
+    assert list(timeline.ticks) == [0, 0]
+
+
+def test_compile_more_finishes_like_compile():
+    # Arrange
+    expected = MidiTimeline.compile(_chord_file())
+    timeline = MidiTimeline.stream(_chord_file(), chunk=1)
+    # Act
+    steps = 0
+    while not timeline.compile_more(2):
+        steps += 1
+    # Assert
+    assert steps == 2
+    assert list(timeline.words) == list(expected.words)
+    assert list(timeline.times) == list(expected.times)
+    assert timeline.end_tick == expected.end_tick
+    assert timeline.duration == expected.duration
+
+
+def test_stream_merge_keeps_track_order_on_equal_ticks():
+    # Arrange
+    mid = DummyMidiFile([
+        [DummyMidiMsg("note_on", time=10, note=60, velocity=1)],
+        [DummyMidiMsg("note_on", time=10, note=61, velocity=1)],
+        [DummyMidiMsg("note_on", time=5, note=62, velocity=1), DummyMidiMsg("note_on", time=5, note=63, velocity=1)],
+    ])
+    # Act
+    timeline = MidiTimeline.compile(mid)
+    # Assert
+    assert [(word >> 8) & 0x7F for word in timeline.words] == [62, 60, 61, 63]
+
+
+def test_compile_until_seconds_covers_target():
+    # Arrange
+    timeline = MidiTimeline.stream(_chord_file(), chunk=1)
+    timeline.COMPILE_CHUNK = 1
+    # Act
+    timeline.compile_until_seconds(0.2)
+    # Assert: stops at the first event at or after 0.2 s
+    assert not timeline.complete
+    assert list(timeline.ticks) == [0, 0, 240]
+    assert timeline.index_at_seconds(0.2) == 2
+
+
+def test_state_at_sees_events_compiled_later():
+    # Arrange
+    timeline = MidiTimeline.stream(_chord_file(), chunk=2)
+    timeline.CHECKPOINT_INTERVAL = 1
+    assert timeline.state_at(2)[0][60] == 100
+    # Act
+    timeline.compile_more(10)
+    notes, sustain = timeline.state_at(len(timeline))
+    # Assert
+    assert not any(notes)
+    assert sustain[0] == 127
+
+
+def _two_track_file():
+    # Track 0: C4 on channel 0 from tick 0 to 480; track 1: E4 on channel 2 from 0 to 240, pedal at 120
+    return DummyMidiFile([
+        [DummyMidiMsg("note_on", time=0, note=60, velocity=100),
+         DummyMidiMsg("note_off", time=480, note=60)],
+        [DummyMidiMsg("note_on", time=0, note=64, velocity=90, channel=2),
+         DummyMidiMsg("control_change", time=120, control=64, value=127, channel=2),
+         DummyMidiMsg("note_off", time=120, note=64, channel=2)],
+    ])
+
+
+def test_compile_records_track_and_channel_of_events():
+    # Act
+    timeline = MidiTimeline.compile(_two_track_file())
+    # Assert
+    assert timeline.track_count == 2
+    assert list(timeline.voices) == [0, 1 << 4 | 2, 1 << 4 | 2, 1 << 4 | 2, 0]
+
+
+def test_voice_mask_marks_enabled_voices():
+    # Arrange
+    timeline = MidiTimeline.compile(_two_track_file())
+    enabled = bytearray(timeline.track_count * 16)
+    enabled[1 << 4 | 2] = 1
+    # Act & Assert
+    assert timeline.voice_mask(enabled) == bytearray([0, 1, 1, 1, 0])
+    assert timeline.voice_mask(enabled, 3) == bytearray([1, 0])
+
+
+def test_masked_state_ignores_masked_events():
+    # Arrange: only track 0 enabled
+    timeline = MidiTimeline.compile(_two_track_file())
+    enabled = bytearray(timeline.track_count * 16)
+    enabled[0:16] = b'\x01' * 16
+    # Act
+    notes, sustain = timeline.state_at(2, enabled)
+    # Assert
+    assert notes[60] == 100
+    assert not notes[2 << 7 | 64]
+    assert not any(sustain)
+
+
+def _time_signature(time, numerator, denominator):
+    msg = DummyMidiMsg("time_signature", time=time)
+    msg.numerator = numerator
+    msg.denominator = denominator
+    return msg
+
+
+def test_bar_to_tick_defaults_to_four_four():
+    # Arrange
+    timeline = MidiTimeline.compile(_chord_file())
+    # Act & Assert
+    assert timeline.bar_to_tick(1) == 0
+    assert timeline.bar_to_tick(3) == 2 * 4 * 480
+
+
+def test_bar_to_tick_follows_time_signature_changes():
+    # Arrange: 3/4, then 6/8 from bar 3
+    mid = DummyMidiFile([[
+        _time_signature(0, 3, 4),
+        _time_signature(2 * 3 * 480, 6, 8),
+        DummyMidiMsg("note_on", time=480, note=60, velocity=100),
+    ]])
+    # Act
+    timeline = MidiTimeline.compile(mid)
+    # Assert
+    assert list(timeline.signature_ticks) == [0, 2880]
+    assert timeline.bar_to_tick(1.5) == 720
+    assert timeline.bar_to_tick(2) == 1440
+    assert timeline.bar_to_tick(3) == 2880
+    assert timeline.bar_to_tick(4) == 2880 + 6 * 240
+    assert list(timeline.words) == [pack_event(0x90, 60, 100)]
+
+
+def test_compile_until_bar_reaches_later_time_signatures():
+    # Arrange: 2/4 starts at bar 2
+    mid = DummyMidiFile([[
+        DummyMidiMsg("note_on", time=0, note=60, velocity=100),
+        DummyMidiMsg("note_off", time=100, note=60),
+        _time_signature(1920 - 100, 2, 4),
+        DummyMidiMsg("note_on", time=960, note=62, velocity=100),
+    ]])
+    timeline = MidiTimeline.stream(mid, chunk=1)
+    timeline.COMPILE_CHUNK = 1
+    # Act
+    timeline.compile_until_bar(3)
+    # Assert
+    assert timeline.bar_to_tick(3) == 1920 + 960
+
+
+def _shared_channel_file():
+    """Two tracks playing the same notes and pedal on channel 0, plus track 2 on channel 1."""
+    return DummyMidiFile([
+        [DummyMidiMsg("note_on", time=0, note=60, velocity=100),
+         DummyMidiMsg("control_change", time=10, control=64, value=127),
+         DummyMidiMsg("note_off", time=20, note=62),
+         DummyMidiMsg("note_on", time=10, note=64, velocity=70),
+         DummyMidiMsg("note_off", time=30, note=60)],
+        [DummyMidiMsg("note_on", time=5, note=62, velocity=90),
+         DummyMidiMsg("note_off", time=10, note=60),
+         DummyMidiMsg("control_change", time=10, control=64, value=0),
+         DummyMidiMsg("note_on", time=5, note=60, velocity=50),
+         DummyMidiMsg("control_change", time=0, control=7, value=99)],
+        [DummyMidiMsg("note_on", time=3, note=60, velocity=40, channel=1),
+         DummyMidiMsg("note_off", time=40, note=60, channel=1)],
+    ])
+
+
+@pytest.mark.parametrize("interval", [4096, 3, 1])
+@pytest.mark.parametrize("tracks", [(0,), (1,), (0, 1), (0, 2), (1, 2), (0, 1, 2), ()])
+def test_state_of_enabled_voices_matches_replay(interval, tracks):
+    # Arrange
+    timeline = MidiTimeline.compile(_shared_channel_file())
+    timeline.VOICE_CHECKPOINT_INTERVAL = interval
+    enabled = bytearray(timeline.track_count * 16)
+    for track in tracks:
+        enabled[track << 4:(track + 1) << 4] = b'\x01' * 16
+    mask = timeline.voice_mask(enabled)
+    for index in range(len(timeline) + 1):
+        expected = (bytearray(16 * 128), bytearray(16))
+        timeline.apply_events(0, index, *expected, mask)
+        # Act & Assert
+        assert timeline.state_at(index, enabled) == expected
+
+
+def test_state_of_enabled_voices_covers_events_compiled_later():
+    # Arrange
+    timeline = MidiTimeline.stream(_shared_channel_file(), chunk=3)
+    timeline.VOICE_CHECKPOINT_INTERVAL = 2
+    enabled = bytearray(b'\x01' * timeline.track_count * 16)
+    timeline.state_at(len(timeline), enabled)
+    # Act
+    while not timeline.compile_more():
+        pass
+    # Assert
+    assert timeline.state_at(len(timeline), enabled) == timeline.state_at(len(timeline))
+
+
+def test_voice_mask_with_more_than_256_voices():
+    # Arrange: 20 tracks using all 16 channels
+    timeline = MidiTimeline.compile(DummyMidiFile([
+        [DummyMidiMsg("note_on", time=0, note=60, velocity=100, channel=channel) for channel in range(16)]
+        for _ in range(20)
+    ]))
+    enabled = bytearray(index % 3 == 0 for index in range(timeline.track_count * 16))
+    # Act
+    mask = timeline.voice_mask(enabled)
+    # Assert
+    assert mask == bytearray(enabled[voice] for voice in timeline.voices)
+    assert timeline.voice_mask(enabled, 300) == mask[300:]
@@ -0,0 +1,192 @@
+import os
+import struct
+
+import pytest
+
+from midi.MidiTimeline import MidiTimeline
+from midi.MidiTimelineCache import MidiTimelineCache
+from midi.SmfDecoder import SmfDecoder
+
+
+def _smf(track):
+    return (b'MThd' + struct.pack('>IHHH', 6, 0, 1, 480)
+            + b'MTrk' + struct.pack('>I', len(track)) + track)
+
+
+# C4 on, tempo change at tick 480, C4 off at 960
+TRACK = (b'\x00\x90\x3C\x64' + b'\x83\x60\xFF\x51\x03\x0F\x42\x40'
+         + b'\x83\x60\x80\x3C\x00' + b'\x00\xFF\x2F\x00')
+
+
+def _source(tmp_path, name="song.mid", track=TRACK):
+    path = tmp_path / name
+    path.write_bytes(_smf(track))
+    return str(path)
+
+
+def _compile(path):
+    timeline = SmfDecoder(path).decode().stream(chunk=0)
+    while not timeline.compile_more():
+        pass
+    return timeline
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return MidiTimelineCache(str(tmp_path / "cache"))
+
+
+def test_store_then_load_round_trips_timeline(cache, tmp_path):
+    # Arrange
+    path = _source(tmp_path)
+    timeline = _compile(path)
+    # Act
+    stored = cache.store(path, timeline)
+    loaded = cache.load(path)
+    # Assert
+    assert stored
+    assert list(loaded.words) == list(timeline.words)
+    assert list(loaded.voices) == list(timeline.voices)
+    assert loaded.track_count == 1
+    assert list(loaded.ticks) == list(timeline.ticks)
+    assert list(loaded.times) == list(timeline.times)
+    assert list(loaded.tempo_values) == [500000, 1000000]
+    assert list(loaded.signature_values) == list(timeline.signature_values)
+    assert loaded.bar_to_tick(2) == timeline.bar_to_tick(2)
+    assert loaded.tick_to_seconds(960) == timeline.tick_to_seconds(960)
+    assert loaded.ticks_per_beat == 480
+    assert loaded.end_tick == 960
+    assert loaded.complete
+
+
+def test_loaded_timeline_supports_lookups_and_state(cache, tmp_path):
+    # Arrange
+    path = _source(tmp_path)
+    cache.store(path, _compile(path))
+    # Act
+    loaded = cache.load(path)
+    notes, _ = loaded.state_at(1)
+    # Assert
+    assert loaded.index_at_seconds(0.6) == 1
+    assert notes[60] == 100
+
+
+def test_load_misses_without_entry(cache, tmp_path):
+    # Arrange
+    path = _source(tmp_path)
+    # Act & Assert
+    assert cache.load(path) is None
+    assert cache.load(str(tmp_path / "missing.mid")) is None
+
+
+def test_changed_source_invalidates_entry(cache, tmp_path):
+    # Arrange
+    path = _source(tmp_path)
+    cache.store(path, _compile(path))
+    # Act: same size, different content
+    _source(tmp_path, track=TRACK.replace(b'\x3C\x64', b'\x3E\x64'))
+    # Assert
+    assert cache.load(path) is None
+
+
+def test_incomplete_timeline_is_not_stored(cache, tmp_path):
+    # Arrange
+    path = _source(tmp_path)
+    timeline = SmfDecoder(path).decode().stream(chunk=1)
+    # Act & Assert
+    assert not cache.store(path, timeline)
+    assert cache.load(path) is None
+
+
+def test_store_evicts_least_recently_used(tmp_path):
+    # Arrange: room for two entries
+    paths = [_source(tmp_path, f"song{i}.mid") for i in range(3)]
+    cache = MidiTimelineCache(str(tmp_path / "cache"), max_bytes=1)
+    cache.store(paths[0], _compile(paths[0]))
+    entry_size = os.path.getsize(cache._cache_path(paths[0]))
+    cache.max_bytes = entry_size * 2
+    cache.store(paths[1], _compile(paths[1]))
+    os.utime(cache._cache_path(paths[0]), ns=(1, 1))
+    os.utime(cache._cache_path(paths[1]), ns=(2, 2))
+    assert cache.load(paths[0]) is not None
+    # Act
+    cache.store(paths[2], _compile(paths[2]))
+    # Assert: paths[1] was used least recently
+    assert cache.load(paths[1]) is None
+    assert cache.load(paths[0]) is not None
+    assert cache.load(paths[2]) is not None
+
+
+def test_broken_cache_file_is_ignored(cache, tmp_path, capsys):
+    # Arrange
+    path = _source(tmp_path)
+    cache.store(path, _compile(path))
+    cache_path = cache._cache_path(path)
+    with open(cache_path, 'r+b') as f:
+        f.truncate(MidiTimelineCache.HEADER.size + 4)
+    # Act
+    loaded = cache.load(path)
+    # Assert
+    assert loaded is None
+    assert "broken timeline cache" in capsys.readouterr().out
+
+
+def test_player_stores_and_reuses_timelines(monkeypatch, tmp_path):
+    # Arrange
+    from midi.MidiFilePlayer import MidiFilePlayer
+    from midi.MidiLifecycle import MidiLifecycle
+    from midi.MidiRingBuffer import MidiEventQueue
+    monkeypatch.setattr(MidiTimeline, "COMPILE_CHUNK", 1)
+    path = _source(tmp_path, track=b'\x00\x90\x3C\x64\x00\x80\x3C\x00')
+    cache = MidiTimelineCache(str(tmp_path / "cache"))
+    player = MidiFilePlayer(MidiEventQueue(), MidiLifecycle(), timeline_cache=cache)
+    player.set_file(path)
+    player.play()
+    # Act
+    player._play_file()
+    decodes = []
+    monkeypatch.setattr(SmfDecoder, "decode", lambda self: decodes.append(self))
+    other = MidiFilePlayer(MidiEventQueue(), MidiLifecycle(), timeline_cache=cache)
+    other.set_file(path)
+    timeline = other._get_timeline()
+    # Assert
+    assert decodes == []
+    assert len(timeline) == 2
+
+
+def test_default_directory_is_per_user_cache_on_posix(monkeypatch, tmp_path):
+    # Arrange
+    monkeypatch.setattr("sys.platform", "linux")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg"))
+    # Act
+    cache = MidiTimelineCache()
+    # Assert
+    assert cache.directory == os.path.join(str(tmp_path / "xdg"), "CKey", "timelines")
+
+
+def test_default_directory_falls_back_to_home_cache(monkeypatch, tmp_path):
+    # Arrange
+    monkeypatch.setattr("sys.platform", "linux")
+    monkeypatch.delenv("XDG_CACHE_HOME", raising=False)
+    monkeypatch.setenv("HOME", str(tmp_path))
+    # Act
+    directory = MidiTimelineCache.default_directory()
+    # Assert
+    assert directory == os.path.join(str(tmp_path), ".cache", "CKey", "timelines")
+
+
+def test_default_directory_uses_local_app_data_on_windows(monkeypatch, tmp_path):
+    # Arrange
+    monkeypatch.setattr("sys.platform", "win32")
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path / "Local"))
+    # Act
+    directory = MidiTimelineCache.default_directory()
+    # Assert
+    assert directory == os.path.join(str(tmp_path / "Local"), "CKey", "timelines")
+
+
+def test_explicit_directory_overrides_default(tmp_path):
+    # Act
+    cache = MidiTimelineCache(str(tmp_path / "mine"))
+    # Assert
+    assert cache.directory == str(tmp_path / "mine")
@@ -0,0 +1,47 @@
+from src.midi.NoteTable import (
+    NOTE_COUNT, NOTE_NAMES, NOTE_NUMBERS,
+    PIANO_LOWEST_NOTE, PIANO_HIGHEST_NOTE,
+    note_name, note_number, is_black_key
+)
+
+
+def test_note_names_cover_every_midi_note():
+    # Arrange / Act / Assert
+    assert len(NOTE_NAMES) == NOTE_COUNT
+    assert len(set(NOTE_NAMES)) == NOTE_COUNT
+
+
+def test_note_names_follow_keyboard_octave_labels():
+    # Arrange / Act / Assert
+    assert note_name(0) == "C-2"
+    assert note_name(4) == "E-2"
+    assert note_name(PIANO_LOWEST_NOTE) == "A-1"
+    assert note_name(60) == "C3"
+    assert note_name(PIANO_HIGHEST_NOTE) == "C7"
+    assert note_name(NOTE_COUNT - 1) == "G8"
+
+
+def test_note_name_returns_empty_for_invalid_numbers():
+    # Arrange / Act / Assert
+    assert note_name(-1) == ""
+    assert note_name(NOTE_COUNT) == ""
+
+
+def test_note_number_is_inverse_of_note_name():
+    # Arrange / Act / Assert
+    for note in range(NOTE_COUNT):
+        assert note_number(note_name(note)) == note
+    assert NOTE_NUMBERS["C#4"] == 73
+
+
+def test_note_number_returns_minus_one_for_unknown_names():
+    # Arrange / Act / Assert
+    assert note_number("") == -1
+    assert note_number("H2") == -1
+
+
+def test_is_black_key_matches_sharps():
+    # Arrange / Act / Assert
+    assert is_black_key(61) is True
+    assert is_black_key(60) is False
+    assert [is_black_key(n) for n in range(60, 72)].count(True) == 5
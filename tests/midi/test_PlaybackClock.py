@@ -0,0 +1,147 @@
+import time
+from threading import Event, Timer
+
+import pytest
+
+from src.midi.PlaybackClock import PlaybackClock
+
+
+def test_start_anchors_position():
+    # Arrange
+    clock = PlaybackClock()
+    # Act
+    clock.start(5.0)
+    # Assert
+    assert 5.0 <= clock.position() < 5.1
+
+
+def test_wait_until_reaches_deadline():
+    # Arrange
+    clock = PlaybackClock()
+    clock.start(0.0)
+    # Act
+    reached = clock.wait_until(0.02)
+    # Assert
+    assert reached
+    assert clock.position() >= 0.02
+
+
+def test_wait_until_past_deadline_returns_immediately():
+    # Arrange
+    clock = PlaybackClock()
+    clock.start(1.0)
+    # Act
+    started = time.perf_counter()
+    reached = clock.wait_until(0.5)
+    # Assert
+    assert reached
+    assert time.perf_counter() - started < 0.01
+
+
+@pytest.mark.parametrize("delay", [0.05, 0.0005])
+def test_wait_until_is_interrupted_while_sleeping_or_spinning(delay):
+    # Arrange: 0.05 s interrupts the Event wait, 0.0005 s the spin
+    interrupt = Event()
+    clock = PlaybackClock(interrupt, spin_threshold=0.5 if delay < 0.01 else 0.0015)
+    clock.start(0.0)
+    Timer(delay, interrupt.set).start()
+    # Act
+    reached = clock.wait_until(2.0)
+    # Assert
+    assert not reached
+    assert clock.position() < 1.0
+    assert not interrupt.is_set()
+
+
+def test_timing_report_is_empty_without_events():
+    # Arrange
+    clock = PlaybackClock()
+    # Act
+    report = clock.get_timing_report()
+    # Assert
+    assert report['events'] == 0
+    assert report['max_late_ms'] == 0.0
+
+
+def test_timing_report_summarizes_lateness(monkeypatch):
+    # Arrange: events due at 0, 1, 2 s recorded 1, 2 and 4 ms late
+    now = [100.0]
+    monkeypatch.setattr(time, "perf_counter", lambda: now[0])
+    clock = PlaybackClock()
+    clock.start(0.0)
+    # Act
+    for position, late in ((0.0, 0.001), (1.0, 0.002), (2.0, 0.004)):
+        now[0] = 100.0 + position + late
+        clock.record(position)
+    report = clock.get_timing_report()
+    # Assert
+    assert report['events'] == 3
+    assert report['mean_late_ms'] == pytest.approx(7.0 / 3)
+    assert report['max_late_ms'] == pytest.approx(4.0)
+    assert report['p99_late_ms'] == pytest.approx(4.0)
+    assert report['drift_ms'] == pytest.approx(3.0)
+    assert report['jitter_ms'] == pytest.approx(1.2472, abs=1e-3)
+
+
+def test_reset_stats_clears_report():
+    # Arrange
+    clock = PlaybackClock()
+    clock.start(0.0)
+    clock.record(0.0)
+    # Act
+    clock.reset_stats()
+    # Assert
+    assert clock.get_timing_report()['events'] == 0
+
+
+def test_set_speed_keeps_position_and_scales_time(monkeypatch):
+    # Arrange
+    now = [10.0]
+    monkeypatch.setattr(time, "perf_counter", lambda: now[0])
+    clock = PlaybackClock()
+    clock.start(0.0)
+    now[0] = 11.0
+    # Act
+    applied = clock.set_speed(2.0)
+    # Assert: still at 1 s, then twice as fast
+    assert applied == 2.0
+    assert clock.position() == pytest.approx(1.0)
+    now[0] = 12.0
+    assert clock.position() == pytest.approx(3.0)
+
+
+def test_set_speed_clamps():
+    # Arrange
+    clock = PlaybackClock()
+    # Act & Assert
+    assert clock.set_speed(0.0) == PlaybackClock.MIN_SPEED
+    assert clock.set_speed(100) == PlaybackClock.MAX_SPEED
+
+
+def test_start_uses_current_speed(monkeypatch):
+    # Arrange
+    now = [0.0]
+    monkeypatch.setattr(time, "perf_counter", lambda: now[0])
+    clock = PlaybackClock()
+    clock.set_speed(0.5)
+    # Act
+    clock.start(4.0)
+    now[0] = 2.0
+    # Assert
+    assert clock.position() == pytest.approx(5.0)
+
+
+def test_wrap_maps_loop_start_onto_loop_end_deadline(monkeypatch):
+    # Arrange
+    now = [0.0]
+    monkeypatch.setattr(time, "perf_counter", lambda: now[0])
+    clock = PlaybackClock()
+    clock.set_speed(2.0)
+    clock.start(0.0)
+    end_deadline = clock.deadline(3.0)
+    now[0] = 1.6
+    # Act: a little late at the loop end
+    clock.wrap(3.0, 1.0)
+    # Assert: the loop start is due exactly when the end was
+    assert clock.deadline(1.0) == pytest.approx(end_deadline)
+    assert clock.position() == pytest.approx(1.2)
@@ -0,0 +1,173 @@
+import struct
+
+import pytest
+
+from midi.MidiTimeline import MidiTimeline
+from midi.MidiEvent import pack_event
+from midi.SmfDecoder import SmfDecoder
+
+
+def _smf(tracks, division=480, fmt=1):
+    data = b'MThd' + struct.pack('>IHHH', 6, fmt, len(tracks), division)
+    for track in tracks:
+        data += b'MTrk' + struct.pack('>I', len(track)) + track
+    return data
+
+
+def _write(tmp_path, data):
+    path = tmp_path / "song.mid"
+    path.write_bytes(data)
+    return str(path)
+
+
+def _compile(path):
+    timeline = SmfDecoder(path).decode().stream(chunk=0)
+    while not timeline.compile_more():
+        pass
+    return timeline
+
+
+def test_decode_reads_header(tmp_path):
+    # Arrange
+    path = _write(tmp_path, _smf([b'\x00\xFF\x2F\x00'], division=960, fmt=0))
+    # Act
+    decoder = SmfDecoder(path).decode()
+    # Assert
+    assert decoder.format == 0
+    assert decoder.ticks_per_beat == 960
+    assert len(decoder.tracks) == 1
+
+
+def test_decode_handles_running_status_and_long_deltas(tmp_path):
+    # Arrange: note on, running-status note on (velocity 0 = off) 200 ticks later
+    track = b'\x00\x90\x3C\x64' + b'\x81\x48\x3C\x00' + b'\x00\xFF\x2F\x00'
+    path = _write(tmp_path, _smf([track]))
+    # Act
+    timeline = _compile(path)
+    # Assert
+    assert list(timeline.ticks) == [0, 200]
+    assert list(timeline.words) == [pack_event(0x90, 60, 100), pack_event(0x80, 60, 0)]
+    assert timeline.end_tick == 200
+
+
+def test_decode_keeps_only_timeline_messages(tmp_path):
+    # Arrange: program change, sysex, text meta, pitch bend, CC64, tempo, note off
+    track = (
+        b'\x00\xC1\x05'
+        + b'\x00\xF0\x03\x7E\x7F\xF7'
+        + b'\x00\xFF\x01\x02hi'
+        + b'\x00\xE1\x00\x40'
+        + b'\x0A\xB1\x40\x7F'
+        + b'\x00\xFF\x51\x03\x07\xA1\x20'
+        + b'\x0A\x81\x3C\x40'
+        + b'\x05\xFF\x2F\x00'
+    )
+    path = _write(tmp_path, _smf([track]))
+    # Act
+    timeline = _compile(path)
+    # Assert
+    assert list(timeline.words) == [pack_event(0xB1, 64, 127), pack_event(0x81, 60, 0)]
+    assert list(timeline.tempo_values) == [500000, 500000]
+    assert timeline.tempo_ticks[-1] == 10
+    assert timeline.end_tick == 25
+
+
+def test_decode_matches_mido_path(tmp_path):
+    # Arrange
+    mido = pytest.importorskip("mido")
+    mid = mido.MidiFile(ticks_per_beat=96)
+    first, second = mido.MidiTrack(), mido.MidiTrack()
+    first.extend([
+        mido.MetaMessage('set_tempo', tempo=400000, time=0),
+        mido.MetaMessage('time_signature', numerator=6, denominator=8, time=0),
+        mido.Message('note_on', note=60, velocity=90, time=0),
+        mido.Message('note_on', note=60, velocity=0, time=48),
+        mido.Message('control_change', control=64, value=100, time=10),
+    ])
+    second.extend([
+        mido.Message('note_on', channel=3, note=40, velocity=70, time=30),
+        mido.Message('pitchwheel', channel=3, pitch=100, time=5),
+        mido.Message('note_off', channel=3, note=40, time=40),
+    ])
+    mid.tracks.extend([first, second])
+    path = str(tmp_path / "song.mid")
+    mid.save(path)
+    # Act
+    expected = MidiTimeline.compile(mido.MidiFile(path))
+    timeline = _compile(path)
+    # Assert
+    assert list(timeline.words) == list(expected.words)
+    assert list(timeline.voices) == list(expected.voices)
+    assert list(timeline.ticks) == list(expected.ticks)
+    assert list(timeline.times) == list(expected.times)
+    assert timeline.end_tick == expected.end_tick
+    assert timeline.track_count == expected.track_count == 2
+    assert list(timeline.signature_values) == list(expected.signature_values) == [6 | 3 << 8]
+
+
+def test_decode_reads_time_signatures(tmp_path):
+    # Arrange: 3/4 at tick 0, 7/8 at tick 2880 (start of bar 3)
+    track = (b'\x00\xFF\x58\x04\x03\x02\x18\x08'
+             + b'\x96\x40\xFF\x58\x04\x07\x03\x18\x08'
+             + b'\x00\xFF\x2F\x00')
+    path = _write(tmp_path, _smf([track]))
+    # Act
+    timeline = _compile(path)
+    # Assert
+    assert list(timeline.signature_ticks) == [0, 2880]
+    assert list(timeline.signature_values) == [3 | 2 << 8, 7 | 3 << 8]
+    assert timeline.bar_to_tick(4) == 2880 + 7 * 240
+    assert list(timeline.words) == []
+
+
+def test_truncated_track_keeps_decoded_events(tmp_path):
+    # Arrange: declared length is longer than the data
+    track = b'\x00\x90\x3C\x64\x10\x80'
+    data = b'MThd' + struct.pack('>IHHH', 6, 0, 1, 480) + b'MTrk' + struct.pack('>I', 100) + track
+    path = _write(tmp_path, data)
+    # Act
+    timeline = _compile(path)
+    # Assert
+    assert list(timeline.words) == [pack_event(0x90, 60, 100)]
+
+
+def test_malformed_track_data_ends_the_track(tmp_path):
+    # Arrange: a note on, then a data byte with no running status to continue
+    track = b'\x00\x90\x3C\x64\x00\xF4\x00\x00\x40'
+    path = _write(tmp_path, _smf([track]))
+    # Act
+    timeline = _compile(path)
+    # Assert
+    assert list(timeline.words) == [pack_event(0x90, 60, 100)]
+    assert timeline.complete
+
+
+@pytest.mark.parametrize("data", [
+    b'RIFF' + b'\x00' * 20,
+    _smf([b'\x00\xFF\x2F\x00'], division=0xE728),
+    b'',
+])
+def test_undecodable_files_raise_value_error(tmp_path, data):
+    # Arrange
+    path = _write(tmp_path, data)
+    # Act & Assert
+    with pytest.raises(ValueError):
+        SmfDecoder(path).decode()
+
+
+def test_player_uses_decoder_for_smf_files(monkeypatch, tmp_path):
+    # Arrange: mido must not be needed
+    from midi.MidiFilePlayer import MidiFilePlayer
+    from midi.MidiLifecycle import MidiLifecycle
+    from midi.MidiRingBuffer import MidiEventQueue
+    def fail(path):
+        raise AssertionError("mido used")
+    monkeypatch.setattr("mido.MidiFile", fail)
+    path = _write(tmp_path, _smf([b'\x00\x90\x3C\x64\x00\x80\x3C\x00']))
+    player = MidiFilePlayer(MidiEventQueue(), MidiLifecycle())
+    player.set_file(path)
+    # Act
+    timeline = player._get_timeline()
+    # Assert
+    assert timeline.complete
+    assert list(timeline.words) == [pack_event(0x90, 60, 100), pack_event(0x80, 60, 0)]